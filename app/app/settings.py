@@ -10,12 +10,17 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+# Running the test suite, e.g. `python manage.py test`.
+TESTING = sys.argv[1:2] == ['test']
+
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
@@ -37,14 +42,22 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'drf_spectacular',
     'corsheaders',
     'rest_framework_simplejwt',
     'core',
     'user',
+    'catalog',
+    'cart',
+    'order',
+    'review',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.db.routers.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -86,17 +99,89 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+# core.db.postgresql keeps connections in a per-process pool; with
+# CONN_MAX_AGE = 0 each request returns its connection to the pool when
+# it finishes. Pool statistics are served at /api/metrics/db-pool/.
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),
+            # Seconds to wait for a free connection before failing.
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            # Seconds before a connection is closed and replaced.
+            'MAX_LIFETIME': float(
+                os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            # Seconds idle connections above MIN_SIZE are kept open.
+            'MAX_IDLE': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            # Connections idle for longer are pinged before checkout.
+            'CHECK_IDLE': float(os.environ.get('DB_POOL_CHECK_IDLE', 5)),
+        },
     }
 }
 
+# Read replicas, as a comma-separated list of hosts sharing the primary's
+# name and credentials. core.db.routers.ReplicaRouter sends reads to them
+# and keeps the reads of clients that wrote in the last STICKY_SECONDS on
+# the primary. Tests read through the primary's connection.
+DB_REPLICA_HOSTS = [host for host in
+                    os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host]
+
+for number, host in enumerate(DB_REPLICA_HOSTS, 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
+READ_REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    # 'round_robin' or 'least_lag'.
+    'STRATEGY': os.environ.get('DB_REPLICA_STRATEGY', 'round_robin'),
+    'STICKY_SECONDS': 5,
+    'MAX_LAG': float(os.environ.get('DB_REPLICA_MAX_LAG', 0)) or None,
+    'LAG_CHECK_INTERVAL': 2,
+}
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/4.2/topics/auth/passwords/
+# PASSWORD_HASHER picks the hasher for new passwords; hashes made by the
+# others are still accepted and upgraded on the next login. Use
+# `python manage.py benchmark_hashers` to tune parameters for a host.
+
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+}
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CLASSES.items()
+    if name != PASSWORD_HASHER
+]
+
+# Pool used by user.hashing to hash and check passwords off the request
+# thread. BACKEND is 'thread' or 'process'.
+PASSWORD_HASHING_EXECUTOR = {
+    'BACKEND': os.environ.get('PASSWORD_HASHING_BACKEND', 'thread'),
+    'MAX_WORKERS': int(os.environ.get('PASSWORD_HASHING_WORKERS', 0)) or None,
+    'MAX_PENDING': int(os.environ.get('PASSWORD_HASHING_MAX_PENDING', 64)),
+    'QUEUE_TIMEOUT': 1.0,
+    'RETRY_AFTER': 1,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -134,6 +219,9 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', str(BASE_DIR / 'media'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -144,6 +232,200 @@ AUTH_USER_MODEL = 'user.CustomUser'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'user.authentication.CachedJWTAuthentication',
+    ),
+    # JSON is encoded and decoded with orjson, or the json module when
+    # orjson isn't installed.
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Reverse proxies in front of the app. Throttles key clients by the
+    # address this many hops back in X-Forwarded-For, or by REMOTE_ADDR
+    # with 0, so clients can't pick their address with the header.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+SPECTACULAR_SETTINGS = {
+    'ENUM_NAME_OVERRIDES': {
+        'OrderStatusEnum': 'order.models.Order.Status',
+        'ProductImageStatusEnum': 'catalog.models.ProductImage.Status',
+    },
+}
+
+# Redis when REDIS_URL is set, so all workers share cached users and
+# throttle buckets, otherwise a per-process memory cache.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+# Cache used by user.authentication.CachedJWTAuthentication to resolve
+# token users without a database query. Point CACHE_ALIAS at a shared
+# cache (e.g. Redis) in production so workers share entries.
+USER_AUTH_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+    'LOCAL_TIMEOUT': 5,
+    'LOCAL_MAX_ENTRIES': 10000,
 }
+
+# Token buckets of core.throttling.TokenBucketThrottle, checked before
+# any password hashing or database work. A rate of 'N/period' allows
+# bursts of N requests, refilled at N per period. Keep the global rates
+# within what the password hashing executor can serve.
+THROTTLE = {
+    'CACHE_ALIAS': 'default',
+    'RATES': {
+        'login': {'ip': '30/min', 'account': '10/min', 'global': '50/s'},
+        'registration': {'ip': '20/hour', 'account': '5/hour',
+                         'global': '20/s'},
+    },
+}
+
+# Refresh tokens are single use: each refresh returns a new one and
+# revokes the old one, see user.revocation.
+SIMPLE_JWT = {
+    'ROTATE_REFRESH_TOKENS': True,
+    'TOKEN_REFRESH_SERIALIZER':
+        'user.serializers.RotatingTokenRefreshSerializer',
+}
+
+# Revoked tokens are checked against an in-process array, which loads
+# new revocations at most every SYNC_INTERVAL seconds when the version in
+# the shared cache changed, and reloads fully every FULL_SYNC_INTERVAL.
+# Run `python manage.py purge_revoked_tokens --interval 3600` to delete
+# the revocations of expired tokens.
+TOKEN_REVOCATION = {
+    'CACHE_ALIAS': 'default',
+    'SYNC_INTERVAL': 1,
+    'FULL_SYNC_INTERVAL': 900,
+}
+
+# Upper bounds of the price facet buckets of catalog.models.FacetCount.
+# Run `python manage.py rebuild_facet_counts` after changing them, and
+# `python manage.py rebuild_search_vectors` after changing SEARCH_CONFIG.
+CATALOG = {
+    'PRICE_BUCKETS': [10, 25, 50, 100, 250, 500, 1000],
+    'SEARCH_CONFIG': 'english',
+}
+
+# Live carts of cart.store, kept in CACHE_ALIAS for TIMEOUT seconds after
+# their last change. With Redis, changes reach the carts tables when
+# `python manage.py flush_carts` runs, so run it often, e.g. with
+# --interval 5, as carts lost by the cache lose their unflushed changes.
+# With other caches, each process flushes the carts it changed in a
+# background thread every FLUSH_INTERVAL seconds and at exit. Tests flush
+# explicitly.
+CART = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 30 * 86400,
+    'MAX_QUANTITY': 99,
+    'MAX_ITEMS': 100,
+    'FLUSH_BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': None if TESTING else 5,
+}
+
+# Product images are rendered at each of SIZES (pixels of the longest
+# side) in each of FORMATS (name: quality) by a job enqueued on upload,
+# or by `python manage.py render_images --interval 2` in WORKERS processes.
+# Files are named by their SHA-256 and served with a max-age of
+# CACHE_MAX_AGE. Set an image's status back to pending to render it
+# again after changing them.
+PRODUCT_IMAGES = {
+    'SIZES': {'thumbnail': 160, 'medium': 480, 'large': 1200},
+    'FORMATS': {'WEBP': 80, 'JPEG': 85},
+    'MAX_UPLOAD_SIZE': 20 * 1024 * 1024,
+    'MAX_PIXELS': 50_000_000,
+    'WORKERS': None,
+    'BATCH_SIZE': 20,
+    'CACHE_MAX_AGE': 365 * 86400,
+}
+
+# Placing an order reserves its stock for RESERVATION_SECONDS. Run
+# `python manage.py release_reservations --interval 5` to return the stock
+# of orders not confirmed in time.
+ORDERS = {
+    'RESERVATION_SECONDS': 900,
+    'RELEASE_BATCH_SIZE': 500,
+}
+
+# Background jobs, run by `python manage.py run_workers` in PROCESSES
+# processes claiming BATCH_SIZE jobs at a time. Failed jobs are retried
+# after BACKOFF_BASE * 2 ** (attempt - 1) seconds, at most BACKOFF_MAX,
+# and moved to the dead jobs after MAX_ATTEMPTS. Jobs of a worker lost
+# for LEASE_SECONDS are run again. See jobs.models.DEFAULTS.
+JOBS = {
+    'PROCESSES': 2,
+    'BATCH_SIZE': 10,
+    'POLL_INTERVAL': 1,
+    'LEASE_SECONDS': 300,
+    'MAX_ATTEMPTS': 5,
+}
+
+# Check username, email and phone number uniqueness with queries before
+# registering a user. The database constraints are enforced either way.
+USER_REGISTRATION_UNIQUE_PRECHECK = False
+
+# The OpenAPI schema at /api/schema/ is rendered once per code version and
+# cached in memory and in SCHEMA_CACHE_DIR (empty to disable the disk
+# cache). Set CODE_VERSION, e.g. to the commit being deployed, to skip
+# hashing the source files to detect changes.
+CODE_VERSION = os.environ.get('CODE_VERSION', '')
+
+SCHEMA_CACHE_DIR = os.environ.get(
+    'SCHEMA_CACHE_DIR', str(BASE_DIR / '.schema_cache'))
+
+SCHEMA_CACHE_MAX_AGE = 300
+
+# Per-request metrics collected by core.middleware.RequestMetricsMiddleware:
+# query count and time, slowest query, and authentication, serializer,
+# password hashing and rendering time. See core.instrumentation.DEFAULTS.
+# Requests aren't sampled in tests, where the lines would clutter the output.
+REQUEST_METRICS = {
+    'SERVER_TIMING': DEBUG or os.environ.get('SERVER_TIMING', '') == '1',
+    'LOG_SAMPLE_RATE': 0 if TESTING else float(
+        os.environ.get('REQUEST_LOG_SAMPLE_RATE', 0.01)),
+    'SLOW_REQUEST_MS': float(os.environ.get('SLOW_REQUEST_MS', 500)),
+    'MAX_QUERIES': 200,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.request_metrics': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Prewarm each server process from app/wsgi.py or app/asgi.py before it
+# serves traffic (see core.warmup): open the database pools, import URLconfs
+# and serializers, build the OpenAPI schema and send these requests
+# in-process. They're sent without credentials, so list public endpoints
+# that query the database and serialize. Enabled by PREWARM=1.
+PREWARM = os.environ.get('PREWARM', '') == '1'
+
+PREWARM_PATHS = ['/api/products/', '/api/categories/']
@@ -14,21 +14,37 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-)
+from drf_spectacular.views import SpectacularSwaggerView
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
+from catalog.images import get_image_setting
+from catalog.views import ImageFileView
+from core.views import CachedSpectacularAPIView, DatabasePoolStatsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
+    path('api/schema/', CachedSpectacularAPIView.as_view(),
+         name='api-schema'),
     path(
         'api/docs/',
         SpectacularSwaggerView.as_view(url_name='api-schema'),
         name='api-docs',
     ),
+    path('api/metrics/db-pool/', DatabasePoolStatsView.as_view(),
+         name='db-pool-stats'),
     path('api/user/', include('user.urls', namespace='user')),
+    path('api/async/user/',
+         include('user.async_urls', namespace='user-async')),
+    path('api/', include('catalog.urls', namespace='catalog')),
+    path('api/cart/', include('cart.urls', namespace='cart')),
+    path('api/orders/', include('order.urls', namespace='order')),
+    path('api/', include('review.urls', namespace='review')),
+    # Best served by the web server in production, with the same
+    # Cache-Control header.
+    path(f"{settings.MEDIA_URL.lstrip('/')}"
+         f"{get_image_setting('DIRECTORY')}/<path:name>",
+         ImageFileView.as_view(), name='product-image-file'),
 ]
@@ -0,0 +1,45 @@
+"""
+Benchmark scenarios for the cart API, run by the benchmark_api command.
+"""
+from django.urls import reverse
+
+from core.benchmarks import Scenario, register
+from catalog.models import Product
+
+
+CART_PRODUCTS = 10
+
+
+class CartScenario(Scenario):
+    """Scenario of an anonymous client with a cart of CART_PRODUCTS."""
+
+    def setup(self, client):
+        self.products = list(Product.objects.order_by('id').values_list(
+            'id', flat=True)[:CART_PRODUCTS])
+        for product_id in self.products:
+            client.post(reverse('cart:cart-item-create'),
+                        {'product': product_id})
+
+
+@register
+class CartReadScenario(CartScenario):
+    """Read the whole cart, one round trip to the cart store."""
+
+    name = 'cart'
+    query_budget = 0
+
+    def request(self, client, iteration):
+        return client.get(reverse('cart:cart'))
+
+
+@register
+class CartAddItemScenario(CartScenario):
+    """Add a product to the cart, written behind to the database."""
+
+    name = 'cart-add-item'
+    # Checking the product exists.
+    query_budget = 1
+
+    def request(self, client, iteration):
+        return client.post(reverse('cart:cart-item-create'), {
+            'product': self.products[iteration % len(self.products)]})
@@ -0,0 +1,44 @@
+"""
+Django command to write changed carts to the database.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cart.store import RedisCartStore, flush_dirty_carts, get_store
+
+
+class Command(BaseCommand):
+    """Django command to write changed carts to the database."""
+
+    help = ('Write the carts changed in the Redis cart store to the carts '
+            'tables, in batches. Run a single instance.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            help="Carts written per transaction, CART['FLUSH_BATCH_SIZE'] "
+                 "by default.",
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            help='Keep flushing, waiting this many seconds whenever no '
+                 'carts changed.',
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(get_store(), RedisCartStore):
+            raise CommandError(
+                "The cart store's cache isn't Redis, so each process "
+                "flushes the carts it changed and this command can't see "
+                "them.")
+        total = 0
+        while True:
+            count = flush_dirty_carts(options['batch_size'])
+            total += count
+            if count:
+                continue
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Flushed {total} carts.'))
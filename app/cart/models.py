@@ -0,0 +1,136 @@
+"""
+Database models for shopping carts.
+
+The live carts are kept in a cache by cart.store, these tables are their
+persisted copy, written behind in batches.
+"""
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from catalog.models import Product
+
+
+USER_PREFIX = 'u'
+ANONYMOUS_PREFIX = 'a'
+
+
+def user_cart_key(user_id):
+    """Return the key of a user's cart."""
+    return f'{USER_PREFIX}{user_id}'
+
+
+def anonymous_cart_key(token):
+    """Return the key of the anonymous cart of a cookie token."""
+    return f'{ANONYMOUS_PREFIX}{token}'
+
+
+def cart_key_user_id(key):
+    """Return the id of the user owning a cart, None if anonymous."""
+    if key.startswith(USER_PREFIX):
+        return int(key[len(USER_PREFIX):])
+    return None
+
+
+class CartManager(models.Manager):
+    """Manager for carts."""
+
+    def save_items(self, carts):
+        """
+        Store the items of carts given as {key: {product_id: quantity}},
+        with a fixed number of statements however many carts there are.
+
+        Empty anonymous carts, such as those merged into a user's cart,
+        are deleted. Items of products or carts of users deleted in the
+        meantime are skipped.
+        """
+        using = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            empty = [key for key, items in carts.items()
+                     if not items and cart_key_user_id(key) is None]
+            self.using(using).filter(key__in=empty).delete()
+            carts = {key: items for key, items in carts.items()
+                     if key not in empty}
+            user_ids = set(get_user_model().objects.using(using).filter(
+                pk__in=[cart_key_user_id(key) for key in carts],
+            ).values_list('pk', flat=True))
+            carts = {key: items for key, items in carts.items()
+                     if cart_key_user_id(key) in user_ids | {None}}
+            if not carts:
+                return
+
+            now = timezone.now()
+            self.using(using).bulk_create(
+                [self.model(key=key, user_id=cart_key_user_id(key),
+                            updated_at=now)
+                 for key in sorted(carts)],
+                update_conflicts=True, unique_fields=['key'],
+                update_fields=['updated_at'],
+            )
+            cart_ids = dict(self.using(using).filter(
+                key__in=carts).values_list('key', 'id'))
+            product_ids = set(Product.objects.using(using).filter(
+                pk__in={product_id for items in carts.values()
+                        for product_id in items},
+            ).values_list('pk', flat=True))
+
+            CartItem.objects.using(using).filter(reduce(or_, [
+                Q(cart_id=cart_ids[key])
+                & ~Q(product_id__in=product_ids & items.keys())
+                for key, items in carts.items()
+            ])).delete()
+            CartItem.objects.using(using).bulk_create(
+                [CartItem(cart_id=cart_ids[key], product_id=product_id,
+                          quantity=quantity)
+                 for key, items in sorted(carts.items())
+                 for product_id, quantity in sorted(items.items())
+                 if product_id in product_ids],
+                update_conflicts=True, unique_fields=['cart', 'product'],
+                update_fields=['quantity'],
+            )
+
+    def load_items(self, key):
+        """Return the stored items of a cart as {product_id: quantity}."""
+        return dict(CartItem.objects.using(self._db).filter(
+            cart__key=key).values_list('product_id', 'quantity'))
+
+
+class Cart(models.Model):
+    """
+    Shopping cart of a user, or of an anonymous client identified by a
+    cookie token.
+    """
+    # user_cart_key() or anonymous_cart_key(), the cart's key in the store.
+    key = models.CharField(max_length=64, unique=True)
+    user = models.OneToOneField(settings.AUTH_USER_MODEL,
+                                on_delete=models.CASCADE, null=True,
+                                blank=True, related_name='cart')
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    objects = CartManager()
+
+    def __str__(self):
+        return self.key
+
+
+class CartItem(models.Model):
+    """Quantity of a product in a cart."""
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE,
+                             related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='+')
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'],
+                                    name='unique_cart_product'),
+        ]
+
+    def __str__(self):
+        return f'{self.quantity} x {self.product_id}'
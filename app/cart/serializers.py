@@ -0,0 +1,34 @@
+"""
+Serializers for the cart API.
+"""
+from rest_framework import serializers
+
+from core.instrumentation import TimedSerializerMixin
+from catalog.models import Product
+
+
+class CartItemSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Product to add to a cart, or a product in a cart."""
+    product = serializers.PrimaryKeyRelatedField(
+        queryset=Product.objects.only('id'))
+    # Quantities above CART['MAX_QUANTITY'] are capped.
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class CartItemQuantitySerializer(TimedSerializerMixin, serializers.Serializer):
+    """New quantity of a product in a cart, 0 to remove it."""
+    quantity = serializers.IntegerField(min_value=0)
+
+
+class CartSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Products in a cart and their total quantity."""
+    items = CartItemSerializer(many=True, read_only=True)
+    quantity = serializers.IntegerField(read_only=True)
+
+    def to_representation(self, instance):
+        """Represent the {product_id: quantity} items of a cart."""
+        return {
+            'items': [{'product': product_id, 'quantity': quantity}
+                      for product_id, quantity in sorted(instance.items())],
+            'quantity': sum(instance.values()),
+        }
@@ -0,0 +1,399 @@
+"""
+Live shopping carts in a shared cache, persisted write-behind.
+
+A cart is a map of product ids to quantities under one cache key, so a
+whole cart is read in one round trip. Changes are applied atomically in
+the cache: with a Redis cache each one runs as a script on a hash, other
+caches, such as the local memory cache standing in during development,
+are updated under a process lock.
+
+Every change also adds the cart's key to a set of dirty carts.
+flush_dirty_carts() takes a batch of them and writes their items to the
+Cart and CartItem tables with a few statements, so the database sees one
+write per cart per flush however many changes were made. Carts missing
+from the cache are loaded from the tables on first use. Changes not yet
+flushed are lost if the cache loses a cart, so flush often.
+
+With Redis the dirty set is shared, and the flush_carts command empties
+it. Other caches can't update a set atomically across processes, so each
+process keeps the set of the carts it changed, and flushes them itself
+in a background thread FLUSH_INTERVAL seconds after the oldest change,
+and at exit. Changes don't wait for the flush and failed flushes are
+logged and retried, so cart requests neither pay for nor fail on it.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import connections
+
+from cart.models import Cart
+
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'cart',
+    # Seconds a cart stays in the cache after its last change.
+    'TIMEOUT': 30 * 86400,
+    'MAX_QUANTITY': 99,
+    'MAX_ITEMS': 100,
+    'FLUSH_BATCH_SIZE': 500,
+    # Seconds before a process flushes the carts it changed, without Redis.
+    # None leaves them to explicit flush_dirty_carts() calls.
+    'FLUSH_INTERVAL': 5,
+    'COOKIE_NAME': 'cart',
+}
+
+# Field of the Redis hashes marking a cart as loaded, so an empty cart
+# can be told apart from one missing from the cache.
+LOADED_FIELD = '_'
+
+LOAD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return redis.call('HGETALL', KEYS[1])
+"""
+
+UPDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+local quantity = tonumber(ARGV[3])
+if ARGV[4] == '1' then
+    quantity = quantity + tonumber(redis.call('HGET', KEYS[1], ARGV[2]) or 0)
+end
+quantity = math.min(quantity, tonumber(ARGV[5]))
+local full = 0
+if quantity <= 0 then
+    redis.call('HDEL', KEYS[1], ARGV[2])
+elseif redis.call('HEXISTS', KEYS[1], ARGV[2]) == 1
+        or redis.call('HLEN', KEYS[1]) <= tonumber(ARGV[6]) then
+    redis.call('HSET', KEYS[1], ARGV[2], quantity)
+else
+    full = 1
+end
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+redis.call('SADD', KEYS[2], ARGV[1])
+return {full, redis.call('HGETALL', KEYS[1])}
+"""
+
+CLEAR_SCRIPT = """
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], '_', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[1])
+"""
+
+MERGE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return false
+end
+local items = redis.call('HGETALL', KEYS[1])
+for i = 1, #items, 2 do
+    local product = items[i]
+    if product ~= '_' then
+        local quantity = math.min(
+            tonumber(items[i + 1])
+            + tonumber(redis.call('HGET', KEYS[2], product) or 0),
+            tonumber(ARGV[3]))
+        if redis.call('HEXISTS', KEYS[2], product) == 1
+                or redis.call('HLEN', KEYS[2]) <= tonumber(ARGV[4]) then
+            redis.call('HSET', KEYS[2], product, quantity)
+        end
+    end
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], '_', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+redis.call('SADD', KEYS[3], ARGV[1], ARGV[2])
+return redis.call('HGETALL', KEYS[2])
+"""
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+# Carts changed by this process and not flushed yet, without Redis, and
+# the timer of their flush.
+_dirty = set()
+_flush_timer = None
+
+
+def get_cart_setting(name):
+    """Return a value from settings.CART or its default."""
+    return getattr(settings, 'CART', {}).get(name, DEFAULTS[name])
+
+
+class CartFull(Exception):
+    """Raised when adding a product to a cart with MAX_ITEMS products."""
+
+
+class CartStore:
+    """
+    Carts stored as {product_id: quantity} dicts in a Django cache, and
+    changed under a process lock. Changed carts are flushed by the
+    process which changed them.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.prefix = get_cart_setting('KEY_PREFIX')
+        self.timeout = get_cart_setting('TIMEOUT')
+        self.max_quantity = get_cart_setting('MAX_QUANTITY')
+        self.max_items = get_cart_setting('MAX_ITEMS')
+
+    def cache_key(self, key):
+        return f'{self.prefix}:{key}'
+
+    @property
+    def dirty_key(self):
+        return f'{self.prefix}:dirty'
+
+    def get(self, key):
+        """Return the items of a cart, loading it if needed."""
+        items = self.cache.get(self.cache_key(key))
+        if items is None:
+            with _lock:
+                items = self._get(key)
+        return items
+
+    def _get(self, key):
+        items = self.cache.get(self.cache_key(key))
+        if items is None:
+            items = Cart.objects.load_items(key)
+            self.cache.set(self.cache_key(key), items, self.timeout)
+        return items
+
+    def update(self, key, product_id, quantity, add=False):
+        """
+        Set the quantity of a product in a cart, or add to it, capped at
+        MAX_QUANTITY. A quantity of 0 or less removes the product. Return
+        the items of the cart.
+        """
+        with _lock:
+            items = self._get(key)
+            if add:
+                quantity += items.get(product_id, 0)
+            quantity = min(quantity, self.max_quantity)
+            if quantity <= 0:
+                items.pop(product_id, None)
+            elif product_id in items or len(items) < self.max_items:
+                items[product_id] = quantity
+            else:
+                raise CartFull()
+            self._save({key: items})
+        return items
+
+    def clear(self, key):
+        """Remove all products from a cart."""
+        with _lock:
+            self._save({key: {}})
+
+    def merge(self, source, target):
+        """
+        Add the products of the source cart to the target cart and empty
+        the source. Return the items of the target cart.
+        """
+        with _lock:
+            items = self._get(target)
+            for product_id, quantity in self._get(source).items():
+                if product_id in items or len(items) < self.max_items:
+                    items[product_id] = min(
+                        items.get(product_id, 0) + quantity,
+                        self.max_quantity)
+            self._save({source: {}, target: items})
+        return items
+
+    def _save(self, carts):
+        self.cache.set_many({self.cache_key(key): items
+                             for key, items in carts.items()},
+                            self.timeout)
+        _dirty.update(carts)
+        _schedule_flush()
+
+    def pop_dirty(self, count):
+        """Remove and return up to count keys of changed carts."""
+        with _lock:
+            keys = sorted(_dirty)[:count]
+            _dirty.difference_update(keys)
+        return keys
+
+    def mark_dirty(self, keys):
+        """Add keys to the changed carts, e.g. after a failed flush."""
+        with _lock:
+            _dirty.update(keys)
+            _schedule_flush()
+
+    def get_many(self, keys):
+        """
+        Return {key: items} of the carts in the cache, without loading
+        the missing ones.
+        """
+        items = self.cache.get_many([self.cache_key(key) for key in keys])
+        return {key: items[self.cache_key(key)] for key in keys
+                if self.cache_key(key) in items}
+
+
+class RedisCartStore(CartStore):
+    """
+    Carts stored as Redis hashes of product ids to quantities, and changed
+    by scripts.
+    """
+
+    def cache_key(self, key):
+        return self.cache.make_and_validate_key(super().cache_key(key))
+
+    @property
+    def dirty_key(self):
+        return self.cache.make_and_validate_key(super().dirty_key)
+
+    @property
+    def client(self):
+        return self.cache._cache.get_client(write=True)
+
+    def parse(self, fields):
+        """Return the items of a cart from the flat HGETALL reply."""
+        pairs = zip(fields[::2], fields[1::2])
+        if isinstance(fields, dict):
+            pairs = fields.items()
+        return {int(field): int(value) for field, value in pairs
+                if field not in (b'_', LOADED_FIELD)}
+
+    def get(self, key):
+        fields = self.client.hgetall(self.cache_key(key))
+        if not fields:
+            return self.load(key)
+        return self.parse(fields)
+
+    def load(self, key):
+        """Copy a cart missing from the cache from the database."""
+        fields = [LOADED_FIELD, 1]
+        for product_id, quantity in Cart.objects.load_items(key).items():
+            fields += [product_id, quantity]
+        return self.parse(self.client.eval(
+            LOAD_SCRIPT, 1, self.cache_key(key), self.timeout, *fields))
+
+    def update(self, key, product_id, quantity, add=False):
+        result = self.client.eval(
+            UPDATE_SCRIPT, 2, self.cache_key(key), self.dirty_key, key,
+            product_id, quantity, int(add), self.max_quantity,
+            self.max_items, self.timeout)
+        if result is None:
+            self.load(key)
+            return self.update(key, product_id, quantity, add)
+        full, fields = result
+        if full:
+            raise CartFull()
+        return self.parse(fields)
+
+    def clear(self, key):
+        self.client.eval(CLEAR_SCRIPT, 2, self.cache_key(key),
+                         self.dirty_key, key, self.timeout)
+
+    def merge(self, source, target):
+        self.get(source)
+        fields = self.client.eval(
+            MERGE_SCRIPT, 3, self.cache_key(source), self.cache_key(target),
+            self.dirty_key, source, target, self.max_quantity,
+            self.max_items, self.timeout)
+        if fields is None:
+            self.load(target)
+            return self.merge(source, target)
+        return self.parse(fields)
+
+    def pop_dirty(self, count):
+        return sorted(key.decode() for key in
+                      self.client.spop(self.dirty_key, count))
+
+    def mark_dirty(self, keys):
+        if keys:
+            self.client.sadd(self.dirty_key, *keys)
+
+    def get_many(self, keys):
+        pipeline = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.hgetall(self.cache_key(key))
+        return {key: self.parse(fields)
+                for key, fields in zip(keys, pipeline.execute()) if fields}
+
+
+def get_store():
+    """Return the store of the cache in settings.CART['CACHE_ALIAS']."""
+    cache = caches[get_cart_setting('CACHE_ALIAS')]
+    if isinstance(cache, RedisCache):
+        return RedisCartStore(cache)
+    return CartStore(cache)
+
+
+def flush_dirty_carts(batch_size=None):
+    """
+    Write a batch of changed carts to the database and return how many
+    there were. Carts are marked changed again if the write fails.
+    """
+    store = get_store()
+    keys = store.pop_dirty(batch_size or get_cart_setting('FLUSH_BATCH_SIZE'))
+    if not keys:
+        return 0
+    try:
+        Cart.objects.save_items(store.get_many(keys))
+    except Exception:
+        store.mark_dirty(keys)
+        raise
+    return len(keys)
+
+
+def flush_all_dirty_carts():
+    """Flush batches of changed carts until none are left."""
+    while flush_dirty_carts():
+        pass
+
+
+def _schedule_flush():
+    """
+    Start the timer flushing the changed carts in FLUSH_INTERVAL seconds,
+    unless it's running. Call it holding _lock.
+    """
+    global _flush_timer
+
+    interval = get_cart_setting('FLUSH_INTERVAL')
+    if interval is None or _flush_timer is not None or not _dirty:
+        return
+    _flush_timer = threading.Timer(interval, _flush_in_background)
+    # Left to flush_at_exit() rather than delaying the exit.
+    _flush_timer.daemon = True
+    _flush_timer.start()
+
+
+def _flush_in_background():
+    try:
+        flush_process_carts()
+    finally:
+        connections.close_all()
+
+
+def flush_process_carts():
+    """
+    Flush the carts changed by this process. Failures are logged and the
+    carts flushed again later.
+    """
+    global _flush_timer
+
+    with _lock:
+        _flush_timer = None
+    try:
+        flush_all_dirty_carts()
+    except Exception:
+        logger.exception('Flushing carts failed.')
+
+
+@atexit.register
+def flush_at_exit():
+    """Flush the carts changed by this process, without Redis."""
+    if _dirty and get_cart_setting('FLUSH_INTERVAL') is not None:
+        flush_all_dirty_carts()
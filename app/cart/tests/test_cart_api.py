@@ -0,0 +1,136 @@
+"""
+Tests for the cart API.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cart.models import CartItem
+from cart.store import flush_dirty_carts
+from catalog.models import Category, Product
+
+
+CART = reverse('cart:cart')
+CART_ITEM_CREATE = reverse('cart:cart-item-create')
+TOKEN_PAIR_URL = reverse('user:token_obtain_pair')
+
+
+def cart_item_url(product_id):
+    """Create and return a cart item URL."""
+    return reverse('cart:cart-item-detail', args=[product_id])
+
+
+class CartAPITests(TestCase):
+    """Test changing carts through the API."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Audio')
+        self.a, self.b = [
+            Product.objects.create(category=category, name=name,
+                                   price='10.00').id
+            for name in ['Speaker', 'Headphones']
+        ]
+        self.user = get_user_model().objects.create_user(
+            username='janek123', email='user@example.com',
+            phone_number='+48123456789', password='testpass123',
+            first_name='Jan', last_name='Kowalski')
+
+    def test_anonymous_cart(self):
+        """Test anonymous clients get a cart cookie on their first change."""
+        res = self.client.get(CART)
+        self.assertEqual(res.data, {'items': [], 'quantity': 0})
+        self.assertNotIn('cart', res.cookies)
+
+        res = self.client.post(CART_ITEM_CREATE, {'product': self.a})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('cart', res.cookies)
+        self.client.post(CART_ITEM_CREATE,
+                         {'product': self.a, 'quantity': 2})
+        res = self.client.put(cart_item_url(self.b), {'quantity': 4})
+        self.assertEqual(res.data, {
+            'items': [{'product': self.a, 'quantity': 3},
+                      {'product': self.b, 'quantity': 4}],
+            'quantity': 7,
+        })
+
+        res = self.client.get(CART)
+        self.assertEqual(res.data['quantity'], 7)
+
+    def test_read_without_queries(self):
+        """Test reading a cart is served by the store alone."""
+        self.client.force_authenticate(self.user)
+        self.client.post(CART_ITEM_CREATE, {'product': self.a})
+
+        with self.assertNumQueries(0):
+            res = self.client.get(CART)
+
+        self.assertEqual(res.data['items'],
+                         [{'product': self.a, 'quantity': 1}])
+
+    def test_remove_and_clear(self):
+        """Test removing a product and clearing the cart."""
+        self.client.force_authenticate(self.user)
+        self.client.post(CART_ITEM_CREATE, {'product': self.a})
+        self.client.post(CART_ITEM_CREATE, {'product': self.b})
+
+        res = self.client.delete(cart_item_url(self.a))
+        self.assertEqual(res.data['items'],
+                         [{'product': self.b, 'quantity': 1}])
+
+        res = self.client.delete(CART)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(CART).data['items'], [])
+
+    def test_invalid_items(self):
+        """Test unknown products and quantities are rejected."""
+        for data in [{'product': 0}, {'product': self.a, 'quantity': 0}]:
+            with self.subTest(data=data):
+                res = self.client.post(CART_ITEM_CREATE, data)
+
+                self.assertEqual(res.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.put(cart_item_url(0), {'quantity': 1})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_merge_at_login(self):
+        """Test signing in merges the anonymous cart into the user's."""
+        self.client.post(CART_ITEM_CREATE,
+                         {'product': self.a, 'quantity': 2})
+        signed_in = APIClient()
+        signed_in.force_authenticate(self.user)
+        signed_in.post(CART_ITEM_CREATE, {'product': self.a})
+        signed_in.post(CART_ITEM_CREATE, {'product': self.b})
+
+        res = self.client.post(TOKEN_PAIR_URL, {
+            'email': 'user@example.com', 'password': 'testpass123'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.cookies['cart'].value, '')
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        res = self.client.get(CART)
+        self.assertEqual(res.data['items'], [
+            {'product': self.a, 'quantity': 3},
+            {'product': self.b, 'quantity': 1},
+        ])
+
+        flush_dirty_carts()
+        self.assertEqual(
+            dict(CartItem.objects.values_list('product_id', 'quantity')),
+            {self.a: 3, self.b: 1})
+
+    def test_forged_cookie_ignored(self):
+        """Test malformed cart cookies are treated as no cart."""
+        self.client.cookies['cart'] = 'u1'
+
+        res = self.client.get(CART)
+
+        self.assertEqual(res.data['items'], [])
@@ -0,0 +1,212 @@
+"""
+Tests for the cart store and its write-behind persistence.
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+
+from cart.models import Cart, CartItem, anonymous_cart_key, user_cart_key
+from cart.store import (
+    CartFull,
+    flush_dirty_carts,
+    flush_process_carts,
+    get_store,
+)
+from catalog.models import Category, Product
+
+
+class CartStoreTests(TestCase):
+    """Test changing carts in the store and flushing them."""
+
+    def setUp(self):
+        cache.clear()
+        self.store = get_store()
+        # Carts changed by other tests in this process.
+        self.store.pop_dirty(10 ** 6)
+        self.user = get_user_model().objects.create_user(
+            username='janek123', email='user@example.com',
+            phone_number='+48123456789', password='testpass123',
+            first_name='Jan', last_name='Kowalski')
+        self.key = user_cart_key(self.user.pk)
+        category = Category.objects.create(name='Audio')
+        self.products = [
+            Product.objects.create(category=category, name=f'Product {n}',
+                                   price='10.00')
+            for n in range(3)
+        ]
+        self.ids = [product.id for product in self.products]
+
+    def stored_items(self, key):
+        return dict(CartItem.objects.filter(cart__key=key).values_list(
+            'product_id', 'quantity'))
+
+    def test_update(self):
+        """Test adding, setting and removing products."""
+        a, b, _ = self.ids
+
+        self.store.update(self.key, a, 2, add=True)
+        self.store.update(self.key, a, 3, add=True)
+        self.store.update(self.key, b, 5)
+        self.assertEqual(self.store.get(self.key), {a: 5, b: 5})
+
+        self.store.update(self.key, b, 0)
+        self.assertEqual(self.store.get(self.key), {a: 5})
+
+    @override_settings(CART={'MAX_QUANTITY': 10, 'MAX_ITEMS': 2})
+    def test_limits(self):
+        """Test quantities are capped and carts hold MAX_ITEMS products."""
+        a, b, c = self.ids
+        self.store = get_store()
+
+        self.store.update(self.key, a, 8, add=True)
+        self.store.update(self.key, a, 8, add=True)
+        self.store.update(self.key, b, 1)
+
+        self.assertEqual(self.store.get(self.key), {a: 10, b: 1})
+        with self.assertRaises(CartFull):
+            self.store.update(self.key, c, 1)
+
+    def test_changes_are_written_behind(self):
+        """Test changes reach the database only when flushed."""
+        a, b, _ = self.ids
+
+        with self.assertNumQueries(1):
+            self.store.update(self.key, a, 1, add=True)
+            self.store.update(self.key, b, 2, add=True)
+            self.store.update(self.key, a, 4)
+
+        self.assertEqual(flush_dirty_carts(), 1)
+        self.assertEqual(self.stored_items(self.key), {a: 4, b: 2})
+        self.assertEqual(Cart.objects.get(key=self.key).user, self.user)
+        self.assertEqual(flush_dirty_carts(), 0)
+
+    def test_flush_removes_items(self):
+        """Test flushing deletes the items removed from the cart."""
+        a, b, _ = self.ids
+        self.store.update(self.key, a, 1)
+        self.store.update(self.key, b, 1)
+        flush_dirty_carts()
+
+        self.store.update(self.key, a, 0)
+        flush_dirty_carts()
+        self.assertEqual(self.stored_items(self.key), {b: 1})
+
+        self.store.clear(self.key)
+        flush_dirty_carts()
+        self.assertEqual(self.stored_items(self.key), {})
+        self.assertTrue(Cart.objects.filter(key=self.key).exists())
+
+    def test_flush_batch(self):
+        """Test a batch of carts is written with a fixed query count."""
+        keys = [anonymous_cart_key(f'{n:022d}') for n in range(20)]
+        for key in keys:
+            for product_id in self.ids:
+                self.store.update(key, product_id, 1)
+
+        # The savepoint, upsert of carts, their ids, existing products,
+        # deletion of removed items and upsert of items.
+        with self.assertNumQueries(7):
+            self.assertEqual(flush_dirty_carts(batch_size=20), 20)
+
+        self.assertEqual(CartItem.objects.count(), 60)
+
+    def test_flush_skips_deleted_rows(self):
+        """Test products and users deleted before a flush are skipped."""
+        a, b, _ = self.ids
+        other = get_user_model().objects.create_user(
+            username='anna123', email='other@example.com',
+            phone_number='+48987654321', password='testpass123',
+            first_name='Anna', last_name='Nowak')
+        self.store.update(self.key, a, 1)
+        self.store.update(self.key, b, 1)
+        self.store.update(user_cart_key(other.pk), a, 1)
+        self.products[1].delete()
+        other.delete()
+
+        flush_dirty_carts()
+
+        self.assertEqual(self.stored_items(self.key), {a: 1})
+        self.assertEqual(list(Cart.objects.values_list('key', flat=True)),
+                         [self.key])
+
+    def test_failed_flush_is_retried(self):
+        """Test carts stay dirty when writing them fails."""
+        self.store.update(self.key, self.ids[0], 1)
+
+        with self.assertRaises(ValueError), mock.patch.object(
+                Cart.objects, 'save_items', side_effect=ValueError):
+            flush_dirty_carts()
+
+        self.assertEqual(flush_dirty_carts(), 1)
+        self.assertEqual(self.stored_items(self.key), {self.ids[0]: 1})
+
+    def test_load_from_database(self):
+        """Test carts missing from the store are loaded once."""
+        a, b, _ = self.ids
+        self.store.update(self.key, a, 3)
+        flush_dirty_carts()
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.store.get(self.key), {a: 3})
+            self.assertEqual(self.store.get(self.key), {a: 3})
+            self.store.update(self.key, b, 1)
+
+        self.assertEqual(self.store.get(self.key), {a: 3, b: 1})
+
+    def test_merge(self):
+        """Test merging sums quantities and empties the source cart."""
+        a, b, _ = self.ids
+        anonymous = anonymous_cart_key('x' * 22)
+        self.store.update(self.key, a, 1)
+        self.store.update(anonymous, a, 2)
+        self.store.update(anonymous, b, 3)
+        flush_dirty_carts()
+
+        items = self.store.merge(anonymous, self.key)
+
+        self.assertEqual(items, {a: 3, b: 3})
+        self.assertEqual(self.store.get(self.key), {a: 3, b: 3})
+        self.assertEqual(self.store.get(anonymous), {})
+        flush_dirty_carts()
+        self.assertEqual(self.stored_items(self.key), {a: 3, b: 3})
+        self.assertFalse(Cart.objects.filter(key=anonymous).exists())
+
+    @override_settings(CART={'FLUSH_INTERVAL': 5})
+    def test_flushed_by_the_process(self):
+        """Test a process flushes its carts FLUSH_INTERVAL after a change."""
+        a, b, _ = self.ids
+
+        with mock.patch('cart.store.threading.Timer') as timer:
+            self.store.update(self.key, a, 2)
+            self.store.update(self.key, b, 1)
+
+        timer.assert_called_once_with(5, mock.ANY)
+        self.assertEqual(self.stored_items(self.key), {})
+        flush_process_carts()
+        self.assertEqual(self.stored_items(self.key), {a: 2, b: 1})
+
+    @override_settings(CART={'FLUSH_INTERVAL': 5})
+    def test_failed_flush_retried(self):
+        """Test failed flushes are logged and retried, not raised."""
+        a, _, _ = self.ids
+
+        with mock.patch('cart.store.threading.Timer') as timer, \
+                mock.patch.object(Cart.objects, 'save_items',
+                                  side_effect=DatabaseError):
+            self.store.update(self.key, a, 2)
+            with self.assertLogs('cart.store', 'ERROR'):
+                flush_process_carts()
+
+        self.assertEqual(timer.call_count, 2)
+        flush_process_carts()
+        self.assertEqual(self.stored_items(self.key), {a: 2})
+
+    def test_flush_command_needs_redis(self):
+        """Test flush_carts refuses caches it can't see changes of."""
+        with self.assertRaises(CommandError):
+            call_command('flush_carts')
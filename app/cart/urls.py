@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import views
+
+app_name = "cart"
+
+urlpatterns = [
+    path('', views.CartAPIView.as_view(), name='cart'),
+    path('items/', views.CartItemCreateAPIView.as_view(),
+         name='cart-item-create'),
+    path('items/<int:product_id>/', views.CartItemDetailAPIView.as_view(),
+         name='cart-item-detail'),
+]
@@ -0,0 +1,143 @@
+"""
+Views for the cart API.
+
+Signed in users have one cart. Anonymous clients get a cart identified
+by a random token in a cookie, set by their first change, which is
+merged into the user's cart when they sign in.
+"""
+import re
+import secrets
+
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from catalog.models import Product
+
+from .models import anonymous_cart_key, user_cart_key
+from .serializers import (
+    CartItemQuantitySerializer,
+    CartItemSerializer,
+    CartSerializer,
+)
+from .store import CartFull, get_cart_setting, get_store
+
+
+TOKEN_RE = re.compile(r'[\w-]{22}')
+
+
+def get_cart_token(request):
+    """Return the anonymous cart token of the request's cookie, if any."""
+    token = request.COOKIES.get(get_cart_setting('COOKIE_NAME'), '')
+    return token if TOKEN_RE.fullmatch(token) else None
+
+
+def merge_anonymous_cart(request, response, user):
+    """
+    Merge the anonymous cart of the request's cookie into the cart of the
+    user signing in, and delete the cookie.
+    """
+    token = get_cart_token(request)
+    if token is None:
+        return
+    get_store().merge(anonymous_cart_key(token), user_cart_key(user.pk))
+    response.delete_cookie(get_cart_setting('COOKIE_NAME'), samesite='Lax')
+
+
+class CartMixin:
+    """Views of the request's cart."""
+    permission_classes = (AllowAny,)
+    cart_token = None
+
+    def get_cart_key(self, create=False):
+        """
+        Return the key of the request's cart. Anonymous clients without a
+        cart get a new one if create is set, otherwise None.
+        """
+        if self.request.user.is_authenticated:
+            return user_cart_key(self.request.user.pk)
+        token = get_cart_token(self.request)
+        if token is None and create:
+            token = self.cart_token = secrets.token_urlsafe(16)
+        return None if token is None else anonymous_cart_key(token)
+
+    def cart_response(self, items):
+        return Response(CartSerializer(items).data)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.cart_token is not None:
+            response.set_cookie(
+                get_cart_setting('COOKIE_NAME'), self.cart_token,
+                max_age=get_cart_setting('TIMEOUT'), httponly=True,
+                samesite='Lax')
+        return super().finalize_response(request, response, *args,
+                                         **kwargs)
+
+
+class CartAPIView(CartMixin, generics.GenericAPIView):
+    """
+    Retrieve the products in the cart, read in one round trip to the
+    cart store, or remove them all.
+    """
+    serializer_class = CartSerializer
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_cart_key()
+        return self.cart_response({} if key is None
+                                  else get_store().get(key))
+
+    @extend_schema(responses={status.HTTP_204_NO_CONTENT: None})
+    def delete(self, request, *args, **kwargs):
+        key = self.get_cart_key()
+        if key is not None:
+            get_store().clear(key)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CartItemCreateAPIView(CartMixin, generics.GenericAPIView):
+    """Add a quantity of a product to the cart."""
+    serializer_class = CartItemSerializer
+
+    @extend_schema(responses=CartSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            items = get_store().update(
+                self.get_cart_key(create=True),
+                serializer.validated_data['product'].pk,
+                serializer.validated_data['quantity'], add=True)
+        except CartFull:
+            raise ValidationError({'product': ['The cart is full.']})
+        return self.cart_response(items)
+
+
+class CartItemDetailAPIView(CartMixin, generics.GenericAPIView):
+    """Change the quantity of a product in the cart, or remove it."""
+    serializer_class = CartItemQuantitySerializer
+
+    @extend_schema(responses=CartSerializer)
+    def put(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        quantity = serializer.validated_data['quantity']
+        if quantity and not Product.objects.filter(
+                pk=kwargs['product_id']).exists():
+            raise NotFound()
+        try:
+            items = get_store().update(
+                self.get_cart_key(create=True), kwargs['product_id'],
+                quantity)
+        except CartFull:
+            raise ValidationError({'product': ['The cart is full.']})
+        return self.cart_response(items)
+
+    @extend_schema(responses=CartSerializer)
+    def delete(self, request, *args, **kwargs):
+        key = self.get_cart_key()
+        if key is None:
+            return self.cart_response({})
+        return self.cart_response(
+            get_store().update(key, kwargs['product_id'], 0))
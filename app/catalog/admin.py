@@ -0,0 +1,38 @@
+from django import forms
+from django.contrib import admin
+from catalog import models
+
+
+admin.site.register(models.Category)
+admin.site.register(models.ProductImage)
+
+
+class ProductAdminForm(forms.ModelForm):
+    add_stock = forms.IntegerField(
+        min_value=1, required=False,
+        help_text='Units to add to the stock, e.g. on a delivery.')
+
+    class Meta:
+        model = models.Product
+        fields = '__all__'
+
+
+@admin.register(models.Product)
+class ProductAdmin(admin.ModelAdmin):
+    # The stock of saved products is only changed by adding to it, so
+    # concurrent orders aren't overwritten.
+    form = ProductAdminForm
+
+    def get_readonly_fields(self, request, obj=None):
+        return ['stock'] if obj else []
+
+    def get_fields(self, request, obj=None):
+        fields = super().get_fields(request, obj)
+        return fields if obj else [
+            field for field in fields if field != 'add_stock']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        quantity = form.cleaned_data.get('add_stock')
+        if change and quantity:
+            models.Product.objects.add_stock({obj.pk: quantity})
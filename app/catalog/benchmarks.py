@@ -0,0 +1,139 @@
+"""
+Benchmark scenarios for the catalog API, run by the benchmark_api command.
+"""
+import random
+from decimal import Decimal
+
+from django.urls import reverse
+
+from core.benchmarks import Scenario, register, register_seeder
+from catalog.models import Category, FacetCount, Product
+
+
+PRODUCTS = 1_000_000
+BATCH_SIZE = 5000
+DEPARTMENTS = ['Electronics', 'Home', 'Garden', 'Sports', 'Toys', 'Books',
+               'Fashion', 'Beauty', 'Automotive', 'Office']
+SUBCATEGORIES = ['Accessories', 'Essentials', 'Premium', 'Outdoor',
+                 'Kids', 'Professional', 'Classic', 'Compact', 'Travel',
+                 'Smart']
+BRANDS = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark',
+          'Wayne', 'Wonka', 'Cyberdyne', 'Soylent']
+ADJECTIVES = ['Wireless', 'Portable', 'Ergonomic', 'Waterproof', 'Compact',
+              'Deluxe', 'Organic', 'Vintage', 'Digital', 'Foldable']
+NOUNS = ['Headphones', 'Speaker', 'Backpack', 'Lamp', 'Keyboard',
+         'Blender', 'Tent', 'Jacket', 'Watch', 'Camera', 'Bottle',
+         'Chair', 'Charger', 'Notebook', 'Helmet', 'Drill']
+SEARCHES = ['wireless headphones', 'camera', 'waterproof jacket', 'lamp',
+            'portable speaker', 'premium', 'ergonomic chair', 'tent']
+PREFIXES = ['hea', 'wirel', 'cam', 'back', 'ergo', 'spea']
+
+
+def seed_categories():
+    """Return the leaf categories, creating the tree if needed."""
+    if not Category.objects.filter(parent=None, name=DEPARTMENTS[0]):
+        for department in DEPARTMENTS:
+            parent = Category.objects.create(name=department)
+            for name in SUBCATEGORIES:
+                Category.objects.create(name=name, parent=parent)
+    return list(Category.objects.exclude(parent=None).order_by('id'))
+
+
+@register_seeder
+def seed_products(scale, stdout):
+    """Seed PRODUCTS products in a two level category tree."""
+    total = max(10, int(PRODUCTS * scale))
+    categories = seed_categories()
+    existing = Product.objects.count()
+    if existing >= total:
+        return
+    rng = random.Random(existing)
+    for start in range(existing, total, BATCH_SIZE):
+        numbers = range(start, min(start + BATCH_SIZE, total))
+        products = []
+        for number in numbers:
+            category = categories[number % len(categories)]
+            noun = rng.choice(NOUNS)
+            products.append(Product(
+                category=category,
+                category_path=category.path,
+                name=f'{rng.choice(ADJECTIVES)} {noun} {number}',
+                description=f'A {rng.choice(ADJECTIVES).lower()} '
+                            f'{noun.lower()} for every day.',
+                brand=rng.choice(BRANDS),
+                price=Decimal(rng.randrange(100, 200000)) / 100,
+                stock=rng.randrange(100),
+                popularity=rng.randrange(10000),
+            ))
+        created = Product.objects.bulk_create(products)
+        Product.objects.filter(
+            pk__gte=created[0].pk, pk__lte=created[-1].pk,
+        ).update_search_vectors()
+        stdout.write(f'Seeded {numbers.stop} of {total} products')
+    FacetCount.objects.rebuild()
+
+
+@register
+class ProductListScenario(Scenario):
+    """Read the first page of the most popular products."""
+
+    name = 'product-list'
+    query_budget = 1
+
+    def request(self, client, iteration):
+        return client.get(reverse('catalog:product-list'),
+                          {'ordering': '-popularity'})
+
+
+@register
+class CategoryProductListScenario(Scenario):
+    """Read a page of the cheapest products under a department."""
+
+    name = 'product-list-category'
+    # The category's path, then the page.
+    query_budget = 2
+
+    def setup(self, client):
+        self.categories = list(Category.objects.filter(
+            parent=None).values_list('id', flat=True))
+
+    def request(self, client, iteration):
+        return client.get(reverse('catalog:product-list'), {
+            'category': self.categories[iteration % len(self.categories)],
+            'ordering': 'price',
+        })
+
+
+@register
+class ProductSearchScenario(Scenario):
+    """Search products with whole words, ranked."""
+
+    name = 'product-search'
+    query_budget = 1
+
+    def request(self, client, iteration):
+        return client.get(reverse('catalog:product-search'),
+                          {'q': SEARCHES[iteration % len(SEARCHES)]})
+
+
+@register
+class ProductAutocompleteScenario(Scenario):
+    """Search products by the prefix typed so far."""
+
+    name = 'product-autocomplete'
+    query_budget = 1
+
+    def request(self, client, iteration):
+        return client.get(reverse('catalog:product-search'), {
+            'q': PREFIXES[iteration % len(PREFIXES)], 'page_size': 10})
+
+
+@register
+class ProductFacetsScenario(Scenario):
+    """Read the facet counts of the whole catalog."""
+
+    name = 'product-facets'
+    query_budget = 1
+
+    def request(self, client, iteration):
+        return client.get(reverse('catalog:product-facets'))
@@ -0,0 +1,121 @@
+"""
+Product image renditions.
+
+Originals and renditions are stored under the SHA-256 of their content,
+so identical files are stored once and never change, and can be cached
+forever. render_image() runs in worker processes, so this module must
+not import models.
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+
+DEFAULTS = {
+    # Renditions by name, each fitting a square of this many pixels.
+    'SIZES': {'thumbnail': 160, 'medium': 480, 'large': 1200},
+    # Formats of each rendition, with their encoder quality.
+    'FORMATS': {'WEBP': 80, 'JPEG': 85},
+    'MAX_UPLOAD_SIZE': 20 * 1024 * 1024,
+    # Larger images are rejected, see Image.MAX_IMAGE_PIXELS.
+    'MAX_PIXELS': 50_000_000,
+    'DIRECTORY': 'products',
+    # Worker processes rendering images, the CPU count by default.
+    'WORKERS': None,
+    'BATCH_SIZE': 20,
+    # Cache-Control max-age of the stored files.
+    'CACHE_MAX_AGE': 365 * 86400,
+}
+
+# Formats accepted for upload and the extensions they are stored under.
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+CHUNK_SIZE = 64 * 1024
+
+
+def get_image_setting(name):
+    """Return a value from settings.PRODUCT_IMAGES or its default."""
+    return getattr(settings, 'PRODUCT_IMAGES', {}).get(name, DEFAULTS[name])
+
+
+def content_name(kind, digest, image_format):
+    """
+    Return the storage name of a file of a kind ('originals' or
+    'renditions') with a SHA-256 digest.
+    """
+    return (f"{get_image_setting('DIRECTORY')}/{kind}/{digest[:2]}/"
+            f"{digest}.{EXTENSIONS[image_format]}")
+
+
+def file_digest(file):
+    """Return the SHA-256 of an uploaded file, reading it in chunks."""
+    digest = getattr(file, 'sha256', None)
+    if digest is not None:
+        return digest.hexdigest()
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def rendition_specs():
+    """Return the (size name, pixels, format, quality) of renditions."""
+    return [(name, pixels, image_format, quality)
+            for name, pixels in get_image_setting('SIZES').items()
+            for image_format, quality in get_image_setting(
+                'FORMATS').items()]
+
+
+def fit(size, pixels):
+    """Return size scaled down to fit a square of pixels, keeping ratio."""
+    width, height = size
+    scale = min(1, pixels / max(width, height))
+    return (max(1, round(width * scale)), max(1, round(height * scale)))
+
+
+def render_image(source, specs):
+    """
+    Render an image, given as a path or bytes, at each of the specs from
+    rendition_specs(). Return a list of (size name, format, width,
+    height, digest, data).
+
+    The image is decoded once, at the smallest JPEG scale still larger
+    than the biggest rendition (draft mode), which is several times
+    faster than decoding full-size photos.
+    """
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    with Image.open(source) as image:
+        largest = max(pixels for _, pixels, _, _ in specs)
+        image.draft('RGB', fit(image.size, largest))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = (image.mode in ('RGBA', 'LA', 'PA')
+                     or 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    resized = {}
+    results = []
+    for name, pixels, image_format, quality in specs:
+        if pixels not in resized:
+            resized[pixels] = image.resize(
+                fit(image.size, pixels), Image.Resampling.LANCZOS,
+                reducing_gap=3.0)
+        rendition = resized[pixels]
+        if image_format == 'JPEG' and rendition.mode == 'RGBA':
+            background = Image.new('RGB', rendition.size, 'white')
+            background.paste(rendition, mask=rendition.getchannel('A'))
+            rendition = background
+        output = BytesIO()
+        if image_format == 'JPEG':
+            rendition.save(output, 'JPEG', quality=quality, optimize=True,
+                           progressive=True)
+        else:
+            rendition.save(output, image_format, quality=quality)
+        data = output.getvalue()
+        results.append((name, image_format, *rendition.size,
+                        hashlib.sha256(data).hexdigest(), data))
+    return results
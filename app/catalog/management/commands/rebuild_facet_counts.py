@@ -0,0 +1,18 @@
+"""
+Django command to recount the catalog facets.
+"""
+from django.core.management.base import BaseCommand
+
+from catalog.models import FacetCount
+
+
+class Command(BaseCommand):
+    """Django command to recount the catalog facets."""
+
+    help = ('Recount the facet counts from the products, e.g. after bulk '
+            "imports or changes to CATALOG['PRICE_BUCKETS'].")
+
+    def handle(self, *args, **options):
+        FacetCount.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {FacetCount.objects.count()} facet counts.'))
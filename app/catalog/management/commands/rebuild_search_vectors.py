@@ -0,0 +1,18 @@
+"""
+Django command to recompute the product search vectors.
+"""
+from django.core.management.base import BaseCommand
+
+from catalog.models import Product
+
+
+class Command(BaseCommand):
+    """Django command to recompute the product search vectors."""
+
+    help = ('Recompute the search vectors of all products, e.g. after bulk '
+            "imports or changes to CATALOG['SEARCH_CONFIG'].")
+
+    def handle(self, *args, **options):
+        count = Product.objects.update_search_vectors()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the search vectors of {count} products.'))
@@ -0,0 +1,75 @@
+"""
+Django command to render the pending product images.
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+
+from catalog.images import get_image_setting
+from catalog.models import ProductImage
+
+
+class Command(BaseCommand):
+    """Django command to render the pending product images."""
+
+    help = ('Render uploaded product images at the configured sizes and '
+            'formats in a pool of worker processes. Several instances '
+            'can run at once.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int,
+            help="Worker processes, PRODUCT_IMAGES['WORKERS'] or the CPU "
+                 "count by default.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help="Images rendered per transaction, "
+                 "PRODUCT_IMAGES['BATCH_SIZE'] by default.",
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            help='Keep rendering, waiting this many seconds whenever no '
+                 'images were pending.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or get_image_setting('BATCH_SIZE')
+        total = 0
+        # Images left pending by a worker that died are rendered one at a
+        # time, so the image breaking the pool is marked failed.
+        single = 0
+        executor = self.executor(options)
+        try:
+            while True:
+                try:
+                    count = ProductImage.objects.render_pending(
+                        executor, 1 if single else batch_size)
+                except BrokenProcessPool:
+                    self.stderr.write('A worker process died, restarting '
+                                      'the pool.')
+                    executor.shutdown()
+                    executor = self.executor(options)
+                    single = batch_size
+                    continue
+                single = max(single - 1, 0)
+                total += count
+                if count:
+                    continue
+                if options['interval'] is None:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(f'Rendered {total} images.'))
+
+    def executor(self, options):
+        # Spawned rather than forked, so workers don't share the database
+        # connection.
+        return ProcessPoolExecutor(
+            options['workers'] or get_image_setting('WORKERS'),
+            mp_context=multiprocessing.get_context('spawn'),
+        )
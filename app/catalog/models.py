@@ -0,0 +1,723 @@
+"""
+Database models for the product catalog.
+"""
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, models, router, transaction
+from django.db.models import (
+    Case,
+    CharField,
+    Count,
+    DecimalField,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Concat, Round, Substr
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+from PIL import Image
+
+from .images import (
+    content_name,
+    file_digest,
+    get_image_setting,
+    render_image,
+    rendition_specs,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULTS = {
+    # Upper bounds of the price facet buckets.
+    'PRICE_BUCKETS': [10, 25, 50, 100, 250, 500, 1000],
+    # Text search configuration of the product search vectors.
+    'SEARCH_CONFIG': 'english',
+}
+
+# FacetCount.category_path of the counts over the whole catalog.
+ROOT_PATH = ''
+
+# Review ratings, counted by the ratings_<stars> fields of products.
+RATING_STARS = range(1, 6)
+
+# Product fields only ProductManager writes, with F() expressions, and
+# saves of existing products leave alone, so they don't write back stale
+# values. The stock is set when a product is created, and changed with
+# add_stock(), reserve_stock() and release_stock() after that.
+COUNTER_FIELDS = frozenset([
+    'stock', 'average_rating', 'ratings_count', 'ratings_sum',
+    *(f'ratings_{stars}' for stars in RATING_STARS),
+])
+
+
+def get_catalog_setting(name):
+    """Return a value from settings.CATALOG or its default."""
+    return getattr(settings, 'CATALOG', {}).get(name, DEFAULTS[name])
+
+
+def price_buckets():
+    """Return a list of (label, upper bound) price buckets."""
+    bounds = [Decimal(bound)
+              for bound in get_catalog_setting('PRICE_BUCKETS')]
+    buckets = [(f'{lower}-{upper}', upper)
+               for lower, upper in zip([0] + bounds, bounds)]
+    return buckets + [(f'{bounds[-1]}+', None)]
+
+
+def price_bucket(price):
+    """Return the label of the price bucket of a price."""
+    for label, upper in price_buckets():
+        if upper is None or price < upper:
+            return label
+
+
+def search_vector(name, category, description):
+    """
+    Return the weighted tsvector of a product's name, category name and
+    description, given as field names or expressions.
+    """
+    config = get_catalog_setting('SEARCH_CONFIG')
+    return (SearchVector(name, weight='A', config=config)
+            + SearchVector(category, weight='B', config=config)
+            + SearchVector(description, weight='C', config=config))
+
+
+def ancestor_paths(path):
+    """Return the root path and the paths of a category and its parents."""
+    parts = path.split('/')[:-1]
+    return [ROOT_PATH] + ['/'.join(parts[:depth]) + '/'
+                          for depth in range(1, len(parts) + 1)]
+
+
+class Category(models.Model):
+    """
+    Product category.
+
+    `path` holds the ids from the root to the category, e.g. '1/5/', so
+    the categories and products under a category are the rows whose path
+    starts with its path, one range scan of the path indexes.
+    """
+    name = models.CharField(max_length=255)
+    parent = models.ForeignKey('self', on_delete=models.PROTECT,
+                               null=True, blank=True,
+                               related_name='children')
+    path = models.CharField(max_length=255, editable=False, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'categories'
+        indexes = [
+            models.Index(fields=['path'], name='category_path_idx',
+                         opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        """
+        Save the category and set its path. Moving a category to another
+        parent rewrites the paths of its subtree, products and facet
+        counts. Renaming it updates the search vectors of its products.
+        """
+        using = kwargs.get('using') or router.db_for_write(type(self))
+        with transaction.atomic(using=using):
+            old_path, old_name = '', None
+            if self.pk is not None:
+                old_path, old_name = type(self).objects.using(using).filter(
+                    pk=self.pk).select_for_update().values_list(
+                    'path', 'name').first() or ('', None)
+            parent_path = self.parent.path if self.parent else ''
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError(
+                    "A category can't be moved under itself.")
+
+            if old_path:
+                self.path = f'{parent_path}{self.pk}/'
+                super().save(*args, **kwargs)
+                if self.path != old_path:
+                    self.move_subtree(using, old_path)
+                if self.name != old_name:
+                    self.products.using(using).update_search_vectors()
+            else:
+                super().save(*args, **kwargs)
+                self.path = f'{parent_path}{self.pk}/'
+                type(self).objects.using(using).filter(pk=self.pk).update(
+                    path=self.path)
+
+    def move_subtree(self, using, old_path):
+        def replace_prefix(field):
+            return Concat(Value(self.path),
+                          Substr(field, len(old_path) + 1),
+                          output_field=CharField())
+
+        type(self).objects.using(using).filter(
+            path__startswith=old_path).update(path=replace_prefix('path'))
+        Product.objects.using(using).filter(
+            category_path__startswith=old_path).update(
+            category_path=replace_prefix('category_path'))
+        FacetCount.objects.db_manager(using).move(old_path, self.path)
+
+
+class ProductQuerySet(models.QuerySet):
+    """Queryset for products."""
+
+    def update_search_vectors(self):
+        """Recompute the search vectors, e.g. after bulk inserts."""
+        category_name = Subquery(Category.objects.filter(
+            pk=OuterRef('category_id')).values('name')[:1])
+        return self.update(search_vector=search_vector(
+            'name', category_name, 'description'))
+
+
+class OutOfStock(Exception):
+    """Raised when products don't have the stock requested."""
+
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(self.product_ids)
+
+
+class ProductManager(models.Manager.from_queryset(ProductQuerySet)):
+    """Manager for products, not loading the search vectors."""
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
+    def reserve_stock(self, quantities):
+        """
+        Take {product_id: quantity} from the stock of products, all or
+        nothing. Each product's stock is decremented only if it's enough,
+        in the same statement, so concurrent orders can't oversell. Raise
+        OutOfStock with the products short of stock.
+
+        The product rows stay locked until the transaction ends, so call
+        it last in a transaction.
+        """
+        using = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            changed = self._add_stock(
+                using, {product_id: -quantity
+                        for product_id, quantity in quantities.items()})
+            if len(changed) < len(quantities):
+                raise OutOfStock(quantities.keys() - changed)
+
+    def add_stock(self, quantities):
+        """
+        Add {product_id: quantity} to the stock of products, e.g. on a
+        delivery, in one statement.
+        """
+        if any(quantity <= 0 for quantity in quantities.values()):
+            raise ValueError('Stock is added in positive quantities.')
+        using = self._db or router.db_for_write(self.model)
+        self._add_stock(using, quantities)
+
+    def release_stock(self, quantities):
+        """Return {product_id: quantity} to the stock of products."""
+        self.add_stock(quantities)
+
+    def adjust_ratings(self, product_id, deltas):
+        """
+        Add {stars: delta} to the number of ratings of a product, updating
+        its count, sum, histogram and average in one statement.
+        """
+        deltas = {stars: delta for stars, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        count = F('ratings_count') + sum(deltas.values())
+        total = F('ratings_sum') + sum(
+            stars * delta for stars, delta in deltas.items())
+        using = self._db or router.db_for_write(self.model)
+        self.using(using).filter(pk=product_id).update(
+            ratings_count=count,
+            ratings_sum=total,
+            average_rating=Case(
+                When(GreaterThan(count, 0), then=Round(
+                    Cast(total, DecimalField(max_digits=12,
+                                             decimal_places=2)) / count,
+                    1)),
+                default=Value(0),
+                output_field=DecimalField(max_digits=2, decimal_places=1),
+            ),
+            **{f'ratings_{stars}': F(f'ratings_{stars}') + delta
+               for stars, delta in deltas.items()},
+        )
+
+    def _add_stock(self, using, deltas):
+        """
+        Add {product_id: delta} to the stock of products whose stock
+        stays non-negative, and return their ids.
+        """
+        if not deltas:
+            return set()
+        ids = sorted(deltas)
+        table = self.model._meta.db_table
+        with connections[using].cursor() as cursor:
+            if len(ids) > 1:
+                # Rows are locked in id order, so concurrent orders of the
+                # same products can't deadlock.
+                cursor.execute(
+                    f"SELECT id FROM {table} "
+                    f"WHERE id IN ({', '.join(['%s'] * len(ids))}) "
+                    f"ORDER BY id FOR UPDATE", ids)
+            cursor.execute(
+                f"UPDATE {table} AS product "
+                f"SET stock = product.stock + delta.value "
+                f"FROM (VALUES {', '.join(['(%s, %s)'] * len(ids))}) "
+                f"AS delta (id, value) "
+                f"WHERE product.id = delta.id "
+                f"AND product.stock + delta.value >= 0 "
+                f"RETURNING product.id",
+                [param for product_id in ids
+                 for param in (product_id, deltas[product_id])])
+            return {row[0] for row in cursor.fetchall()}
+
+
+class Product(models.Model):
+    """Product for sale."""
+    category = models.ForeignKey(Category, on_delete=models.PROTECT,
+                                 related_name='products')
+    # Copy of category.path, to filter products by subtree without a join.
+    category_path = models.CharField(max_length=255, editable=False)
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    brand = models.CharField(max_length=100, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    stock = models.PositiveIntegerField(default=0)
+    # Review aggregates, kept up to date by review.models.Review, so
+    # listings read ratings without touching the reviews.
+    average_rating = models.DecimalField(max_digits=2, decimal_places=1,
+                                         default=0, editable=False)
+    ratings_count = models.PositiveIntegerField(default=0, editable=False)
+    ratings_sum = models.PositiveIntegerField(default=0, editable=False)
+    # Number of reviews with each of RATING_STARS.
+    ratings_1 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_2 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_3 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_4 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_5 = models.PositiveIntegerField(default=0, editable=False)
+    popularity = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Computed by the database on save, see search_vector().
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductManager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='product_search_idx'),
+            # Keyset pagination of the listing sort orders, scanned in
+            # either direction.
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['created_at', 'id'],
+                         name='product_created_id_idx'),
+            models.Index(fields=['popularity', 'id'],
+                         name='product_popularity_id_idx'),
+            models.Index(fields=['category_path'],
+                         name='product_category_path_idx',
+                         opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Facets the product is counted under, to adjust the counts when
+        # it's saved or deleted.
+        instance._counted_facets = instance.facets()
+        # Text of the search vector, to update it only when it changes.
+        if not {'name', 'description'} & instance.get_deferred_fields():
+            instance._search_text = instance.search_text()
+        # Stock as loaded, to reject saves changing it, see save().
+        instance._saved_stock = instance.__dict__.get('stock')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        if fields is None or 'stock' in fields:
+            self._saved_stock = self.__dict__.get('stock')
+
+    def save(self, *args, **kwargs):
+        self.category_path = self.category.path
+        self.price = self._meta.get_field('price').to_python(self.price)
+        search_text = self.search_text()
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is None and not self._state.adding
+                and not kwargs.get('force_insert')):
+            if (self.__dict__.get('stock')
+                    != getattr(self, '_saved_stock', None)):
+                raise ValueError(
+                    'The stock of saved products is changed with '
+                    'Product.objects.add_stock(), reserve_stock() and '
+                    'release_stock().')
+            deferred = self.get_deferred_fields()
+            update_fields = kwargs['update_fields'] = {
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in COUNTER_FIELDS
+                and field.attname not in deferred}
+        if getattr(self, '_search_text', None) != search_text:
+            # Built from values rather than columns, so an UPDATE doesn't
+            # index the previous name and description.
+            self.search_vector = search_vector(
+                Value(self.name), Value(self.category.name),
+                Value(self.description))
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_vector'}
+        super().save(*args, **kwargs)
+        # Deferred again, so it's loaded from the database if accessed and
+        # left out of the next save.
+        self.__dict__.pop('search_vector', None)
+        self._search_text = search_text
+        self._saved_stock = self.__dict__.get('stock')
+
+    def search_text(self):
+        return (self.name, self.description, self.category_id)
+
+    @property
+    def rating_histogram(self):
+        """Return the number of reviews with each of RATING_STARS."""
+        return [getattr(self, f'ratings_{stars}') for stars in RATING_STARS]
+
+    def facets(self):
+        """
+        Return the (category_path, facet, value) keys of the facet counts
+        including this product, or None if their fields aren't loaded.
+        """
+        deferred = self.get_deferred_fields()
+        if {'category_path', 'brand', 'price'} & deferred:
+            return None
+        bucket = price_bucket(self.price)
+        return [(path, facet, value)
+                for path in ancestor_paths(self.category_path)
+                for facet, value in [('brand', self.brand),
+                                     ('price', bucket)]]
+
+
+def image_source(name):
+    """
+    Return the path of a stored file for render_image(), or its content
+    if the storage has no local paths.
+    """
+    try:
+        return default_storage.path(name)
+    except NotImplementedError:
+        with default_storage.open(name) as file:
+            return file.read()
+
+
+def save_content(name, content):
+    """
+    Store a file under its content-addressed name unless it's stored
+    already, and return the name. Local files are saved under a temporary
+    name and renamed into place, so identical uploads stored at once
+    don't leave a renamed copy and a partly written file is never read.
+    """
+    if default_storage.exists(name):
+        return name
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        saved = default_storage.save(name, content)
+        if saved != name:
+            default_storage.delete(saved)
+        return name
+    temp = default_storage.save(f'{name}.part', content)
+    os.replace(default_storage.path(temp), path)
+    return name
+
+
+class ProductImageManager(models.Manager):
+    """Manager for product images."""
+
+    def add(self, product, file, image_format, width, height, position=0):
+        """
+        Store an uploaded image of a product and return it. Its renditions
+        are copied from an identical image rendered before, otherwise it's
+        left pending and a render_images job is enqueued with it.
+        """
+        from .tasks import render_images
+
+        using = self._db or router.db_for_write(self.model)
+        digest = file_digest(file)
+        file.seek(0)
+        original = save_content(
+            content_name('originals', digest, image_format), file)
+        with transaction.atomic(using=using):
+            image = self.using(using).create(
+                product=product, original=original, digest=digest,
+                width=width, height=height, position=position)
+            self._copy_renditions(using, image)
+            if image.status == self.model.Status.PENDING:
+                render_images.enqueue(using=using)
+        return image
+
+    def _copy_renditions(self, using, image):
+        wanted = {(name, image_format.lower())
+                  for name, _, image_format, _ in rendition_specs()}
+        source = self.using(using).filter(
+            digest=image.digest, status=self.model.Status.READY,
+        ).exclude(pk=image.pk).prefetch_related('renditions').first()
+        if source is None:
+            return
+        renditions = {(rendition.size, rendition.format): rendition
+                      for rendition in source.renditions.all()}
+        if not wanted <= renditions.keys():
+            return
+        ProductImageRendition.objects.using(using).bulk_create([
+            ProductImageRendition(
+                image=image, size=rendition.size, format=rendition.format,
+                width=rendition.width, height=rendition.height,
+                file=rendition.file.name)
+            for key, rendition in renditions.items() if key in wanted
+        ])
+        image.status = self.model.Status.READY
+        image.save(update_fields=['status'])
+
+    def render_pending(self, executor, batch_size=None):
+        """
+        Render a batch of pending images in an executor, e.g. a process
+        pool, and return how many were rendered. Images are claimed with
+        SELECT ... FOR UPDATE SKIP LOCKED, so several renderers can run at
+        once.
+
+        If a worker process dies, e.g. on a decoder crash, the batch is
+        saved and BrokenProcessPool raised. The image that broke the pool
+        can't be told apart from the rest of the batch, so they're left
+        pending, to be rendered one at a time by a new executor; a single
+        image breaking the pool is marked failed.
+        """
+        using = self._db or router.db_for_write(self.model)
+        if batch_size is None:
+            batch_size = get_image_setting('BATCH_SIZE')
+        specs = rendition_specs()
+        with transaction.atomic(using=using):
+            images = list(self.using(using).filter(
+                status=self.model.Status.PENDING,
+            ).select_for_update(skip_locked=True).order_by('id')[
+                :batch_size])
+            futures = [
+                (image, executor.submit(
+                    render_image, image_source(image.original.name), specs))
+                for image in images
+            ]
+            renditions = []
+            broken = False
+            for image, future in futures:
+                try:
+                    results = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    if len(images) > 1:
+                        continue
+                    logger.exception('Rendering image %s failed.', image.pk)
+                    image.status = self.model.Status.FAILED
+                    continue
+                except (OSError, ValueError, Image.DecompressionBombError):
+                    logger.exception('Rendering image %s failed.', image.pk)
+                    image.status = self.model.Status.FAILED
+                    continue
+                for name, image_format, width, height, digest, data in (
+                        results):
+                    file = save_content(
+                        content_name('renditions', digest, image_format),
+                        ContentFile(data))
+                    renditions.append(ProductImageRendition(
+                        image=image, size=name, format=image_format.lower(),
+                        width=width, height=height, file=file))
+                image.status = self.model.Status.READY
+            # Images put back to pending are rendered again from scratch.
+            ProductImageRendition.objects.using(using).filter(
+                image__in=images).delete()
+            ProductImageRendition.objects.using(using).bulk_create(
+                renditions)
+            self.using(using).bulk_update(images, ['status'])
+        if broken:
+            raise BrokenProcessPool('A worker process died rendering images.')
+        return len(images)
+
+
+class ProductImage(models.Model):
+    """
+    Image of a product, stored under the SHA-256 of its content and
+    rendered at the configured sizes and formats.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='images', db_index=False)
+    original = models.FileField(max_length=255, editable=False)
+    digest = models.CharField(max_length=64, editable=False)
+    width = models.PositiveIntegerField(editable=False)
+    height = models.PositiveIntegerField(editable=False)
+    position = models.PositiveSmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=Status.choices,
+                              default=Status.PENDING)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = ProductImageManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'position', 'id'],
+                         name='product_image_position_idx'),
+            models.Index(fields=['digest'], name='product_image_digest_idx'),
+            # Queue of images for ProductImageManager.render_pending().
+            models.Index(fields=['id'], name='product_image_pending_idx',
+                         condition=Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}: {self.original.name}'
+
+
+class ProductImageRendition(models.Model):
+    """Resized copy of a product image, stored under its SHA-256."""
+    image = models.ForeignKey(ProductImage, on_delete=models.CASCADE,
+                              related_name='renditions', db_index=False)
+    size = models.CharField(max_length=20)
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.FileField(max_length=255)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image', 'size', 'format'],
+                                    name='unique_image_rendition'),
+        ]
+
+
+class FacetCountManager(models.Manager):
+    """Manager for facet counts."""
+
+    def adjust(self, keys, delta):
+        """
+        Add delta to the counts of the (category_path, facet, value) keys,
+        in one INSERT ... ON CONFLICT statement.
+        """
+        if keys:
+            self.add(dict.fromkeys(keys, delta))
+
+    def add(self, deltas):
+        """
+        Add {(category_path, facet, value): delta} to the counts, in one
+        INSERT ... ON CONFLICT statement.
+        """
+        # Rows are locked in key order, so concurrent calls can't deadlock.
+        keys = sorted(key for key, delta in deltas.items() if delta)
+        if not keys:
+            return
+        table = self.model._meta.db_table
+        row = '(%s, %s, %s, %s)'
+        sql = (
+            f'INSERT INTO {table} (category_path, facet, value, count) '
+            f"VALUES {', '.join([row] * len(keys))} "
+            f'ON CONFLICT (category_path, facet, value) '
+            f'DO UPDATE SET count = {table}.count + EXCLUDED.count'
+        )
+        params = [param for key in keys for param in (*key, deltas[key])]
+        using = self._db or router.db_for_write(self.model)
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def move(self, old_path, new_path):
+        """
+        Move the counts of a category subtree from old_path to new_path,
+        without scanning products: the subtree's rows are renamed, and its
+        totals, the counts of old_path, are moved from the old ancestors to
+        the new ones. Call it in the transaction moving the products.
+        """
+        using = self._db or router.db_for_write(self.model)
+        totals = list(self.using(using).filter(
+            category_path=old_path,
+        ).select_for_update().order_by('facet', 'value').values_list(
+            'facet', 'value', 'count'))
+        self.using(using).filter(category_path__startswith=old_path).update(
+            category_path=Concat(Value(new_path),
+                                 Substr('category_path', len(old_path) + 1),
+                                 output_field=CharField()))
+        deltas = defaultdict(int)
+        for facet, value, count in totals:
+            for path in ancestor_paths(old_path)[:-1]:
+                deltas[path, facet, value] -= count
+            for path in ancestor_paths(new_path)[:-1]:
+                deltas[path, facet, value] += count
+        self.db_manager(using).add(deltas)
+
+    def rebuild(self):
+        """
+        Recount all facets with one grouped scan of the products, rolled
+        up to the parent categories in Python. The table is locked against
+        adjust() for the scan and the rewrite, so no change is lost, while
+        reads go on.
+        """
+        using = self._db or router.db_for_write(self.model)
+        bucket = Case(
+            *[When(price__lt=upper, then=Value(label))
+              for label, upper in price_buckets() if upper is not None],
+            default=Value(price_buckets()[-1][0]),
+            output_field=CharField(),
+        )
+        products = Product.objects.using(using)
+        grouped = {
+            'brand': products.values_list('category_path', 'brand'),
+            'price': products.annotate(bucket=bucket).values_list(
+                'category_path', 'bucket'),
+        }
+        with transaction.atomic(using=using):
+            with connections[using].cursor() as cursor:
+                cursor.execute(
+                    f'LOCK TABLE {self.model._meta.db_table} '
+                    f'IN SHARE ROW EXCLUSIVE MODE')
+            counts = defaultdict(int)
+            for facet, rows in grouped.items():
+                for path, value, count in rows.annotate(
+                        count=Count('id')).order_by():
+                    for ancestor in ancestor_paths(path):
+                        counts[ancestor, facet, value] += count
+            self.using(using).all().delete()
+            self.using(using).bulk_create(
+                [self.model(category_path=path, facet=facet, value=value,
+                            count=count)
+                 for (path, facet, value), count in counts.items()],
+                batch_size=1000,
+            )
+
+
+class FacetCount(models.Model):
+    """Number of products under a category with a facet value."""
+    category_path = models.CharField(max_length=255)
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+
+    objects = FacetCountManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category_path', 'facet', 'value'],
+                name='unique_facet_count',
+            ),
+        ]
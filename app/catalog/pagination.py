@@ -0,0 +1,160 @@
+"""
+Pagination classes for the catalog API.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over (sort field, id).
+
+    The cursor holds the sort value and id of the last row of the page,
+    and the next page is fetched with `(value, id) > cursor`, written as
+    `value >= v AND NOT (value = v AND id <= id)` so it's a range scan of
+    the (field, id) index. Deep pages cost the same as the first one.
+    Pages only link forward.
+    """
+    # Values of the ordering parameter: (sort field, descending).
+    orderings = {}
+    default_ordering = None
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = request.query_params.get(
+            self.ordering_query_param, self.default_ordering)
+        if self.ordering not in self.orderings:
+            raise ValidationError({self.ordering_query_param: [
+                f'Select one of: {", ".join(self.orderings)}.']})
+        field, descending = self.orderings[self.ordering]
+        page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request, queryset.model, field)
+        if cursor is not None:
+            value, pk = cursor
+            after, up_to = ('lte', 'gte') if descending else ('gte', 'lte')
+            queryset = queryset.filter(**{f'{field}__{after}': value}) \
+                .exclude(**{field: value, f'pk__{up_to}': pk})
+        sign = '-' if descending else ''
+        rows = list(queryset.order_by(f'{sign}{field}', f'{sign}pk')[
+            :page_size + 1])
+
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            value = self.get_value(last, field)
+            # Decimals and datetimes are sent as strings, which to_python()
+            # parses back without losing precision.
+            self.next_position = [
+                value if isinstance(value, int) else str(value),
+                self.get_value(last, 'id'),
+            ]
+        return rows
+
+    def get_value(self, row, name):
+        return row[name] if isinstance(row, dict) else getattr(row, name)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request, model, field):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            value, pk = json.loads(urlsafe_b64decode(encoded.encode()))
+            return self.to_python(model, field, value), int(pk)
+        except (BinasciiError, DjangoValidationError, TypeError,
+                ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, model, field, value):
+        """Return the sort value of a cursor."""
+        return model._meta.get_field(field).to_python(value)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        cursor = urlsafe_b64encode(
+            json.dumps(self.next_position).encode()).decode()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.ordering_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Sort order.',
+                'schema': {'type': 'string', 'enum': list(self.orderings),
+                           'default': self.default_ordering},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class ProductKeysetPagination(KeysetPagination):
+    """Keyset pagination of product listings."""
+    orderings = {
+        'price': ('price', False),
+        '-price': ('price', True),
+        '-created_at': ('created_at', True),
+        '-popularity': ('popularity', True),
+    }
+    default_ordering = '-created_at'
+
+
+class SearchKeysetPagination(KeysetPagination):
+    """Keyset pagination of search results, best match first."""
+    orderings = {'rank': ('rank', True)}
+    default_ordering = 'rank'
+    page_size = 20
+    max_page_size = 100
+
+    def to_python(self, model, field, value):
+        return float(value)
@@ -0,0 +1,76 @@
+"""
+Ranked full-text product search.
+
+Products match when their search vector contains all the search terms,
+the last one as a prefix so a query typed so far autocompletes. Matches
+are ranked by ts_rank over the weighted vector, so terms found in the
+name count most, then in the category name, then in the description.
+
+With the pg_trgm extension installed, products whose name contains a
+word similar to the query also match, and the similarity is added to
+the rank, which tolerates typos. Without it, the search is exact and
+prefix matching only.
+"""
+import re
+import threading
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+from catalog.models import get_catalog_setting
+
+
+MAX_TERMS = 10
+
+TERM_RE = re.compile(r'\w+')
+
+_trigram_available = {}
+_trigram_lock = threading.Lock()
+
+
+def parse_terms(text):
+    """Return the lowercase words of a query, at most MAX_TERMS."""
+    return TERM_RE.findall(text.lower())[:MAX_TERMS]
+
+
+def build_query(terms):
+    """Return a tsquery matching all the terms, the last as a prefix."""
+    # Terms are made of word characters only, so they can't inject
+    # tsquery operators.
+    raw = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+    return SearchQuery(raw, search_type='raw',
+                       config=get_catalog_setting('SEARCH_CONFIG'))
+
+
+def trigram_available(alias):
+    """Return whether the pg_trgm extension is installed in a database."""
+    with _trigram_lock:
+        if alias not in _trigram_available:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                _trigram_available[alias] = cursor.fetchone() is not None
+        return _trigram_available[alias]
+
+
+def search(queryset, terms):
+    """
+    Filter queryset to the products matching the terms, annotated with
+    their `rank`.
+    """
+    query = build_query(terms)
+    rank = SearchRank(F('search_vector'), query)
+    condition = Q(search_vector=query)
+    if trigram_available(queryset.db):
+        text = ' '.join(terms)
+        rank = rank + TrigramWordSimilarity(text, 'name')
+        condition |= Q(name__trigram_word_similar=text)
+    # As double precision, the rank sent in cursors compares equal to the
+    # one computed for the next page.
+    return queryset.annotate(rank=Cast(rank, FloatField())).filter(condition)
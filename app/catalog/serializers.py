@@ -0,0 +1,107 @@
+"""
+Serializers for the catalog API.
+"""
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+
+from core.instrumentation import TimedSerializerMixin
+from catalog.images import EXTENSIONS, get_image_setting
+from catalog.models import (
+    Category,
+    Product,
+    ProductImage,
+    ProductImageRendition,
+)
+
+
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for categories."""
+
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'parent', 'path']
+        read_only_fields = fields
+
+
+class ProductSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for products in listings."""
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'brand', 'price', 'category', 'stock',
+                  'average_rating', 'ratings_count', 'popularity',
+                  'created_at']
+        read_only_fields = fields
+
+
+class ProductImageRenditionSerializer(TimedSerializerMixin,
+                                      serializers.ModelSerializer):
+    """Serializer for the renditions of product images."""
+    url = serializers.FileField(source='file', read_only=True)
+
+    class Meta:
+        model = ProductImageRendition
+        fields = ['size', 'format', 'width', 'height', 'url']
+        read_only_fields = fields
+
+
+class ProductImageSerializer(TimedSerializerMixin,
+                             serializers.ModelSerializer):
+    """Serializer for product images."""
+    renditions = ProductImageRenditionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ProductImage
+        fields = ['id', 'position', 'width', 'height', 'status',
+                  'original', 'renditions']
+        read_only_fields = fields
+
+
+class ProductImageUploadSerializer(TimedSerializerMixin,
+                                   serializers.Serializer):
+    """Serializer for uploading a product image."""
+    file = serializers.FileField()
+    position = serializers.IntegerField(min_value=0, max_value=32767,
+                                        default=0)
+
+    def validate_file(self, file):
+        """Check the image format and size from its header only."""
+        try:
+            with Image.open(file) as image:
+                image_format, size = image.format, image.size
+        except (UnidentifiedImageError, Image.DecompressionBombError):
+            raise serializers.ValidationError(
+                'Upload a valid JPEG, PNG, WebP or GIF image.')
+        if image_format not in EXTENSIONS:
+            raise serializers.ValidationError(
+                'Upload a valid JPEG, PNG, WebP or GIF image.')
+        if size[0] * size[1] > get_image_setting('MAX_PIXELS'):
+            raise serializers.ValidationError('The image is too large.')
+        file.image_format, file.image_size = image_format, size
+        return file
+
+
+class ProductDetailSerializer(ProductSerializer):
+    """Serializer for product details."""
+    images = ProductImageSerializer(many=True, read_only=True,
+                                    source='ready_images')
+    rating_histogram = serializers.ListField(
+        child=serializers.IntegerField(), read_only=True,
+        help_text='Number of reviews rating the product 1 to 5 stars.')
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + [
+            'description', 'rating_histogram', 'images']
+        read_only_fields = fields
+
+
+class FacetValueSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Number of products with a facet value."""
+    value = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class FacetsSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Facet counts of the products under a category."""
+    brand = FacetValueSerializer(many=True)
+    price = FacetValueSerializer(many=True)
@@ -0,0 +1,30 @@
+"""
+Signal handlers for the catalog app.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from catalog.models import FacetCount, Product
+
+
+@receiver(post_save, sender=Product)
+def count_saved_product(sender, instance, created, using, **kwargs):
+    """
+    Move a saved product's facet counts from its previous facets to the
+    current ones. Products saved without being loaded from the database,
+    or created in bulk, aren't counted until the counts are rebuilt.
+    """
+    old = None if created else getattr(instance, '_counted_facets', None)
+    new = instance.facets()
+    if old != new:
+        counts = FacetCount.objects.db_manager(using)
+        counts.adjust(old, -1)
+        counts.adjust(new, 1)
+    instance._counted_facets = new
+
+
+@receiver(post_delete, sender=Product)
+def uncount_deleted_product(sender, instance, using, **kwargs):
+    """Remove a deleted product from its facet counts."""
+    facets = getattr(instance, '_counted_facets', None) or instance.facets()
+    FacetCount.objects.db_manager(using).adjust(facets, -1)
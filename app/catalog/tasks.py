@@ -0,0 +1,19 @@
+"""
+Background jobs of the catalog.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from jobs.registry import task
+
+from .models import ProductImage
+
+
+@task(priority=5)
+def render_images():
+    """
+    Render the pending product images. Job workers already run in
+    several processes, so each renders in a single thread.
+    """
+    with ThreadPoolExecutor(1) as executor:
+        while ProductImage.objects.render_pending(executor):
+            pass
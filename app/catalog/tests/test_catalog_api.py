@@ -0,0 +1,152 @@
+"""
+Tests for the catalog API.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.models import Category, Product
+
+
+CATEGORY_LIST = reverse('catalog:category-list')
+PRODUCT_LIST = reverse('catalog:product-list')
+PRODUCT_FACETS = reverse('catalog:product-facets')
+
+
+def product_detail_url(product_id):
+    """Create and return a product detail URL."""
+    return reverse('catalog:product-detail', args=[product_id])
+
+
+class CatalogAPITests(TestCase):
+    """Test listing categories and products."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.electronics = Category.objects.create(name='Electronics')
+        self.phones = Category.objects.create(name='Phones',
+                                              parent=self.electronics)
+        self.books = Category.objects.create(name='Books')
+        now = timezone.now()
+        self.products = [
+            Product.objects.create(
+                category=category, name=f'Product {n}', brand=brand,
+                price=price, popularity=popularity,
+                created_at=now - timedelta(days=n))
+            for n, (category, brand, price, popularity) in enumerate([
+                (self.phones, 'Acme', '19.99', 5),
+                (self.phones, 'Globex', '5.00', 50),
+                (self.electronics, 'Acme', '19.99', 5),
+                (self.books, 'Initech', '120.00', 0),
+                (self.electronics, 'Acme', '700.00', 10),
+            ])
+        ]
+
+    def list_ids(self, params=None, pages=False):
+        """Return the ids of the listed products, following next links."""
+        res = self.client.get(PRODUCT_LIST, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [item['id'] for item in res.data['results']]
+        page_count = 1
+        while res.data['next'] is not None:
+            res = self.client.get(res.data['next'])
+            ids += [item['id'] for item in res.data['results']]
+            page_count += 1
+        return (ids, page_count) if pages else ids
+
+    def ids(self, *indexes):
+        return [self.products[index].id for index in indexes]
+
+    def test_list_categories(self):
+        """Test categories are listed with their subcategories."""
+        res = self.client.get(CATEGORY_LIST)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['path'] for item in res.data], sorted([
+            self.electronics.path, self.phones.path, self.books.path]))
+
+    def test_list_products_newest_first(self):
+        """Test products are listed newest first by default."""
+        res = self.client.get(PRODUCT_LIST)
+
+        self.assertEqual(res.data['results'][0]['price'], '19.99')
+        self.assertEqual(self.list_ids(), self.ids(0, 1, 2, 3, 4))
+
+    def test_keyset_pages(self):
+        """Test pages continue after the last row, including ties."""
+        for ordering, expected in [
+            ('price', self.ids(1, 0, 2, 3, 4)),
+            ('-price', self.ids(4, 3, 2, 0, 1)),
+            ('-popularity', self.ids(1, 4, 2, 0, 3)),
+            ('-created_at', self.ids(0, 1, 2, 3, 4)),
+        ]:
+            with self.subTest(ordering=ordering):
+                ids, page_count = self.list_ids(
+                    {'ordering': ordering, 'page_size': 2}, pages=True)
+
+                self.assertEqual(ids, expected)
+                self.assertEqual(page_count, 3)
+
+    def test_page_queries(self):
+        """Test a page after the first is one query."""
+        res = self.client.get(PRODUCT_LIST,
+                              {'ordering': 'price', 'page_size': 2})
+
+        with self.assertNumQueries(1):
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         self.ids(2, 3))
+
+    def test_filter_by_category_subtree(self):
+        """Test filtering includes products of subcategories."""
+        ids = self.list_ids({'category': self.electronics.id,
+                             'ordering': 'price'})
+
+        self.assertEqual(ids, self.ids(1, 0, 2, 4))
+        self.assertEqual(self.list_ids({'category': self.phones.id,
+                                        'brand': 'Acme'}), self.ids(0))
+
+    def test_invalid_parameters(self):
+        """Test unknown categories, orderings and cursors are rejected."""
+        for params, expected_status in [
+            ({'category': 0}, status.HTTP_400_BAD_REQUEST),
+            ({'category': 'x'}, status.HTTP_400_BAD_REQUEST),
+            ({'ordering': 'name'}, status.HTTP_400_BAD_REQUEST),
+            ({'cursor': 'invalid'}, status.HTTP_404_NOT_FOUND),
+        ]:
+            with self.subTest(params=params):
+                res = self.client.get(PRODUCT_LIST, params)
+
+                self.assertEqual(res.status_code, expected_status)
+
+    def test_retrieve_product(self):
+        """Test retrieving a product with its description."""
+        product = self.products[0]
+
+        res = self.client.get(product_detail_url(product.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['description'], '')
+        self.assertEqual(Decimal(res.data['price']), product.price)
+
+    def test_facets(self):
+        """Test facet counts of a category subtree, most frequent first."""
+        with self.assertNumQueries(2):
+            res = self.client.get(PRODUCT_FACETS,
+                                  {'category': self.electronics.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'brand': [{'value': 'Acme', 'count': 3},
+                      {'value': 'Globex', 'count': 1}],
+            'price': [{'value': '10-25', 'count': 2},
+                      {'value': '0-10', 'count': 1},
+                      {'value': '500-1000', 'count': 1}],
+        })
@@ -0,0 +1,310 @@
+"""
+Tests for product images and their renditions.
+"""
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.images import render_image, rendition_specs
+from catalog.models import Category, Product, ProductImage, save_content
+from catalog.tasks import render_images
+from jobs.models import Job
+from jobs.worker import Worker
+
+
+SPECS = [('small', 100, 'WEBP', 80), ('small', 100, 'JPEG', 85),
+         ('large', 400, 'JPEG', 85)]
+
+
+def image_data(size=(800, 600), image_format='JPEG', mode='RGB',
+               color='teal', **params):
+    """Return the data of a solid color image."""
+    output = BytesIO()
+    Image.new(mode, size, color).save(output, image_format, **params)
+    return output.getvalue()
+
+
+class BreakingExecutor(ThreadPoolExecutor):
+    """Executor whose first task fails as if its worker process died."""
+
+    def __init__(self):
+        super().__init__(1)
+        self.broken = False
+
+    def submit(self, fn, *args, **kwargs):
+        if self.broken:
+            return super().submit(fn, *args, **kwargs)
+        self.broken = True
+        future = Future()
+        future.set_exception(BrokenProcessPool())
+        return future
+
+
+def images_url(product_id):
+    """Create and return a product images URL."""
+    return reverse('catalog:product-image-list', args=[product_id])
+
+
+class RenderImageTests(SimpleTestCase):
+    """Test rendering images at several sizes and formats."""
+
+    def test_renditions(self):
+        """Test each size is rendered in each format, keeping the ratio."""
+        results = render_image(image_data(), SPECS)
+
+        self.assertEqual([result[:4] for result in results], [
+            ('small', 'WEBP', 100, 75),
+            ('small', 'JPEG', 100, 75),
+            ('large', 'JPEG', 400, 300),
+        ])
+        name, image_format, width, height, digest, data = results[0]
+        with Image.open(BytesIO(data)) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (100, 75)))
+        self.assertEqual(len(digest), 64)
+
+    def test_small_images_not_enlarged(self):
+        """Test images smaller than a size are kept at their size."""
+        results = render_image(image_data(size=(50, 80)), SPECS)
+
+        self.assertEqual({result[2:4] for result in results}, {(50, 80)})
+
+    def test_exif_orientation(self):
+        """Test images are turned upright as their EXIF tells."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        results = render_image(image_data(exif=exif.tobytes()), SPECS)
+
+        self.assertEqual(results[-1][2:4], (300, 400))
+
+    def test_transparent_image(self):
+        """Test transparent images get a white background in JPEG."""
+        data = image_data(image_format='PNG', mode='RGBA',
+                          color=(0, 128, 128, 100))
+
+        results = render_image(data, SPECS)
+
+        with Image.open(BytesIO(results[0][-1])) as image:
+            self.assertEqual(image.mode, 'RGBA')
+        with Image.open(BytesIO(results[1][-1])) as image:
+            self.assertEqual(image.mode, 'RGB')
+
+
+class ProductImageTests(TestCase):
+    """Test uploading, rendering and serving product images."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.admin = get_user_model().objects.create_user(
+            username='admin', email='admin@example.com',
+            phone_number='+48123456789', password='testpass123',
+            first_name='Jan', last_name='Kowalski', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        category = Category.objects.create(name='Audio')
+        self.product = Product.objects.create(
+            category=category, name='Speaker', price='25.00')
+
+    def upload(self, data=None, product=None):
+        file = SimpleUploadedFile('photo.jpg', data or image_data())
+        return self.client.post(images_url((product or self.product).id),
+                                {'file': file}, format='multipart')
+
+    def render(self):
+        with ThreadPoolExecutor(1) as executor:
+            return ProductImage.objects.render_pending(executor)
+
+    def test_upload_and_render(self):
+        """Test uploads are stored and rendered in the background."""
+        res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['status'], ProductImage.Status.PENDING)
+        self.assertEqual((res.data['width'], res.data['height']),
+                         (800, 600))
+        self.assertRegex(res.data['original'],
+                         r'/media/products/originals/[0-9a-f]{2}/'
+                         r'[0-9a-f]{64}\.jpg$')
+
+        self.assertEqual(self.render(), 1)
+        self.assertEqual(self.render(), 0)
+
+        image = ProductImage.objects.get()
+        self.assertEqual(image.status, ProductImage.Status.READY)
+        self.assertEqual(image.renditions.count(), len(rendition_specs()))
+        res = self.client.get(
+            reverse('catalog:product-detail', args=[self.product.id]))
+        thumbnail = res.data['images'][0]['renditions'][0]
+        self.assertEqual(
+            (thumbnail['size'], thumbnail['format'], thumbnail['width'],
+             thumbnail['height']), ('thumbnail', 'webp', 160, 120))
+        self.assertRegex(thumbnail['url'],
+                         r'/media/products/renditions/[0-9a-f]{2}/'
+                         r'[0-9a-f]{64}\.webp$')
+
+    def test_duplicates_stored_once(self):
+        """Test identical uploads share files and aren't rendered again."""
+        self.upload()
+        self.render()
+        other = Product.objects.create(category=self.product.category,
+                                       name='Speaker II', price='30.00')
+
+        res = self.upload(product=other)
+
+        self.assertEqual(res.data['status'], ProductImage.Status.READY)
+        first, second = ProductImage.objects.order_by('id')
+        self.assertEqual(first.original.name, second.original.name)
+        self.assertEqual(
+            set(first.renditions.values_list('file', flat=True)),
+            set(second.renditions.values_list('file', flat=True)))
+
+    def test_broken_image_failed(self):
+        """Test images that can't be decoded are marked failed."""
+        data = image_data()
+        self.upload(data[:len(data) // 2])
+
+        with self.assertLogs('catalog.models', 'ERROR'):
+            self.render()
+
+        self.assertEqual(ProductImage.objects.get().status,
+                         ProductImage.Status.FAILED)
+
+    def test_broken_pool(self):
+        """
+        Test images are left pending when a worker dies, and marked failed
+        if rendered alone.
+        """
+        self.upload(image_data(color='red'))
+        self.upload(image_data(color='blue'))
+        first, second = ProductImage.objects.order_by('id')
+
+        with BreakingExecutor() as executor, \
+                self.assertRaises(BrokenProcessPool):
+            ProductImage.objects.render_pending(executor)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, ProductImage.Status.PENDING)
+        self.assertEqual(second.status, ProductImage.Status.READY)
+
+        with BreakingExecutor() as executor, \
+                self.assertRaises(BrokenProcessPool), \
+                self.assertLogs('catalog.models', 'ERROR'):
+            ProductImage.objects.render_pending(executor, 1)
+        first.refresh_from_db()
+        self.assertEqual(first.status, ProductImage.Status.FAILED)
+
+    def test_concurrent_duplicates_stored_once(self):
+        """Test files stored at once keep their content-addressed name."""
+        name = 'products/originals/ab/abcd.jpg'
+        self.assertEqual(save_content(name, ContentFile(b'data')), name)
+
+        with patch.object(default_storage, 'exists', return_value=False):
+            self.assertEqual(save_content(name, ContentFile(b'data')), name)
+
+        self.assertEqual(
+            os.listdir(os.path.dirname(default_storage.path(name))),
+            ['abcd.jpg'])
+
+    def test_invalid_uploads(self):
+        """Test non-images and uploads by other users are rejected."""
+        res = self.upload(b'not an image')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with override_settings(PRODUCT_IMAGES={'MAX_UPLOAD_SIZE': 1000}):
+            res = self.upload(image_data(size=(2000, 2000)))
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        self.client.force_authenticate(None)
+        res = self.upload()
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(ProductImage.objects.exists())
+
+    def test_pending_images_hidden(self):
+        """Test only staff see the images not rendered yet."""
+        self.upload()
+
+        self.assertEqual(len(self.client.get(images_url(
+            self.product.id)).data), 1)
+        self.assertEqual(APIClient().get(images_url(
+            self.product.id)).data, [])
+
+    def test_files_cached(self):
+        """Test stored files are served with long-lived cache headers."""
+        url = self.upload().data['original']
+
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('max-age=31536000', res['Cache-Control'])
+        self.assertEqual(b''.join(res.streaming_content), image_data())
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get('/media/products/../app/settings.py')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_render_command(self):
+        """Test the command renders images in worker processes."""
+        self.upload()
+        out = StringIO()
+
+        call_command('render_images', workers=1, stdout=out)
+
+        self.assertIn('Rendered 1 images.', out.getvalue())
+        self.assertEqual(ProductImage.objects.get().status,
+                         ProductImage.Status.READY)
+
+    def test_render_command_restarts_pool(self):
+        """Test the command replaces a pool broken by a dying worker."""
+        self.upload(image_data(color='red'))
+        self.upload(image_data(color='blue'))
+        err = StringIO()
+
+        with patch('catalog.management.commands.render_images.Command.'
+                   'executor', side_effect=[BreakingExecutor(),
+                                            BreakingExecutor(),
+                                            ThreadPoolExecutor(1)]), \
+                self.assertLogs('catalog.models', 'ERROR'):
+            call_command('render_images', stdout=StringIO(), stderr=err)
+
+        self.assertIn('restarting the pool', err.getvalue())
+        self.assertEqual(
+            list(ProductImage.objects.order_by('id').values_list(
+                'status', flat=True)),
+            [ProductImage.Status.FAILED, ProductImage.Status.READY])
+
+    def test_upload_enqueues_render_job(self):
+        """Test uploads are rendered by a job, unless already rendered."""
+        self.upload()
+
+        self.assertEqual(Job.objects.get().task, render_images.name)
+        self.assertEqual(Worker(burst=True).run(), 1)
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(ProductImage.objects.get().status,
+                         ProductImage.Status.READY)
+
+        self.upload()
+        self.assertFalse(Job.objects.exists())
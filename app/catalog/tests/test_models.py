@@ -0,0 +1,249 @@
+"""
+Tests for catalog models.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog.models import (
+    Category,
+    FacetCount,
+    Product,
+    ancestor_paths,
+    price_bucket,
+)
+
+
+def create_product(category, **params):
+    """Create and return a product."""
+    defaults = {'name': 'Product', 'brand': 'Acme', 'price': '19.99'}
+    defaults.update(params)
+    return Product.objects.create(category=category, **defaults)
+
+
+def facet_counts(path=''):
+    """Return a dict of the non-zero facet counts of a category path."""
+    return {
+        (facet, value): count
+        for facet, value, count in FacetCount.objects.filter(
+            category_path=path, count__gt=0).values_list(
+            'facet', 'value', 'count')
+    }
+
+
+class CategoryTests(TestCase):
+    """Test the materialized category paths."""
+
+    def setUp(self):
+        self.electronics = Category.objects.create(name='Electronics')
+        self.phones = Category.objects.create(name='Phones',
+                                              parent=self.electronics)
+        self.books = Category.objects.create(name='Books')
+
+    def test_path(self):
+        """Test a category's path holds the ids from the root."""
+        self.assertEqual(self.electronics.path, f'{self.electronics.pk}/')
+        self.assertEqual(self.phones.path,
+                         f'{self.electronics.pk}/{self.phones.pk}/')
+        self.phones.refresh_from_db()
+        self.assertEqual(self.phones.path,
+                         f'{self.electronics.pk}/{self.phones.pk}/')
+
+    def test_subtree_is_a_prefix_range(self):
+        """Test products under a category are found by path prefix."""
+        phone = create_product(self.phones)
+        laptop = create_product(self.electronics)
+        create_product(self.books)
+
+        products = Product.objects.filter(
+            category_path__startswith=self.electronics.path)
+
+        self.assertEqual(set(products), {phone, laptop})
+
+    def test_move(self):
+        """Test moving a category rewrites the paths of its subtree."""
+        cases = Category.objects.create(name='Cases', parent=self.phones)
+        product = create_product(cases)
+
+        self.phones.parent = self.books
+        with self.captureOnCommitCallbacks(execute=True):
+            self.phones.save()
+
+        cases.refresh_from_db()
+        product.refresh_from_db()
+        expected = f'{self.books.pk}/{self.phones.pk}/{cases.pk}/'
+        self.assertEqual(cases.path, expected)
+        self.assertEqual(product.category_path, expected)
+        self.assertEqual(facet_counts(self.electronics.path), {})
+        self.assertEqual(facet_counts(self.books.path)[('brand', 'Acme')], 1)
+
+    def test_move_keeps_counts(self):
+        """Test moved counts match a rebuild, without scanning products."""
+        cases = Category.objects.create(name='Cases', parent=self.phones)
+        create_product(self.phones, brand='Globex')
+        create_product(cases, price='5.00')
+        create_product(self.books)
+        self.phones.parent = self.books
+
+        with self.assertNumQueries(9):
+            self.phones.save()
+
+        moved = set(FacetCount.objects.filter(count__gt=0).values_list(
+            'category_path', 'facet', 'value', 'count'))
+        FacetCount.objects.rebuild()
+        self.assertEqual(moved, set(FacetCount.objects.values_list(
+            'category_path', 'facet', 'value', 'count')))
+
+    def test_move_under_itself(self):
+        """Test a category can't be moved into its own subtree."""
+        self.electronics.parent = self.phones
+
+        with self.assertRaises(ValueError):
+            self.electronics.save()
+
+    def test_ancestor_paths(self):
+        """Test the paths counting a category's products."""
+        self.assertEqual(ancestor_paths('1/5/9/'),
+                         ['', '1/', '1/5/', '1/5/9/'])
+        self.assertEqual(ancestor_paths(''), [''])
+
+
+class FacetCountTests(TestCase):
+    """Test maintaining the facet counts."""
+
+    def setUp(self):
+        self.parent = Category.objects.create(name='Electronics')
+        self.category = Category.objects.create(name='Phones',
+                                                parent=self.parent)
+
+    @override_settings(CATALOG={'PRICE_BUCKETS': [10, 100]})
+    def test_price_bucket(self):
+        """Test prices fall in the bucket below their upper bound."""
+        self.assertEqual(price_bucket(Decimal('9.99')), '0-10')
+        self.assertEqual(price_bucket(Decimal('10')), '10-100')
+        self.assertEqual(price_bucket(Decimal('100')), '100+')
+
+    def test_counted_under_ancestors(self):
+        """Test a product is counted under its category and parents."""
+        create_product(self.category, price='5.00')
+
+        expected = {('brand', 'Acme'): 1, ('price', '0-10'): 1}
+        for path in ['', self.parent.path, self.category.path]:
+            self.assertEqual(facet_counts(path), expected)
+
+    def test_update_and_delete(self):
+        """Test counts follow changes and deletion of products."""
+        product = create_product(self.category)
+        create_product(self.category, brand='Globex')
+
+        product.brand = 'Globex'
+        product.save()
+        self.assertEqual(facet_counts()[('brand', 'Globex')], 2)
+        self.assertNotIn(('brand', 'Acme'), facet_counts())
+
+        Product.objects.get(pk=product.pk).delete()
+        self.assertEqual(facet_counts(self.category.path),
+                         {('brand', 'Globex'): 1, ('price', '10-25'): 1})
+
+    def test_unchanged_facets_not_written(self):
+        """Test saves not changing the facets don't touch the counts."""
+        product = create_product(self.category)
+
+        product.popularity = 5
+        with self.assertNumQueries(1):
+            product.save()
+
+    def test_rebuild(self):
+        """Test the counts are rebuilt from the products."""
+        create_product(self.category, price='30')
+        create_product(self.parent, brand='Globex', price='30')
+        Product.objects.bulk_create([
+            Product(category=self.category, category_path=self.category.path,
+                    name='Imported', brand='Acme', price=Decimal('2000'))])
+        FacetCount.objects.update(count=0)
+
+        FacetCount.objects.rebuild()
+
+        self.assertEqual(facet_counts(), {
+            ('brand', 'Acme'): 2, ('brand', 'Globex'): 1,
+            ('price', '25-50'): 2, ('price', '1000+'): 1,
+        })
+        self.assertEqual(facet_counts(self.category.path), {
+            ('brand', 'Acme'): 2, ('price', '25-50'): 1,
+            ('price', '1000+'): 1,
+        })
+
+
+class ProductTests(TestCase):
+    """Test saving products."""
+
+    def test_save_keeps_counters(self):
+        """Test saves don't write back stale stock and ratings."""
+        category = Category.objects.create(name='Audio')
+        product = create_product(category, stock=3)
+        Product.objects.reserve_stock({product.id: 1})
+        Product.objects.adjust_ratings(product.id, {5: 1})
+
+        product.name = 'Speaker'
+        product.save()
+
+        product.refresh_from_db()
+        self.assertEqual(product.name, 'Speaker')
+        self.assertEqual(product.stock, 2)
+        self.assertEqual((product.ratings_count, product.ratings_5),
+                         (1, 1))
+        self.assertEqual(product.average_rating, Decimal('5.0'))
+
+    def test_add_stock(self):
+        """Test stock is set on create and added to after that."""
+        category = Category.objects.create(name='Audio')
+        product = create_product(category, stock=3)
+        Product.objects.reserve_stock({product.id: 1})
+
+        Product.objects.add_stock({product.id: 5})
+
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 7)
+        with self.assertRaises(ValueError):
+            Product.objects.add_stock({product.id: -1})
+
+    def test_assigning_stock_rejected(self):
+        """Test saves assigning the stock of a saved product fail."""
+        product = create_product(Category.objects.create(name='Audio'))
+
+        product.stock = 5
+        with self.assertRaises(ValueError):
+            product.save()
+
+        product.stock = 5
+        product.save(update_fields=['stock'])
+        product.refresh_from_db()
+        product.name = 'Speaker'
+        product.save()
+        self.assertEqual(Product.objects.get().stock, 5)
+
+    def test_admin_adds_stock(self):
+        """Test the admin sets the stock on create and adds to it."""
+        self.client.force_login(get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com',
+            phone_number='+48123456789', password='testpass123',
+            first_name='Jan', last_name='Kowalski'))
+        category = Category.objects.create(name='Audio')
+        fields = {'category': category.id, 'name': 'Speaker',
+                  'price': '25.00', 'popularity': 0,
+                  'created_at_0': '2026-01-01', 'created_at_1': '00:00'}
+
+        res = self.client.post(reverse('admin:catalog_product_add'),
+                               {**fields, 'stock': 3})
+        self.assertEqual(res.status_code, 302)
+        product = Product.objects.get()
+        self.assertEqual(product.stock, 3)
+
+        Product.objects.reserve_stock({product.id: 1})
+        res = self.client.post(
+            reverse('admin:catalog_product_change', args=[product.id]),
+            {**fields, 'add_stock': 4})
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(Product.objects.get().stock, 6)
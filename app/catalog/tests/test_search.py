@@ -0,0 +1,181 @@
+"""
+Tests for product search.
+"""
+from io import StringIO
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import benchmarks
+from catalog import search
+from catalog.models import Category, Product
+
+
+PRODUCT_SEARCH = reverse('catalog:product-search')
+
+
+def trigram_available():
+    return search.trigram_available(connection.alias)
+
+
+class SearchVectorTests(TestCase):
+    """Test maintaining the product search vectors."""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Audio')
+        self.product = Product.objects.create(
+            category=self.category, name='Wireless Headphones',
+            description='Noise cancelling.', price='99.00')
+
+    def matches(self, text):
+        return Product.objects.filter(
+            search_vector=search.build_query(search.parse_terms(text)))
+
+    def test_vector_on_save(self):
+        """Test the name, category and description are indexed."""
+        for text in ['headphones', 'audio', 'cancel', 'wireless head']:
+            with self.subTest(text=text):
+                self.assertTrue(self.matches(text))
+
+        self.product.name = 'Bluetooth Speaker'
+        self.product.save()
+
+        self.assertFalse(self.matches('headphones'))
+        self.assertTrue(self.matches('speaker'))
+        self.assertNotIn('search_vector', self.product.__dict__)
+
+    def test_vector_unchanged_text(self):
+        """Test saves not changing the text don't recompute the vector."""
+        product = Product.objects.get(pk=self.product.pk)
+        product.price = 30
+
+        with CaptureQueriesContext(connection) as context:
+            product.save()
+
+        self.assertNotIn('search_vector',
+                         context.captured_queries[-1]['sql'])
+
+    def test_vector_on_category_rename(self):
+        """Test renaming a category reindexes its products."""
+        self.category.name = 'Sound'
+        self.category.save()
+
+        self.assertTrue(self.matches('sound'))
+        self.assertFalse(self.matches('audio'))
+
+    def test_rebuild_search_vectors(self):
+        """Test vectors of products created in bulk are computed."""
+        Product.objects.bulk_create([Product(
+            category=self.category, category_path=self.category.path,
+            name='Turntable', price='300.00')])
+        self.assertFalse(self.matches('turntable'))
+
+        Product.objects.update_search_vectors()
+
+        self.assertTrue(self.matches('turntable'))
+
+
+class ProductSearchAPITests(TestCase):
+    """Test the product search API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.audio = Category.objects.create(name='Audio')
+        self.cameras = Category.objects.create(name='Cameras')
+        self.speaker = self.create_product('Portable Speaker', self.audio)
+        self.headphones = self.create_product(
+            'Wireless Headphones', self.audio,
+            description='Pairs with any portable speaker.')
+        self.camera = self.create_product(
+            'Action Camera', self.cameras,
+            description='Waterproof and portable.')
+
+    def create_product(self, name, category, description=''):
+        return Product.objects.create(name=name, category=category,
+                                      description=description, price='10')
+
+    def search_ids(self, params):
+        res = self.client.get(PRODUCT_SEARCH, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [item['id'] for item in res.data['results']]
+        while res.data['next'] is not None:
+            res = self.client.get(res.data['next'])
+            ids += [item['id'] for item in res.data['results']]
+        return ids
+
+    def test_name_ranked_first(self):
+        """Test matches in the name rank above the description."""
+        self.assertEqual(self.search_ids({'q': 'portable speaker'}),
+                         [self.speaker.id, self.headphones.id])
+
+    def test_prefix_and_stemming(self):
+        """Test the last term matches as a prefix, and words by stem."""
+        self.assertEqual(self.search_ids({'q': 'wireless headph'}),
+                         [self.headphones.id])
+        self.assertEqual(self.search_ids({'q': 'cameras'}),
+                         [self.camera.id])
+
+    def test_category_filter(self):
+        """Test searching within a category."""
+        self.assertEqual(
+            self.search_ids({'q': 'portable', 'category': self.cameras.id}),
+            [self.camera.id])
+
+    def test_keyset_pages(self):
+        """Test pages of tied ranks continue after the last result."""
+        products = [self.create_product(f'Lamp {n}', self.audio)
+                    for n in range(5)]
+
+        ids = self.search_ids({'q': 'lamp', 'page_size': 2})
+
+        self.assertEqual(ids, sorted([p.id for p in products], reverse=True))
+
+    def test_query_count(self):
+        """Test a search is one query."""
+        search.trigram_available(connection.alias)
+
+        with self.assertNumQueries(1):
+            self.client.get(PRODUCT_SEARCH, {'q': 'speaker'})
+
+    def test_no_terms(self):
+        """Test searches without words are rejected."""
+        for q in ['', '  ', '&|!']:
+            with self.subTest(q=q):
+                res = self.client.get(PRODUCT_SEARCH, {'q': q})
+
+                self.assertEqual(res.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+
+    def test_operators_are_not_parsed(self):
+        """Test tsquery syntax in the terms is treated as separators."""
+        self.assertEqual(self.search_ids({'q': "speaker:* | !'camera'"}),
+                         [])
+
+    @skipUnless(trigram_available(), 'The pg_trgm extension is missing.')
+    def test_typo_tolerance(self):
+        """Test names with words similar to the query match."""
+        self.assertEqual(self.search_ids({'q': 'hedphones'}),
+                         [self.headphones.id])
+
+
+class CatalogBenchmarkTests(TestCase):
+    """Test the catalog benchmark scenarios."""
+
+    def test_catalog_scenarios_within_budget(self):
+        """Test the catalog scenarios run within their query budgets."""
+        benchmarks.seed(0.00002, StringIO())
+        self.assertEqual(Product.objects.count(), 20)
+        names = ['product-list', 'product-list-category', 'product-search',
+                 'product-autocomplete', 'product-facets']
+
+        for scenario in benchmarks.get_scenarios(names):
+            scenario.warmup = 1
+            metrics = benchmarks.run_scenario(scenario, requests=3)
+
+            self.assertLessEqual(metrics['queries'], metrics['query_budget'])
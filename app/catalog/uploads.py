@@ -0,0 +1,48 @@
+"""
+Upload handling for product images.
+"""
+import hashlib
+
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .images import get_image_setting
+
+
+# Allowance for the multipart boundaries and other form fields.
+FORM_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'The uploaded file is too large.'
+    default_code = 'upload_too_large'
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Stream uploaded files to temporary files chunk by chunk, computing
+    their SHA-256 on the way, so no upload is held in memory whole.
+    Uploads over MAX_UPLOAD_SIZE are rejected before being read.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = get_image_setting('MAX_UPLOAD_SIZE')
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > self.max_size + FORM_OVERHEAD:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.file.close()
+            raise UploadTooLarge()
+        self.file.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
@@ -0,0 +1,21 @@
+from django.urls import path
+
+from . import views
+
+app_name = "catalog"
+
+urlpatterns = [
+    path('categories/', views.CategoryListAPIView.as_view(),
+         name='category-list'),
+    path('products/', views.ProductListAPIView.as_view(),
+         name='product-list'),
+    path('products/search/', views.ProductSearchAPIView.as_view(),
+         name='product-search'),
+    path('products/facets/', views.ProductFacetsAPIView.as_view(),
+         name='product-facets'),
+    path('products/<int:pk>/', views.ProductDetailAPIView.as_view(),
+         name='product-detail'),
+    path('products/<int:pk>/images/',
+         views.ProductImageListCreateAPIView.as_view(),
+         name='product-image-list'),
+]
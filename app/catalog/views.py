@@ -0,0 +1,226 @@
+"""
+Views for the catalog API.
+"""
+import mimetypes
+import re
+
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.views import View
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+
+from core.readonly import CompiledSerializerMixin
+
+from .images import get_image_setting
+from .models import (
+    ROOT_PATH,
+    Category,
+    FacetCount,
+    Product,
+    ProductImage,
+)
+from .pagination import ProductKeysetPagination, SearchKeysetPagination
+from .search import parse_terms, search
+from .serializers import (
+    CategorySerializer,
+    FacetsSerializer,
+    ProductDetailSerializer,
+    ProductImageSerializer,
+    ProductImageUploadSerializer,
+    ProductSerializer,
+)
+from .uploads import HashingUploadHandler
+
+
+# Names of the stored image files, relative to their directory.
+IMAGE_FILE_RE = re.compile(
+    r'(originals|renditions)/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})'
+    r'\.(jpg|png|webp|gif)')
+
+
+CATEGORY_PARAMETER = OpenApiParameter(
+    'category', OpenApiTypes.INT,
+    description='Only products in this category or its subcategories.',
+)
+
+
+def get_category_path(request):
+    """Return the path of the category in the query string, or the root."""
+    category = request.query_params.get('category')
+    if category is None:
+        return ROOT_PATH
+    path = None
+    if category.isdigit():
+        path = Category.objects.filter(pk=category).values_list(
+            'path', flat=True).first()
+    if path is None:
+        raise ValidationError({'category': ['Category not found.']})
+    return path
+
+
+class CategoryListAPIView(CompiledSerializerMixin, generics.ListAPIView):
+    """List all categories, each followed by its subcategories."""
+    permission_classes = (AllowAny,)
+    serializer_class = CategorySerializer
+    queryset = Category.objects.order_by('path')
+
+
+@extend_schema(parameters=[
+    CATEGORY_PARAMETER,
+    OpenApiParameter('brand', OpenApiTypes.STR,
+                     description='Only products of this brand.'),
+])
+class ProductListAPIView(CompiledSerializerMixin, generics.ListAPIView):
+    """
+    List products, optionally under a category, sorted by price, date or
+    popularity with keyset pagination.
+    """
+    permission_classes = (AllowAny,)
+    serializer_class = ProductSerializer
+    pagination_class = ProductKeysetPagination
+
+    def get_queryset(self):
+        queryset = Product.objects.all()
+        path = get_category_path(self.request)
+        if path != ROOT_PATH:
+            queryset = queryset.filter(category_path__startswith=path)
+        brand = self.request.query_params.get('brand')
+        if brand is not None:
+            queryset = queryset.filter(brand=brand)
+        return queryset
+
+
+@extend_schema(parameters=[
+    OpenApiParameter('q', OpenApiTypes.STR, required=True,
+                     description='Search terms, the last one may be a '
+                                 'prefix.'),
+    CATEGORY_PARAMETER,
+])
+class ProductSearchAPIView(CompiledSerializerMixin, generics.ListAPIView):
+    """Search products by name, category and description, best first."""
+    permission_classes = (AllowAny,)
+    serializer_class = ProductSerializer
+    pagination_class = SearchKeysetPagination
+    extra_values = ('rank',)
+
+    def get_queryset(self):
+        terms = parse_terms(self.request.query_params.get('q', ''))
+        if not terms:
+            raise ValidationError({'q': ['Enter search terms.']})
+        queryset = Product.objects.all()
+        path = get_category_path(self.request)
+        if path != ROOT_PATH:
+            queryset = queryset.filter(category_path__startswith=path)
+        return search(queryset, terms)
+
+
+def ready_images():
+    """Return a queryset of the rendered images, in display order."""
+    return ProductImage.objects.filter(
+        status=ProductImage.Status.READY,
+    ).prefetch_related('renditions').order_by('position', 'id')
+
+
+class ProductDetailAPIView(generics.RetrieveAPIView):
+    """Retrieve a product with its images."""
+    permission_classes = (AllowAny,)
+    serializer_class = ProductDetailSerializer
+    queryset = Product.objects.prefetch_related(
+        Prefetch('images', queryset=ready_images(), to_attr='ready_images'))
+
+
+class ProductImageListCreateAPIView(generics.ListAPIView):
+    """
+    List the rendered images of a product, or upload one as staff. Uploads
+    are rendered in the background by a job, or `manage.py render_images`,
+    and are listed to staff while pending.
+    """
+    serializer_class = ProductImageSerializer
+    parser_classes = (MultiPartParser,)
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [HashingUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [IsAdminUser()]
+        return [AllowAny()]
+
+    def get_queryset(self):
+        queryset = ready_images()
+        if self.request.user.is_staff:
+            queryset = ProductImage.objects.prefetch_related(
+                'renditions').order_by('position', 'id')
+        return queryset.filter(product_id=self.kwargs['pk'])
+
+    @extend_schema(request=ProductImageUploadSerializer,
+                   responses={201: ProductImageSerializer})
+    def post(self, request, *args, **kwargs):
+        product = get_object_or_404(Product.objects.only('id'),
+                                    pk=self.kwargs['pk'])
+        serializer = ProductImageUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        file = serializer.validated_data['file']
+        image = ProductImage.objects.add(
+            product, file, file.image_format, *file.image_size,
+            position=serializer.validated_data['position'])
+        return Response(
+            self.get_serializer(image).data, status=status.HTTP_201_CREATED)
+
+
+class ImageFileView(View):
+    """
+    Serve stored product images. Their names are the SHA-256 of their
+    content, so they never change and are cached for CACHE_MAX_AGE.
+    """
+
+    def get(self, request, name):
+        match = IMAGE_FILE_RE.fullmatch(name)
+        if match is None:
+            raise Http404
+        etag = f'"{match.group("digest")}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            try:
+                file = default_storage.open(
+                    f"{get_image_setting('DIRECTORY')}/{name}")
+            except FileNotFoundError:
+                raise Http404
+            response = FileResponse(
+                file, content_type=mimetypes.guess_type(name)[0])
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, immutable=True,
+                            max_age=get_image_setting('CACHE_MAX_AGE'))
+        return response
+
+
+class ProductFacetsAPIView(generics.GenericAPIView):
+    """
+    Number of products per brand and price bucket, optionally under a
+    category, read from the precomputed facet counts.
+    """
+    permission_classes = (AllowAny,)
+    serializer_class = FacetsSerializer
+
+    @extend_schema(parameters=[CATEGORY_PARAMETER])
+    def get(self, request, *args, **kwargs):
+        counts = FacetCount.objects.filter(
+            category_path=get_category_path(request), count__gt=0,
+        ).order_by('facet', '-count', 'value').values_list(
+            'facet', 'value', 'count')
+        facets = {'brand': [], 'price': []}
+        for facet, value, count in counts:
+            facets.setdefault(facet, []).append(
+                {'value': value, 'count': count})
+        return Response(facets)
@@ -0,0 +1,202 @@
+"""
+Query budget and latency benchmarks for API endpoints.
+
+Apps register scenarios in a `benchmarks` module; the benchmark_api
+command seeds data, runs them in-process and compares the results with
+a JSON baseline.
+"""
+import json
+import time
+from pathlib import Path
+from statistics import quantiles
+
+from django.db import connection
+from django.utils.module_loading import autodiscover_modules
+
+from rest_framework.test import APIClient
+
+
+# Metrics compared with the baseline: whether higher is better, and how
+# many times the tolerance they get, as tail latencies are noisier.
+METRICS = {
+    'p50_ms': (False, 1),
+    'p95_ms': (False, 2),
+    'p99_ms': (False, 3),
+    'rps': (True, 1),
+}
+
+_scenarios = {}
+_seeders = []
+
+
+class Scenario:
+    """
+    A request sent repeatedly to an endpoint.
+
+    Subclasses implement request(client, iteration) and may prepare
+    state shared by the iterations in setup(). query_budget is the most
+    queries a request may run, optionally per database vendor.
+    """
+
+    name = None
+    query_budget = 0
+    vendor_query_budgets = {}
+    requests = 200
+    warmup = 10
+    expected_status = 200
+
+    def setup(self, client):
+        pass
+
+    def request(self, client, iteration):
+        raise NotImplementedError
+
+    def get_query_budget(self, vendor):
+        return self.vendor_query_budgets.get(vendor, self.query_budget)
+
+
+def register(scenario_class):
+    """Class decorator registering a scenario."""
+    _scenarios[scenario_class.name] = scenario_class
+    return scenario_class
+
+
+def register_seeder(seeder):
+    """
+    Decorator registering seeder(scale, stdout), which fills the database
+    with `scale` times the app's realistic data volume. Seeders must skip
+    data left by a previous run, so kept databases aren't seeded twice.
+    """
+    _seeders.append(seeder)
+    return seeder
+
+
+def seed(scale, stdout):
+    autodiscover_modules('benchmarks')
+    for seeder in _seeders:
+        seeder(scale, stdout)
+
+
+def get_scenarios(names=None):
+    """Return instances of the registered scenarios, or the named ones."""
+    autodiscover_modules('benchmarks')
+    if names:
+        unknown = set(names) - set(_scenarios)
+        if unknown:
+            raise KeyError(', '.join(sorted(unknown)))
+        return [_scenarios[name]() for name in names]
+    return [scenario_class() for scenario_class in _scenarios.values()]
+
+
+def run_scenario(scenario, requests=None):
+    """
+    Run a scenario and return its metrics.
+
+    Queries are counted on a separate request, so recording them doesn't
+    slow down the timed ones. The SQL of that request is returned too.
+    """
+    requests = requests or scenario.requests
+    client = APIClient()
+    scenario.setup(client)
+    iteration = 0
+    for _ in range(scenario.warmup):
+        check_status(scenario, scenario.request(client, iteration))
+        iteration += 1
+
+    queries = []
+
+    def record_query(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record_query):
+        check_status(scenario, scenario.request(client, iteration))
+    iteration += 1
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        request_start = time.perf_counter()
+        response = scenario.request(client, iteration)
+        latencies.append(time.perf_counter() - request_start)
+        check_status(scenario, response)
+        iteration += 1
+    elapsed = time.perf_counter() - start
+
+    percentiles = quantiles(latencies, n=100)
+    return {
+        'queries': len(queries),
+        'query_budget': scenario.get_query_budget(connection.vendor),
+        'requests': requests,
+        'p50_ms': round(percentiles[49] * 1000, 3),
+        'p95_ms': round(percentiles[94] * 1000, 3),
+        'p99_ms': round(percentiles[98] * 1000, 3),
+        'rps': round(requests / elapsed, 1),
+        'sql': queries,
+    }
+
+
+def check_status(scenario, response):
+    if response.status_code != scenario.expected_status:
+        raise AssertionError(
+            f'{scenario.name} returned {response.status_code}, expected '
+            f'{scenario.expected_status}: {response.content[:200]!r}')
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Return messages for results over their query budget, or worse than
+    the baseline by more than `tolerance` (a fraction) times the metric's
+    factor.
+    """
+    regressions = []
+    for name, result in results.items():
+        if result['queries'] > result['query_budget']:
+            regressions.append('\n  '.join([
+                f"{name}: {result['queries']} queries, budget is "
+                f"{result['query_budget']}:",
+                *result['sql'],
+            ]))
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric, (higher_is_better, factor) in METRICS.items():
+            if metric not in previous:
+                continue
+            if higher_is_better:
+                regressed = result[metric] < \
+                    previous[metric] * (1 - tolerance * factor)
+            else:
+                regressed = result[metric] > \
+                    previous[metric] * (1 + tolerance * factor)
+            if regressed:
+                regressions.append(
+                    f'{name}: {metric} {result[metric]} vs baseline '
+                    f'{previous[metric]}')
+    return regressions
+
+
+def load_baseline(path, vendor):
+    """Return the baseline results of a database vendor, if any."""
+    try:
+        with open(path) as baseline_file:
+            return json.load(baseline_file).get(vendor, {})
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, vendor, results):
+    """Store results as the baseline of a database vendor."""
+    try:
+        with open(path) as baseline_file:
+            baselines = json.load(baseline_file)
+    except FileNotFoundError:
+        baselines = {}
+    baselines[vendor] = {
+        name: {key: value for key, value in result.items() if key != 'sql'}
+        for name, result in results.items()
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as baseline_file:
+        json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
@@ -0,0 +1,358 @@
+"""
+Thread-safe database connection pool with statistics.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from statistics import quantiles
+
+import psycopg2
+
+
+DEFAULTS = {
+    'MIN_SIZE': 2,
+    'MAX_SIZE': 20,
+    'TIMEOUT': 10.0,
+    'MAX_LIFETIME': 1800.0,
+    'MAX_IDLE': 300.0,
+    'CHECK_IDLE': 5.0,
+}
+
+# Number of recent checkout latencies kept for percentiles.
+LATENCY_SAMPLES = 1000
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection becomes available within the timeout."""
+
+
+class PooledConnection:
+    """An open connection with the times used to expire it."""
+
+    def __init__(self, connection, max_lifetime):
+        self.connection = connection
+        now = time.monotonic()
+        # Spread expiry so connections opened together aren't all recycled
+        # at the same moment.
+        self.expires_at = now + max_lifetime * random.uniform(0.9, 1.0)
+        self.last_used = now
+
+    def expired(self, now):
+        return now >= self.expires_at
+
+
+class ConnectionPool:
+    """
+    Pool of at most max_size connections opened by the `connect` callable.
+
+    getconn() hands out an idle connection, opens a new one while below
+    max_size, or waits up to `timeout` seconds for one to be returned.
+    Connections idle for more than check_idle seconds are pinged before
+    being handed out, connections older than max_lifetime are replaced,
+    and idle connections beyond min_size are closed after max_idle.
+    """
+
+    def __init__(self, connect, min_size=DEFAULTS['MIN_SIZE'],
+                 max_size=DEFAULTS['MAX_SIZE'], timeout=DEFAULTS['TIMEOUT'],
+                 max_lifetime=DEFAULTS['MAX_LIFETIME'],
+                 max_idle=DEFAULTS['MAX_IDLE'],
+                 check_idle=DEFAULTS['CHECK_IDLE'], name=''):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(
+                'Pool sizes must satisfy 0 <= min_size <= max_size, '
+                'max_size >= 1.')
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_idle = check_idle
+        self.name = name
+
+        self._lock = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        # Connections being opened count towards the size, so concurrent
+        # callers can't open more than max_size.
+        self._opening = 0
+        self._waiting = 0
+        self._filling = False
+        self._closed = False
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._counters = dict.fromkeys([
+            'checkouts', 'timeouts', 'connections_opened',
+            'connections_closed', 'connections_failed',
+            'health_checks_failed', 'wait_time', 'wait_time_max',
+            'checkout_time',
+        ], 0)
+
+    @property
+    def size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def getconn(self):
+        """Return a connection, waiting up to `timeout` for a free one."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = 0.0
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise psycopg2.OperationalError(
+                        f'Connection pool {self.name} is closed.')
+                item = self._take_idle()
+                if item is None and self.size >= self.max_size:
+                    wait_start = time.monotonic()
+                    self._waiting += 1
+                    try:
+                        self._lock.wait(deadline - wait_start)
+                    finally:
+                        self._waiting -= 1
+                        waited += time.monotonic() - wait_start
+                    if (time.monotonic() >= deadline
+                            and not self._idle
+                            and self.size >= self.max_size):
+                        self._counters['timeouts'] += 1
+                        self._record_wait(waited)
+                        raise PoolTimeout(
+                            f'No connection available in pool {self.name} '
+                            f'after {self.timeout}s '
+                            f'({self.max_size} in use).')
+                    continue
+                if item is None:
+                    self._opening += 1
+
+            if item is None:
+                item = self._open()
+            elif not self._healthy(item):
+                continue
+            break
+
+        with self._lock:
+            item.last_used = time.monotonic()
+            self._in_use[id(item.connection)] = item
+            self._counters['checkouts'] += 1
+            self._record_wait(waited)
+            elapsed = time.monotonic() - start
+            self._counters['checkout_time'] += elapsed
+            self._latencies.append(elapsed)
+        self._fill()
+        return item.connection
+
+    def putconn(self, connection):
+        """
+        Return a connection to the pool, rolling back any open transaction.
+        Broken or expired connections are closed instead.
+        """
+        with self._lock:
+            item = self._in_use.pop(id(connection), None)
+        if item is None:
+            self._discard(connection)
+            return
+
+        status = connection.info.transaction_status \
+            if not connection.closed else None
+        if status in (psycopg2.extensions.TRANSACTION_STATUS_INTRANS,
+                      psycopg2.extensions.TRANSACTION_STATUS_INERROR):
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                status = None
+            else:
+                status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        now = time.monotonic()
+        if (status != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+                or item.expired(now) or self._closed):
+            self._discard(connection)
+            with self._lock:
+                self._lock.notify()
+            self._fill()
+            return
+
+        with self._lock:
+            item.last_used = now
+            self._idle.append(item)
+            self._lock.notify()
+
+    def fill(self):
+        """Open connections up to min_size in the calling thread."""
+        while True:
+            with self._lock:
+                if self._closed or self.size >= self.min_size:
+                    return
+                self._opening += 1
+            item = self._open()
+            with self._lock:
+                self._idle.appendleft(item)
+                self._lock.notify()
+
+    def close(self):
+        """Close the idle connections and refuse further checkouts."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._lock.notify_all()
+        for item in idle:
+            self._discard(item.connection)
+
+    def stats(self):
+        """Return the current pool gauges and counters."""
+        with self._lock:
+            latencies = list(self._latencies)
+            stats = {
+                'name': self.name,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self.size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                **self._counters,
+            }
+        for key in ('wait_time', 'wait_time_max', 'checkout_time'):
+            stats[f'{key}_ms'] = round(stats.pop(key) * 1000, 3)
+        if len(latencies) >= 2:
+            percentiles = quantiles(latencies, n=100)
+            for percentile in (50, 95, 99):
+                stats[f'checkout_p{percentile}_ms'] = round(
+                    percentiles[percentile - 1] * 1000, 3)
+        return stats
+
+    def _take_idle(self):
+        """
+        Pop the most recently used idle connection, closing expired ones.
+        Must be called with the lock held.
+        """
+        now = time.monotonic()
+        self._close_surplus(now)
+        while self._idle:
+            item = self._idle.pop()
+            if item.expired(now) or item.connection.closed:
+                self._discard_later(item)
+                continue
+            return item
+        return None
+
+    def _close_surplus(self, now):
+        """
+        Close connections idle for longer than max_idle while above
+        min_size. The least recently used ones are at the left.
+        """
+        while (self._idle and self.size > self.min_size
+               and now - self._idle[0].last_used > self.max_idle):
+            self._discard_later(self._idle.popleft())
+
+    def _discard_later(self, item):
+        # Closing may block on the network, so don't do it under the lock.
+        threading.Thread(target=self._discard, args=(item.connection,),
+                         daemon=True).start()
+
+    def _healthy(self, item):
+        """
+        Check a connection idle for longer than check_idle with a ping.
+        A failed check closes the connection.
+        """
+        if time.monotonic() - item.last_used < self.check_idle:
+            return True
+        try:
+            with item.connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            # Outside autocommit the ping opened a transaction, which
+            # would stop Django from setting up the connection.
+            if not item.connection.autocommit:
+                item.connection.rollback()
+        except psycopg2.Error:
+            with self._lock:
+                self._counters['health_checks_failed'] += 1
+            self._discard(item.connection)
+            return False
+        return True
+
+    def _open(self):
+        """Open a connection for a slot reserved by the caller."""
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._lock:
+                self._opening -= 1
+                self._counters['connections_failed'] += 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._opening -= 1
+            self._counters['connections_opened'] += 1
+        return PooledConnection(connection, self.max_lifetime)
+
+    def _discard(self, connection):
+        with self._lock:
+            self._counters['connections_closed'] += 1
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _fill(self):
+        """Open connections up to min_size in a background thread."""
+        with self._lock:
+            if self._filling or self._closed or self.size >= self.min_size:
+                return
+            self._filling = True
+        threading.Thread(target=self._fill_worker, daemon=True,
+                         name=f'pool-fill-{self.name}').start()
+
+    def _fill_worker(self):
+        try:
+            self.fill()
+        except Exception:
+            # The next checkout reports connection errors.
+            pass
+        finally:
+            with self._lock:
+                self._filling = False
+
+    def _record_wait(self, waited):
+        self._counters['wait_time'] += waited
+        self._counters['wait_time_max'] = max(
+            self._counters['wait_time_max'], waited)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, connect, **options):
+    """
+    Return the pool for `key` in this process, creating it if needed.
+
+    Pools are kept per process: connections inherited across fork()
+    must not be shared with the parent, so they are left untouched.
+    """
+    key = (os.getpid(), key)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(connect, **options)
+    return pool
+
+
+def all_pools():
+    """Return the pools of this process."""
+    pid = os.getpid()
+    return [pool for (pool_pid, _), pool in list(_pools.items())
+            if pool_pid == pid]
+
+
+def close_pools(predicate=None):
+    """Close and forget the pools of this process matching predicate."""
+    pid = os.getpid()
+    with _pools_lock:
+        keys = [key for key, pool in _pools.items()
+                if key[0] == pid and (predicate is None or predicate(pool))]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
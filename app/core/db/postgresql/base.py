@@ -0,0 +1,54 @@
+"""
+PostgreSQL backend keeping connections in a per-process pool.
+
+Closing a connection returns it to the pool, so with CONN_MAX_AGE = 0
+each request checks a connection out and returns it when it finishes.
+Configure the pool with the POOL key of the database settings, see
+core.db.pool.DEFAULTS.
+"""
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.base import IsolationLevel
+
+from core.db.pool import DEFAULTS, get_pool
+from core.db.postgresql.creation import DatabaseCreation
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def pool_options(self):
+        options = self.settings_dict.get('POOL') or {}
+        return {name.lower(): options.get(name, default)
+                for name, default in DEFAULTS.items()}
+
+    def pool_key(self, conn_params):
+        return (self.alias, tuple(sorted(
+            (name, str(value)) for name, value in conn_params.items())))
+
+    def get_new_connection(self, conn_params):
+        # Connections without a database, e.g. to create the test
+        # database, are short-lived and not worth pooling.
+        if not self.settings_dict['NAME']:
+            self.pool = None
+            return super().get_new_connection(conn_params)
+        pool = get_pool(
+            self.pool_key(conn_params),
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params),
+            name=f"{self.alias}:{self.settings_dict['NAME']}",
+            **self.pool_options(),
+        )
+        connection = pool.getconn()
+        isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level')
+        self.isolation_level = IsolationLevel.READ_COMMITTED \
+            if isolation_level is None else IsolationLevel(isolation_level)
+        self.pool = pool
+        return connection
+
+    def _close(self):
+        pool = getattr(self, 'pool', None)
+        if self.connection is None or pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
@@ -0,0 +1,24 @@
+from django.db.backends.postgresql import creation
+
+from core.db.pool import close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """
+    Test database creation closing pooled connections to a database
+    before it is dropped or copied, which Postgres refuses while other
+    sessions are connected to it.
+    """
+
+    def close_database_pools(self, database_name):
+        name = f'{self.connection.alias}:{database_name}'
+        close_pools(lambda pool: pool.name == name)
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        self.connection.close()
+        self.close_database_pools(self.connection.settings_dict['NAME'])
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        self.close_database_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
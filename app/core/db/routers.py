@@ -0,0 +1,267 @@
+"""
+Database router sending reads to replicas, with read-your-writes.
+
+Reads go to a replica in READ_REPLICAS['ALIASES'], picked round-robin or
+by least replication lag. Writes, reads in a transaction on the primary,
+and reads that lock rows go to the primary. After a write, the reads of
+the same request, and of the same client for STICKY_SECONDS, go to the
+primary too, so they see it before it is replicated. Clients are tracked
+by a cookie and, for token authenticated requests, by user id, see
+ReplicaPinningMiddleware and pin_user().
+"""
+import itertools
+import math
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+DEFAULTS = {
+    'ALIASES': [],
+    # 'round_robin' or 'least_lag'.
+    'STRATEGY': 'round_robin',
+    'STICKY_SECONDS': 5,
+    # Replicas lagging more than this many seconds, or failing the lag
+    # check, are skipped. None disables lag checks for round_robin.
+    'MAX_LAG': None,
+    'LAG_CHECK_INTERVAL': 2,
+    'CACHE_ALIAS': 'default',
+    'COOKIE_NAME': 'primary_pin',
+}
+
+STRATEGIES = ('round_robin', 'least_lag')
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+LAG_SQL = {
+    'postgresql': (
+        'SELECT CASE WHEN pg_is_in_recovery() THEN COALESCE(EXTRACT(EPOCH '
+        'FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END'
+    ),
+}
+
+
+def get_replica_setting(name):
+    """Return a value from settings.READ_REPLICAS or its default."""
+    return getattr(settings, 'READ_REPLICAS', {}).get(name, DEFAULTS[name])
+
+
+class RoutingState:
+    """Where the reads of the current request or thread may go."""
+
+    __slots__ = ('pinned_until', 'wrote', 'user_id', 'user_checked')
+
+    def __init__(self, pinned=False):
+        self.pinned_until = math.inf if pinned else 0.0
+        self.wrote = False
+        self.user_id = None
+        self.user_checked = False
+
+    def pin(self):
+        self.wrote = True
+        self.pinned_until = max(
+            self.pinned_until,
+            time.monotonic() + get_replica_setting('STICKY_SECONDS'))
+
+    def pinned(self):
+        if time.monotonic() < self.pinned_until:
+            return True
+        if self.user_id is not None and not self.user_checked:
+            self.user_checked = True
+            if get_pin_cache().get(user_pin_key(self.user_id)):
+                self.pinned_until = math.inf
+                return True
+        return False
+
+
+_state = ContextVar('replica_routing_state', default=None)
+
+
+def get_state():
+    state = _state.get()
+    if state is None:
+        state = RoutingState()
+        _state.set(state)
+    return state
+
+
+def get_pin_cache():
+    return caches[get_replica_setting('CACHE_ALIAS')]
+
+
+def user_pin_key(user_id):
+    return f'db-pin:{user_id}'
+
+
+def pin_user(user_id):
+    """
+    Record the authenticated user of the current request, whose reads go
+    to the primary if they wrote in the last STICKY_SECONDS. The pin is
+    only looked up if the request reads from a replica.
+    """
+    state = get_state()
+    state.user_id = str(user_id)
+    state.user_checked = False
+
+
+def measure_lag(alias):
+    """Return the replication lag of a replica in seconds."""
+    connection = connections[alias]
+    sql = LAG_SQL.get(connection.vendor)
+    if sql is None:
+        # Stand-in replicas, e.g. SQLite files in tests, have no lag.
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        return float(cursor.fetchone()[0])
+
+
+class ReplicaLag:
+    """Per-process replication lag of the replicas, refreshed lazily."""
+
+    def __init__(self):
+        self._lags = {}
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+
+    def get(self):
+        """
+        Return a dict of lags by alias, measuring them if they are older
+        than LAG_CHECK_INTERVAL. Only the first measurement is waited for
+        by other threads.
+        """
+        if (time.monotonic() >= self._next_check
+                and self._lock.acquire(blocking=not self._lags)):
+            try:
+                if time.monotonic() >= self._next_check:
+                    self._lags = self.measure()
+                    self._next_check = time.monotonic() + \
+                        get_replica_setting('LAG_CHECK_INTERVAL')
+            finally:
+                self._lock.release()
+        return self._lags
+
+    def measure(self):
+        lags = {}
+        for alias in get_replica_setting('ALIASES'):
+            try:
+                lags[alias] = measure_lag(alias)
+            except DatabaseError:
+                lags[alias] = math.inf
+        return lags
+
+    def clear(self):
+        with self._lock:
+            self._lags = {}
+            self._next_check = 0.0
+
+
+replica_lag = ReplicaLag()
+
+
+class ReplicaRouter:
+    """Route reads to replicas and everything else to the primary."""
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replica_setting('ALIASES')
+        if not replicas or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        if get_state().pinned():
+            return PRIMARY
+        return self.choose_replica(replicas)
+
+    def db_for_write(self, model, **hints):
+        get_state().pin()
+        return PRIMARY
+
+    def choose_replica(self, replicas):
+        # Rotating the candidates spreads reads over replicas with equal
+        # lag, e.g. all of them when lag isn't checked.
+        start = next(self._counter) % len(replicas)
+        replicas = replicas[start:] + replicas[:start]
+        strategy = get_replica_setting('STRATEGY')
+        max_lag = get_replica_setting('MAX_LAG')
+        if strategy == 'round_robin' and max_lag is None:
+            return replicas[0]
+
+        lags = replica_lag.get()
+        if max_lag is not None:
+            replicas = [alias for alias in replicas
+                        if lags.get(alias, 0) <= max_lag]
+            if not replicas:
+                return PRIMARY
+        if strategy == 'least_lag':
+            return min(replicas, key=lambda alias: lags.get(alias, 0))
+        return replicas[0]
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *get_replica_setting('ALIASES')}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema from the primary.
+        if db in get_replica_setting('ALIASES'):
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Give each request its own routing state, pinned to the primary if the
+    client wrote in the last STICKY_SECONDS, and pin clients that write.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        self.finish(state, response)
+        return response
+
+    async def __acall__(self, request):
+        state, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        self.finish(state, response)
+        return response
+
+    def start(self, request):
+        cookie_name = get_replica_setting('COOKIE_NAME')
+        state = RoutingState(pinned=cookie_name in request.COOKIES)
+        return state, _state.set(state)
+
+    def finish(self, state, response):
+        if not state.wrote or not get_replica_setting('ALIASES'):
+            return
+        sticky_seconds = get_replica_setting('STICKY_SECONDS')
+        response.set_cookie(
+            get_replica_setting('COOKIE_NAME'), '1',
+            max_age=sticky_seconds, httponly=True, samesite='Lax')
+        if state.user_id is not None:
+            get_pin_cache().set(
+                user_pin_key(state.user_id), True, sticky_seconds)
@@ -0,0 +1,171 @@
+"""
+Per-request performance metrics.
+
+RequestMetricsMiddleware starts a RequestMetrics for each request in a
+context variable, which also follows the request into sync_to_async
+threads. Code records into it with timing(); database queries are
+recorded by a wrapper installed on every connection. DRF is timed through
+its extension points: the authentication class, FastJSONRenderer and
+TimedSerializerMixin on the serializers.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from rest_framework.fields import empty
+
+
+DEFAULTS = {
+    # Send the metrics in a Server-Timing header. They reveal how long
+    # e.g. password checks took, so only enable it where that's fine.
+    'SERVER_TIMING': False,
+    # Fraction of requests logged to the core.request_metrics logger.
+    'LOG_SAMPLE_RATE': 0.01,
+    # Requests slower than this are always logged, with their queries.
+    'SLOW_REQUEST_MS': 500,
+    # Queries kept per request for slow request logs.
+    'MAX_QUERIES': 200,
+}
+
+# Timed sections, in the order they are reported.
+SECTIONS = ['auth', 'serializer', 'hashing', 'render']
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def get_setting(name):
+    return getattr(settings, 'REQUEST_METRICS', {}).get(name, DEFAULTS[name])
+
+
+class RequestMetrics:
+    """Timings and queries of one request."""
+
+    def __init__(self, max_queries):
+        self.start = time.perf_counter()
+        self.max_queries = max_queries
+        self.timings = dict.fromkeys(SECTIONS, 0.0)
+        self.active = set()
+        self.query_count = 0
+        self.query_time = 0.0
+        self.slowest_query = None
+        self.slowest_query_time = 0.0
+        self.queries = []
+
+    def add(self, section, seconds):
+        self.timings[section] = self.timings.get(section, 0.0) + seconds
+
+    def add_query(self, alias, sql, seconds):
+        self.query_count += 1
+        self.query_time += seconds
+        if seconds >= self.slowest_query_time:
+            self.slowest_query = sql
+            self.slowest_query_time = seconds
+        if len(self.queries) < self.max_queries:
+            self.queries.append((alias, sql, seconds))
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self, total):
+        """Return the metrics as a Server-Timing header value."""
+        entries = [
+            f'db;dur={self.query_time * 1000:.1f};'
+            f'desc="{self.query_count} queries"',
+        ]
+        if self.query_count:
+            entries.append(
+                f'db-slowest;dur={self.slowest_query_time * 1000:.1f}')
+        entries += [f'{section};dur={seconds * 1000:.1f}'
+                    for section, seconds in self.timings.items() if seconds]
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+    def as_dict(self, total, with_queries=False):
+        data = {
+            'duration_ms': round(total * 1000, 3),
+            'query_count': self.query_count,
+            'query_time_ms': round(self.query_time * 1000, 3),
+            'slowest_query': self.slowest_query,
+            'slowest_query_ms': round(self.slowest_query_time * 1000, 3),
+            **{f'{section}_ms': round(seconds * 1000, 3)
+               for section, seconds in self.timings.items()},
+        }
+        if with_queries:
+            data['queries'] = [
+                {'alias': alias, 'sql': sql,
+                 'duration_ms': round(seconds * 1000, 3)}
+                for alias, sql, seconds in self.queries
+            ]
+        return data
+
+
+def start_request():
+    """Start collecting metrics for the current context."""
+    metrics = RequestMetrics(get_setting('MAX_QUERIES'))
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def get_current():
+    """Return the metrics of the current request, or None."""
+    return _current.get()
+
+
+@contextmanager
+def timing(section):
+    """
+    Add the time spent in the block to a section of the current request's
+    metrics. Nested blocks of the same section are only counted once.
+    """
+    metrics = _current.get()
+    if metrics is None or section in metrics.active:
+        yield
+        return
+    metrics.active.add(section)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.active.discard(section)
+        metrics.add(section, time.perf_counter() - start)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper timing queries of instrumented requests."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(context['connection'].alias, sql,
+                          time.perf_counter() - start)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver adding record_query to the connection."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin adding validation and representation, including
+    nested and list items, to the serializer section of the request.
+    save() isn't timed, its queries and password hashing are reported
+    on their own.
+    """
+
+    def run_validation(self, data=empty):
+        with timing('serializer'):
+            return super().run_validation(data)
+
+    def to_representation(self, instance):
+        with timing('serializer'):
+            return super().to_representation(instance)
@@ -0,0 +1,112 @@
+"""
+Django command to benchmark the API against query budgets and a baseline
+"""
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from core import benchmarks
+
+
+class Command(BaseCommand):
+    """Django command to run the API benchmark scenarios."""
+
+    help = ('Seed a test database, send requests to the API in-process and '
+            'fail if a query budget is exceeded or latency or throughput '
+            'regressed against the baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenarios', nargs='*',
+            help='Scenarios to run, all registered ones by default.',
+        )
+        parser.add_argument(
+            '--scale', type=float, default=1.0,
+            help='Fraction of the realistic data volume to seed, 1 seeds '
+                 '100k users with 2M addresses.',
+        )
+        parser.add_argument(
+            '--requests', type=int,
+            help='Timed requests per scenario, overriding the scenarios.',
+        )
+        parser.add_argument(
+            '--baseline',
+            default=str(settings.BASE_DIR / 'benchmarks' / 'baseline.json'),
+            help='JSON file with the baseline results per database vendor.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Allowed regression against the baseline, as a fraction.',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Store the results as the new baseline.',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Keep the seeded test database for the next run.',
+        )
+        parser.add_argument(
+            '--use-current-db', action='store_true',
+            help="Run against the configured database instead of creating "
+                 "a test database. Seeded rows aren't removed.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        try:
+            scenarios = benchmarks.get_scenarios(options['scenarios'])
+        except KeyError as error:
+            raise CommandError(f'Unknown scenarios: {error.args[0]}')
+
+        setup_test_environment()
+        old_name = None
+        if not options['use_current_db']:
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, keepdb=options['keepdb'],
+                serialize=False)
+        # Scenarios log in and register far more often than the throttle
+        # allows from one client.
+        throttle = override_settings(
+            THROTTLE={**getattr(settings, 'THROTTLE', {}), 'RATES': {}})
+        try:
+            with throttle:
+                results = self.run(scenarios, options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(
+                    old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        vendor = connection.vendor
+        regressions = benchmarks.find_regressions(
+            results,
+            benchmarks.load_baseline(options['baseline'], vendor),
+            options['tolerance'],
+        )
+        if options['save_baseline']:
+            benchmarks.save_baseline(options['baseline'], vendor, results)
+            self.stdout.write(f"Saved the {vendor} baseline to "
+                              f"{options['baseline']}.")
+        if regressions:
+            raise CommandError(
+                'Regressions:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions.'))
+
+    def run(self, scenarios, options):
+        benchmarks.seed(options['scale'], self.stdout)
+        results = {}
+        for scenario in scenarios:
+            results[scenario.name] = result = benchmarks.run_scenario(
+                scenario, options['requests'])
+            self.stdout.write(f'{scenario.name}: ' + json.dumps(
+                {key: value for key, value in result.items()
+                 if key != 'sql'}))
+        return results
@@ -0,0 +1,315 @@
+"""
+Django command to import users and their addresses in bulk
+"""
+import csv
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from rest_framework.exceptions import ValidationError
+
+from user.hashing import PasswordHashingExecutor
+from user.models import Address
+from user.serializers import (
+    UNIQUE_FIELD_MESSAGES,
+    AddressSerializer,
+    UserImportSerializer,
+    get_unique_violation_field,
+)
+
+
+ADDRESS_FIELDS = ['street', 'city', 'zip_code', 'country']
+
+
+def read_csv(stream):
+    """Yield (line number, row) for each CSV record."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(stream):
+    """Yield (line number, row) for each JSON line, row is None if invalid."""
+    for line_num, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_num, row if isinstance(row, dict) else None
+
+
+def split_row(row):
+    """
+    Split an input row into user data and a list of address data.
+
+    Addresses are read from an `addresses` list (JSONL) or from flat
+    street/city/zip_code/country columns.
+    """
+    addresses = row.get('addresses')
+    if addresses is None:
+        address = {name: row[name] for name in ADDRESS_FIELDS
+                   if row.get(name)}
+        addresses = [address] if address else []
+    user_data = {
+        name: value for name, value in row.items()
+        if name not in ADDRESS_FIELDS + ['addresses']
+        and value not in ('', None)
+    }
+    return user_data, addresses
+
+
+class PendingRow:
+    """A validated input row waiting to be inserted."""
+
+    def __init__(self, line_num, row, user_data, addresses):
+        self.line_num = line_num
+        self.row = row
+        self.user_data = user_data
+        self.addresses = addresses
+        self.user = None
+
+
+class Command(BaseCommand):
+    """Django command to import users from CSV or JSONL."""
+
+    help = ('Import users and addresses from a CSV or JSONL file, '
+            'validating rows with the registration rules.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help="CSV or JSONL file to import, '-' for stdin.")
+        parser.add_argument(
+            '--format', choices=['csv', 'jsonl'],
+            help='Input format. Guessed from the file extension by default.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows validated and inserted together.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Processes hashing raw passwords, 0 hashes in this process.',
+        )
+        parser.add_argument(
+            '--rejects', default='rejects.jsonl',
+            help='JSONL file receiving rejected rows and their errors.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        path = options['path']
+        input_format = options['format']
+        if input_format is None:
+            input_format = 'jsonl' if path.endswith(
+                ('.jsonl', '.ndjson')) else 'csv'
+        reader = read_jsonl if input_format == 'jsonl' else read_csv
+
+        if path == '-':
+            # Left open for the caller.
+            stream = nullcontext(sys.stdin)
+        else:
+            try:
+                stream = open(path, newline='', encoding='utf-8')
+            except OSError as error:
+                raise CommandError(f"Can't open {path}: {error}")
+
+        self.batch_size = options['batch_size']
+        self.executor = None
+        if options['workers']:
+            self.executor = PasswordHashingExecutor(
+                backend='process',
+                max_workers=options['workers'],
+                max_pending=self.batch_size,
+                queue_timeout=None,
+            )
+        self.processed = self.imported = self.rejected = 0
+
+        start = time.perf_counter()
+        try:
+            with stream as file, open(options['rejects'], 'w',
+                                      newline='',
+                                      encoding='utf-8') as self.rejects:
+                rows = reader(file)
+                while True:
+                    batch = list(islice(rows, self.batch_size))
+                    if not batch:
+                        break
+                    self.import_batch(batch)
+                    self.report(start)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.imported} users, rejected {self.rejected} '
+            f'rows in {time.perf_counter() - start:.1f}s.'
+        ))
+
+    def report(self, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{self.processed} rows processed, {self.imported} imported, '
+            f'{self.rejected} rejected ({self.processed / elapsed:.0f} '
+            f'rows/sec)'
+        )
+
+    def reject(self, line_num, row, errors):
+        """Write a rejected row, without its raw password, to the rejects."""
+        if isinstance(row, dict):
+            row = {name: value for name, value in row.items()
+                   if name not in ('password', 'password2')}
+        self.rejects.write(json.dumps(
+            {'line': line_num, 'row': row, 'errors': errors}) + '\n')
+        self.rejected += 1
+
+    def import_batch(self, batch):
+        """Validate, deduplicate, hash and insert one batch of rows."""
+        self.processed += len(batch)
+        pending = self.validate_rows(batch)
+        pending = self.reject_duplicates(pending)
+        self.hash_passwords(pending)
+
+        User = get_user_model()
+        for item in pending:
+            item.user = User(**item.user_data)
+        try:
+            with transaction.atomic():
+                self.insert(pending)
+        except IntegrityError:
+            # A concurrent writer won a race on a unique field; retry row
+            # by row so only the conflicting rows are rejected.
+            for item in pending:
+                item.user.pk = None
+                try:
+                    with transaction.atomic():
+                        self.insert([item])
+                except IntegrityError as error:
+                    field = get_unique_violation_field(error, User)
+                    self.reject(item.line_num, item.row, {
+                        field or 'non_field_errors': [
+                            UNIQUE_FIELD_MESSAGES.get(field, str(error))
+                        ]
+                    })
+                    continue
+                self.imported += 1
+        else:
+            self.imported += len(pending)
+
+    def validate_rows(self, batch):
+        """
+        Return PendingRows for the rows passing serializer validation.
+
+        The serializers are built once and reused for every row, since
+        building their fields costs far more than validating a row.
+        """
+        user_serializer = UserImportSerializer()
+        address_serializer = AddressSerializer()
+        pending = []
+        for line_num, row in batch:
+            if row is None:
+                self.reject(line_num, row,
+                            {'non_field_errors': ['Invalid JSON object.']})
+                continue
+            user_data, addresses = split_row(row)
+            errors = {}
+            try:
+                user_data = user_serializer.run_validation(user_data)
+            except ValidationError as error:
+                errors.update(error.detail)
+            if not isinstance(addresses, list):
+                errors['addresses'] = ['Expected a list of addresses.']
+            else:
+                address_errors = []
+                for index, address in enumerate(addresses):
+                    try:
+                        addresses[index] = \
+                            address_serializer.run_validation(address)
+                        address_errors.append({})
+                    except ValidationError as error:
+                        address_errors.append(error.detail)
+                if any(address_errors):
+                    errors['addresses'] = address_errors
+            if errors:
+                self.reject(line_num, row, errors)
+                continue
+            pending.append(PendingRow(line_num, row, user_data, addresses))
+        return pending
+
+    def reject_duplicates(self, pending):
+        """
+        Reject rows whose unique fields repeat within the batch or already
+        exist in the database, using a single query per batch.
+        """
+        values = {name: {item.user_data[name] for item in pending}
+                  for name in UNIQUE_FIELD_MESSAGES}
+        condition = Q()
+        for name, field_values in values.items():
+            condition |= Q(**{f'{name}__in': field_values})
+        taken = {name: set() for name in UNIQUE_FIELD_MESSAGES}
+        if pending:
+            existing = get_user_model().objects.filter(condition) \
+                .values_list(*UNIQUE_FIELD_MESSAGES)
+            for row in existing:
+                for name, value in zip(UNIQUE_FIELD_MESSAGES, row):
+                    taken[name].add(value)
+
+        accepted = []
+        for item in pending:
+            errors = {
+                name: [message]
+                for name, message in UNIQUE_FIELD_MESSAGES.items()
+                if item.user_data[name] in taken[name]
+            }
+            if errors:
+                self.reject(item.line_num, item.row, errors)
+                continue
+            for name in UNIQUE_FIELD_MESSAGES:
+                taken[name].add(item.user_data[name])
+            accepted.append(item)
+        return accepted
+
+    def hash_passwords(self, pending):
+        """Replace raw passwords with hashes, in parallel if enabled."""
+        raw = [item for item in pending
+               if 'password_hash' not in item.user_data]
+        if self.executor is not None:
+            hashes = [self.executor.submit(make_password,
+                                           item.user_data['password'])
+                      for item in raw]
+            hashes = [future.result() for future in hashes]
+        else:
+            hashes = [make_password(item.user_data['password'])
+                      for item in raw]
+        for item, encoded in zip(raw, hashes):
+            item.user_data['password_hash'] = encoded
+
+        for item in pending:
+            item.user_data['password'] = item.user_data.pop('password_hash')
+            item.user_data.pop('password2', None)
+
+    def insert(self, pending):
+        """Insert the users, then their addresses, with one query each."""
+        get_user_model().objects.bulk_create(
+            [item.user for item in pending], batch_size=self.batch_size)
+        addresses = [
+            Address(user=item.user, **address)
+            for item in pending
+            for address in item.addresses
+        ]
+        # bulk_create() doesn't call save(), so fingerprint here. Repeated
+        # addresses of a user are skipped like in the address API.
+        for address in addresses:
+            address.fingerprint = address.compute_fingerprint()
+        Address.objects.bulk_create(addresses, batch_size=self.batch_size,
+                                    ignore_conflicts=True)
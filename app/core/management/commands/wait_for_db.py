@@ -1,27 +1,79 @@
 """
 Django command to wait for the database to be available
 """
+import random
 import time
 
 from psycopg2 import OperationalError as Psycopg20pError
 
+from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to wait for database."""
 
+    help = ('Wait until the databases accept connections, retrying with '
+            'jittered exponential backoff.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help='Database alias to wait for, can be repeated. '
+                 'Defaults to "default".',
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait in total before failing.',
+        )
+        parser.add_argument(
+            '--initial-delay', type=float, default=0.05,
+            help='Seconds to wait after the first failed attempt.',
+        )
+        parser.add_argument(
+            '--max-delay', type=float, default=2,
+            help='Longest wait between attempts.',
+        )
+
     def handle(self, *args, **options):
         """Entrypoint for command"""
         self.stdout.write('Waiting for database...')
-        db_up = False
-        while db_up is False:
-            try:
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg20pError, OperationalError):
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+        deadline = time.monotonic() + options['timeout']
+        for alias in options['databases'] or ['default']:
+            self.wait_for(alias, deadline, options['initial_delay'],
+                          options['max_delay'])
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
+
+    def wait_for(self, alias, deadline, initial_delay, max_delay):
+        """Probe the database until it answers or the deadline passes."""
+        attempt = 0
+        while True:
+            try:
+                self.probe(alias)
+                return
+            except (Psycopg20pError, OperationalError) as error:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"Database '{alias}' unavailable: {error}")
+            # Equal jitter: at least half the backoff, so retries of many
+            # containers starting together spread out but still back off.
+            delay = min(max_delay, initial_delay * 2 ** attempt)
+            delay = min(remaining, delay / 2 + random.uniform(0, delay / 2))
+            self.stdout.write(
+                f"Database '{alias}' unavailable, waiting {delay:.2f}s...")
+            time.sleep(delay)
+            attempt += 1
+
+    def probe(self, alias):
+        """
+        Open a connection to the database, without running the system
+        checks. The connection is closed, or returned to its pool.
+        """
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+        finally:
+            connection.close()
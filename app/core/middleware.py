@@ -0,0 +1,72 @@
+"""
+Middleware for the core app.
+"""
+import logging
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from core import instrumentation
+
+
+logger = logging.getLogger('core.request_metrics')
+
+
+class RequestMetricsMiddleware:
+    """
+    Collect per-request timings, SQL queries and, if enabled, send them in
+    a Server-Timing header. A sample of requests is logged, and requests
+    slower than SLOW_REQUEST_MS are always logged with their queries.
+    Place it first so the total covers the other middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = instrumentation.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.end_request(token)
+        self.finish(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token = instrumentation.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.end_request(token)
+        self.finish(request, response, metrics)
+        return response
+
+    def finish(self, request, response, metrics):
+        total = metrics.elapsed()
+        get_setting = instrumentation.get_setting
+        if get_setting('SERVER_TIMING'):
+            response['Server-Timing'] = metrics.server_timing(total)
+
+        slow = total * 1000 >= get_setting('SLOW_REQUEST_MS')
+        if not slow and random.random() >= get_setting('LOG_SAMPLE_RATE'):
+            return
+        data = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **metrics.as_dict(total, with_queries=slow),
+        }
+        logger.log(
+            logging.WARNING if slow else logging.INFO,
+            '%s %s %s %.1fms, %d queries in %.1fms',
+            request.method, request.path, response.status_code,
+            total * 1000, metrics.query_count, metrics.query_time * 1000,
+            extra={'request_metrics': data},
+        )
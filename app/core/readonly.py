@@ -0,0 +1,188 @@
+"""
+Compiled read-only model serializers.
+
+A ModelSerializer builds its fields for every serializer and calls
+get_attribute() and to_representation() per field per object. For
+serializers made of plain model columns, compile_serializer() resolves
+the fields once into a flat list of (key, column, converter), so that
+rows fetched with .values() are turned into the same representation
+without hydrating model instances. Converters are skipped where the
+field's to_representation() would return the database value unchanged,
+as for ReadOnlyField.
+"""
+import functools
+from operator import attrgetter, itemgetter
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from core.instrumentation import TimedSerializerMixin, timing
+
+
+# Field classes returning database values of these model field types
+# unchanged.
+UNCHANGED_VALUES = {
+    serializers.CharField.to_representation: {
+        'CharField', 'TextField', 'EmailField', 'SlugField', 'URLField',
+    },
+    serializers.IntegerField.to_representation: {
+        'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField',
+        'BigIntegerField', 'SmallIntegerField', 'PositiveIntegerField',
+        'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+    },
+    serializers.BooleanField.to_representation: {'BooleanField'},
+}
+
+
+class CompiledSerializer:
+    """Read-only representation of a ModelSerializer's model columns."""
+
+    def __init__(self, serializer_class, keys, columns, converters):
+        self.serializer_class = serializer_class
+        self.keys = keys
+        self.columns = columns
+        # (position, converter) of the values that need converting.
+        self.converters = converters
+        self.get_row_values = self._getter(itemgetter)
+        self.get_instance_values = self._getter(attrgetter)
+
+    def _getter(self, getter):
+        if len(self.columns) == 1:
+            get = getter(self.columns[0])
+            return lambda obj: (get(obj),)
+        return getter(*self.columns)
+
+    def _build(self, values):
+        if self.converters:
+            values = list(values)
+            for position, convert in self.converters:
+                if values[position] is not None:
+                    values[position] = convert(values[position])
+        return dict(zip(self.keys, values))
+
+    def values(self, queryset, *extra):
+        """
+        Return queryset fetching just the columns, and any extra fields or
+        annotations, as dicts.
+        """
+        return queryset.values(*self.columns, *extra)
+
+    def only(self, queryset):
+        """Return queryset loading just the columns into instances."""
+        return queryset.only(*self.columns)
+
+    def to_representation(self, obj):
+        """Represent a row from values() or a model instance."""
+        if isinstance(obj, dict):
+            return self._build(self.get_row_values(obj))
+        return self._build(self.get_instance_values(obj))
+
+    def many(self, objects):
+        """Represent rows from values() or model instances."""
+        objects = list(objects)
+        if not objects:
+            return []
+        if isinstance(objects[0], dict):
+            get = self.get_row_values
+        else:
+            get = self.get_instance_values
+        build = self._build
+        return [build(get(obj)) for obj in objects]
+
+
+def is_foreign_key_id(field, model_field):
+    """Return whether a field represents a foreign key by its pk column."""
+    return (
+        type(field) is serializers.PrimaryKeyRelatedField
+        and field.pk_field is None
+        and model_field.many_to_one
+        and model_field.target_field.primary_key
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    """
+    Return the CompiledSerializer of a ModelSerializer class. Foreign keys
+    represented by their primary key are read from their column.
+    Serializers with any other fields than model columns, such as method
+    fields, other related or nested fields, or with a custom
+    to_representation(), raise ImproperlyConfigured.
+    """
+    if (
+        not issubclass(serializer_class, serializers.ModelSerializer)
+        or serializer_class.to_representation not in (
+            serializers.ModelSerializer.to_representation,
+            TimedSerializerMixin.to_representation)
+    ):
+        raise ImproperlyConfigured(
+            f'{serializer_class.__name__} must be a ModelSerializer without '
+            f'a custom to_representation() to be compiled.')
+
+    opts = serializer_class.Meta.model._meta
+    keys, columns, converters = [], [], []
+    for field in serializer_class()._readable_fields:
+        try:
+            source, = field.source_attrs
+            model_field = (opts.pk if source == 'pk'
+                           else opts.get_field(source))
+        except (ValueError, FieldDoesNotExist):
+            model_field = None
+        if (
+            model_field is None
+            or not model_field.concrete
+            or model_field.is_relation
+            and not is_foreign_key_id(field, model_field)
+        ):
+            raise ImproperlyConfigured(
+                f'{serializer_class.__name__}.{field.field_name} is not a '
+                f'model column and can\'t be compiled.')
+
+        to_representation = type(field).to_representation
+        unchanged = UNCHANGED_VALUES.get(to_representation, ())
+        if (
+            # Foreign key columns hold the related pk unchanged.
+            not model_field.is_relation
+            and to_representation is not serializers.ReadOnlyField
+            .to_representation
+            and model_field.get_internal_type() not in unchanged
+        ):
+            converters.append((len(keys), field.to_representation))
+        keys.append(field.field_name)
+        columns.append(model_field.attname)
+    return CompiledSerializer(serializer_class, keys, columns, converters)
+
+
+class CompiledSerializerMixin:
+    """
+    GenericAPIView mixin representing objects with the compiled
+    serializer_class. Lists fetch only the serializer's columns, with
+    .values(). Writes still use the serializer.
+    """
+
+    # Fields or annotations fetched with the columns in lists, e.g. to
+    # paginate by them.
+    extra_values = ()
+
+    def get_compiled_serializer(self):
+        return compile_serializer(self.get_serializer_class())
+
+    def get_representation(self, instance):
+        with timing('serializer'):
+            return self.get_compiled_serializer().to_representation(instance)
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        queryset = compiled.values(self.filter_queryset(self.get_queryset()),
+                                   *self.extra_values)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            with timing('serializer'):
+                data = compiled.many(page)
+            return self.get_paginated_response(data)
+
+        with timing('serializer'):
+            data = compiled.many(queryset)
+        return Response(data)
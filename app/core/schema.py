@@ -0,0 +1,143 @@
+"""
+Cache of the rendered OpenAPI schema, in memory and on disk.
+
+Entries are keyed by the code version, so a deploy with changed views or
+serializers never serves a stale schema. Set CODE_VERSION (e.g. to the
+git commit at build time) to avoid hashing the source files on startup.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import django
+import drf_spectacular
+from django.conf import settings
+
+
+_code_version = None
+_memory_cache = {}
+_lock = threading.Lock()
+
+
+def get_code_version():
+    """
+    Return CODE_VERSION, or a digest of the size and modification time of
+    the project's Python files and the Django and drf-spectacular versions.
+    """
+    global _code_version
+    if _code_version is None:
+        version = getattr(settings, 'CODE_VERSION', None)
+        if not version:
+            digest = hashlib.sha256(
+                f'{django.__version__}:{drf_spectacular.__version__}'.encode())
+            # Uploads, caches and hidden directories hold no source.
+            skipped = {os.path.realpath(path) for path in (
+                settings.MEDIA_ROOT, settings.STATIC_ROOT,
+                settings.SCHEMA_CACHE_DIR) if path}
+            for root, dirs, files in os.walk(settings.BASE_DIR):
+                dirs[:] = sorted(
+                    name for name in dirs
+                    if not name.startswith('.') and name != '__pycache__'
+                    and os.path.realpath(os.path.join(root, name))
+                    not in skipped)
+                for name in sorted(files):
+                    if not name.endswith('.py'):
+                        continue
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    digest.update(
+                        f'{path}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+            version = digest.hexdigest()[:16]
+        _code_version = version
+    return _code_version
+
+
+class SchemaEntry:
+    """A rendered schema and the headers it is served with."""
+
+    def __init__(self, content, content_type, filename):
+        self.content = content
+        self.content_type = content_type
+        self.filename = filename
+        self.etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+
+    def as_json(self):
+        return json.dumps({
+            'content': self.content.decode(),
+            'content_type': self.content_type,
+            'filename': self.filename,
+        })
+
+    @classmethod
+    def from_json(cls, data):
+        data = json.loads(data)
+        return cls(data['content'].encode(), data['content_type'],
+                   data['filename'])
+
+
+def get_cache_path(key):
+    digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return os.path.join(settings.SCHEMA_CACHE_DIR,
+                        f'{get_code_version()}-{digest}.json')
+
+
+def get_schema(key, build):
+    """
+    Return the SchemaEntry cached for key, calling build() to create it
+    on a miss in memory and on disk.
+    """
+    key = f'{get_code_version()}:{key}'
+    entry = _memory_cache.get(key)
+    if entry is not None:
+        return entry
+
+    with _lock:
+        entry = _memory_cache.get(key)
+        if entry is None:
+            entry = read_disk_cache(key)
+        if entry is None:
+            entry = build()
+            write_disk_cache(key, entry)
+        _memory_cache[key] = entry
+    return entry
+
+
+def read_disk_cache(key):
+    if not settings.SCHEMA_CACHE_DIR:
+        return None
+    try:
+        with open(get_cache_path(key)) as cache_file:
+            return SchemaEntry.from_json(cache_file.read())
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def write_disk_cache(key, entry):
+    """
+    Store an entry on disk and remove entries of other code versions.
+    A read-only or missing directory only disables the disk cache.
+    """
+    if not settings.SCHEMA_CACHE_DIR:
+        return
+    path = get_cache_path(key)
+    try:
+        os.makedirs(settings.SCHEMA_CACHE_DIR, exist_ok=True)
+        # Write then rename, so concurrent readers never see a partial file.
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as cache_file:
+            cache_file.write(entry.as_json())
+        os.replace(tmp_path, path)
+        prefix = f'{get_code_version()}-'
+        for name in os.listdir(settings.SCHEMA_CACHE_DIR):
+            if name.endswith('.json') and not name.startswith(prefix):
+                os.remove(os.path.join(settings.SCHEMA_CACHE_DIR, name))
+    except OSError:
+        pass
+
+
+def clear_memory_cache():
+    global _code_version
+    with _lock:
+        _memory_cache.clear()
+        _code_version = None
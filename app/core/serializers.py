@@ -0,0 +1,31 @@
+"""
+Serializers for the core API views.
+"""
+from rest_framework import serializers
+
+from core.instrumentation import TimedSerializerMixin
+
+
+class DatabasePoolStatsSerializer(TimedSerializerMixin,
+                                  serializers.Serializer):
+    """Serializer for the statistics of a database connection pool."""
+
+    name = serializers.CharField()
+    min_size = serializers.IntegerField()
+    max_size = serializers.IntegerField()
+    size = serializers.IntegerField()
+    in_use = serializers.IntegerField()
+    idle = serializers.IntegerField()
+    waiting = serializers.IntegerField()
+    checkouts = serializers.IntegerField()
+    timeouts = serializers.IntegerField()
+    connections_opened = serializers.IntegerField()
+    connections_closed = serializers.IntegerField()
+    connections_failed = serializers.IntegerField()
+    health_checks_failed = serializers.IntegerField()
+    wait_time_ms = serializers.FloatField()
+    wait_time_max_ms = serializers.FloatField()
+    checkout_time_ms = serializers.FloatField()
+    checkout_p50_ms = serializers.FloatField(required=False)
+    checkout_p95_ms = serializers.FloatField(required=False)
+    checkout_p99_ms = serializers.FloatField(required=False)
@@ -0,0 +1,104 @@
+"""
+Tests for the API benchmark suite.
+"""
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from core import benchmarks
+
+
+def result(**metrics):
+    """Return benchmark results with the given metrics changed."""
+    defaults = {
+        'queries': 1,
+        'query_budget': 1,
+        'requests': 100,
+        'p50_ms': 10.0,
+        'p95_ms': 20.0,
+        'p99_ms': 30.0,
+        'rps': 100.0,
+        'sql': ['SELECT 1'],
+    }
+    defaults.update(metrics)
+    return defaults
+
+
+class FindRegressionsTests(SimpleTestCase):
+    """Test comparing benchmark results with the baseline."""
+
+    def test_within_tolerance(self):
+        """Test small differences from the baseline pass."""
+        regressions = benchmarks.find_regressions(
+            {'endpoint': result(p50_ms=11.0, rps=90.0)},
+            {'endpoint': result()},
+            tolerance=0.2,
+        )
+
+        self.assertEqual(regressions, [])
+
+    def test_latency_and_throughput_regressions(self):
+        """Test slower latency and lower throughput are reported."""
+        regressions = benchmarks.find_regressions(
+            {'endpoint': result(p50_ms=13.0, p99_ms=60.0, rps=70.0)},
+            {'endpoint': result()},
+            tolerance=0.2,
+        )
+
+        self.assertEqual(len(regressions), 3)
+        self.assertIn('p50_ms 13.0', regressions[0])
+        self.assertIn('p99_ms 60.0', regressions[1])
+        self.assertIn('rps 70.0', regressions[2])
+
+    def test_query_budget_exceeded(self):
+        """Test exceeding the query budget fails without a baseline."""
+        regressions = benchmarks.find_regressions(
+            {'endpoint': result(queries=2, sql=['SELECT 1', 'SELECT 2'])},
+            {},
+            tolerance=0.2,
+        )
+
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('2 queries, budget is 1', regressions[0])
+        self.assertIn('SELECT 2', regressions[0])
+
+    def test_baseline_per_vendor(self):
+        """Test baselines are stored per database vendor without SQL."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'baseline.json'
+            benchmarks.save_baseline(path, 'sqlite', {'endpoint': result()})
+            benchmarks.save_baseline(
+                path, 'postgresql', {'endpoint': result(rps=5.0)})
+
+            sqlite = benchmarks.load_baseline(path, 'sqlite')
+            postgresql = benchmarks.load_baseline(path, 'postgresql')
+
+        self.assertEqual(sqlite['endpoint']['rps'], 100.0)
+        self.assertEqual(postgresql['endpoint']['rps'], 5.0)
+        self.assertNotIn('sql', sqlite['endpoint'])
+
+
+class RunScenarioTests(TestCase):
+    """Test running the registered scenarios."""
+
+    def test_user_scenarios_within_budget(self):
+        """Test the user API scenarios run within their query budgets."""
+        benchmarks.seed(0.00002, StringIO())
+        self.assertEqual(get_user_model().objects.count(), 2)
+        names = ['current-user', 'create-address', 'address-list']
+
+        for scenario in benchmarks.get_scenarios(names):
+            scenario.warmup = 1
+            metrics = benchmarks.run_scenario(scenario, requests=3)
+
+            self.assertLessEqual(metrics['queries'], metrics['query_budget'])
+            self.assertEqual(metrics['requests'], 3)
+            self.assertGreater(metrics['rps'], 0)
+
+    def test_unknown_scenario(self):
+        """Test asking for an unregistered scenario raises KeyError."""
+        with self.assertRaises(KeyError):
+            benchmarks.get_scenarios(['missing'])
@@ -1,34 +1,226 @@
 """
 Test custom Django management commands.
 """
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg20pError
 
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
 
+from core.warmup import STEPS, prewarm
 
-@patch("core.management.commands.wait_for_db.Command.check")
+
+@patch("core.management.commands.wait_for_db.Command.probe")
 class CommandTests(SimpleTestCase):
     """Test commands"""
 
-    def test_wait_for_db_ready(self, patched_check):
+    def test_wait_for_db_ready(self, patched_probe):
         """Test waiting for database if database ready."""
-        patched_check.return_value = True
+        patched_probe.return_value = None
 
-        call_command('wait_for_db')
+        call_command('wait_for_db', stdout=StringIO())
 
-        patched_check.assert_called_once_with(databases=['default'])
+        patched_probe.assert_called_once_with('default')
 
     @patch('time.sleep')
-    def test_wait_for_db_delay(self,  patched_sleep, patched_check):
+    def test_wait_for_db_delay(self,  patched_sleep, patched_probe):
         """Test waiting for database when getting OperationalError"""
-        patched_check.side_effect = [Psycopg20pError] * 2 + \
-            [OperationalError] * 3 + [True]
+        patched_probe.side_effect = [Psycopg20pError] * 2 + \
+            [OperationalError] * 3 + [None]
+
+        call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(patched_probe.call_count, 6)
+        patched_probe.assert_called_with('default')
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertEqual(len(delays), 5)
+        self.assertGreaterEqual(delays[0], 0.025)
+        self.assertLessEqual(delays[0], 0.05)
+        self.assertGreaterEqual(delays[4], 0.4)
+        self.assertLessEqual(delays[4], 0.8)
+
+    @patch('time.sleep')
+    def test_wait_for_db_max_delay(self, patched_sleep, patched_probe):
+        """Test the backoff doesn't grow beyond max_delay."""
+        patched_probe.side_effect = [OperationalError] * 10 + [None]
+
+        call_command('wait_for_db', max_delay=0.5, stdout=StringIO())
+
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertLessEqual(max(delays), 0.5)
+
+    def test_wait_for_db_timeout(self, patched_probe):
+        """Test the command fails once the total timeout has passed."""
+        patched_probe.side_effect = OperationalError('refused')
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=0.2, stdout=StringIO())
+
+        self.assertGreater(patched_probe.call_count, 1)
+
+    def test_wait_for_multiple_databases(self, patched_probe):
+        """Test every requested database alias is probed."""
+        call_command('wait_for_db', database=['default', 'replica'],
+                     stdout=StringIO())
+
+        self.assertEqual([call.args[0] for call in
+                          patched_probe.call_args_list],
+                         ['default', 'replica'])
+
+
+class PrewarmTests(TransactionTestCase):
+    """
+    Test prewarming a process. Opening the pools closes the connections,
+    which test transactions can't survive.
+    """
+
+    def test_prewarm_runs_every_step(self):
+        """Test each prewarm step runs and is reported."""
+        steps = []
+
+        with self.assertNoLogs('core.warmup', 'WARNING'):
+            prewarm(report=lambda name, elapsed: steps.append(name))
+
+        self.assertEqual(steps, [name for name, step in STEPS])
+        pool = getattr(connection, 'pool', None)
+        if pool is not None:
+            self.assertGreaterEqual(pool.stats()['size'], pool.min_size)
+
+    def test_failed_requests_logged(self):
+        """Test prewarm requests failing, e.g. without credentials, warn."""
+        with self.settings(PREWARM_PATHS=[reverse('user:current-user')]), \
+                self.assertLogs('core.warmup', 'WARNING'):
+            prewarm()
+
+
+class ImportUsersCommandTests(TestCase):
+    """Test the import_users command."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = Path(tmp_dir.name)
+        self.rejects = self.tmp_dir / 'rejects.jsonl'
+
+    def write(self, name, content):
+        path = self.tmp_dir / name
+        path.write_text(content)
+        return str(path)
+
+    def import_users(self, path, **options):
+        options.setdefault('workers', 0)
+        call_command('import_users', path, rejects=str(self.rejects),
+                     stdout=StringIO(), **options)
+        return [json.loads(line)
+                for line in self.rejects.read_text(
+                    encoding='utf-8').splitlines()]
+
+    def test_import_csv_with_addresses(self):
+        """Test importing users and their address from CSV."""
+        path = self.write('users.csv', (
+            'username,email,first_name,last_name,phone_number,password,'
+            'street,city,zip_code,country\n'
+            'jan,Jan@Example.com,Jan,Kowalski,123456789,Test1234,'
+            'Drzymaly 3,Poznan,60-613,Poland\n'
+            'anna,anna@example.com,Anna,Nowak,987654321,Test1234,,,,\n'
+        ))
+
+        rejects = self.import_users(path)
+
+        self.assertEqual(rejects, [])
+        user = get_user_model().objects.get(username='jan')
+        self.assertEqual(user.email, 'jan@example.com')
+        self.assertTrue(user.check_password('Test1234'))
+        self.assertEqual(user.addresses.get().city, 'Poznan')
+        self.assertFalse(
+            get_user_model().objects.get(username='anna').addresses.exists())
+
+    def test_import_jsonl_with_password_hash(self):
+        """Test pre-hashed passwords are stored as they are."""
+        password_hash = make_password('Legacy123')
+        path = self.write('users.jsonl', json.dumps({
+            'username': 'jan',
+            'email': 'jan@example.com',
+            'first_name': 'Jan',
+            'last_name': 'Kowalski',
+            'phone_number': '123456789',
+            'password_hash': password_hash,
+            'addresses': [
+                {'street': 'Drzymaly 3', 'city': 'Poznan',
+                 'zip_code': '60-613', 'country': 'Poland'},
+                {'street': 'Marszalkowska 1', 'city': 'Warsaw',
+                 'zip_code': '00-001', 'country': 'Poland'},
+            ],
+        }) + '\n')
+
+        self.import_users(path)
+
+        user = get_user_model().objects.get(username='jan')
+        self.assertEqual(user.password, password_hash)
+        self.assertEqual(user.addresses.count(), 2)
+
+    def test_invalid_and_duplicate_rows_rejected(self):
+        """Test invalid rows and duplicates go to the rejects file."""
+        get_user_model().objects.create_user(
+            email='taken@example.com', password='Test1234',
+            username='taken', phone_number='111111111',
+            first_name='Taken', last_name='User',
+        )
+        path = self.write('users.csv', (
+            'username,email,first_name,last_name,phone_number,password\n'
+            'jan,jan@example.com,Jan,Kowalski,123456789,Test1234\n'
+            'jan,jan2@example.com,Jan,Kowalski,123456780,Test1234\n'
+            'bad,bad@example.com,Bad,Phone,12ab,Test1234\n'
+            'other,taken@example.com,Other,User,222222222,Test1234\n'
+        ))
+
+        rejects = self.import_users(path, batch_size=2)
+
+        self.assertEqual([reject['line'] for reject in rejects], [3, 4, 5])
+        self.assertIn('username', rejects[0]['errors'])
+        self.assertIn('phone_number', rejects[1]['errors'])
+        self.assertIn('email', rejects[2]['errors'])
+        self.assertNotIn('password', rejects[0]['row'])
+        self.assertEqual(
+            set(get_user_model().objects.values_list('username', flat=True)),
+            {'taken', 'jan'},
+        )
+
+    def test_import_from_stdin(self):
+        """Test reading stdin leaves it open for the caller."""
+        stdin = StringIO(
+            'username,email,first_name,last_name,phone_number,password\n'
+            'zoe,zoe@example.com,Zoë,Żak,12ab,Test1234\n')
+
+        with patch('sys.stdin', stdin):
+            rejects = self.import_users('-', format='csv')
+
+        self.assertFalse(stdin.closed)
+        self.assertEqual(rejects[0]['row']['first_name'], 'Zoë')
+
+    def test_import_hashes_in_worker_processes(self):
+        """Test raw passwords can be hashed by worker processes."""
+        path = self.write('users.jsonl', json.dumps({
+            'username': 'jan',
+            'email': 'jan@example.com',
+            'first_name': 'Jan',
+            'last_name': 'Kowalski',
+            'phone_number': '123456789',
+            'password': 'Test1234',
+        }) + '\n')
 
-        call_command('wait_for_db')
+        self.import_users(path, workers=1)
 
-        self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
+        user = get_user_model().objects.get(username='jan')
+        self.assertTrue(user.check_password('Test1234'))
@@ -0,0 +1,228 @@
+"""
+Tests for the database connection pool.
+"""
+import threading
+import time
+
+import psycopg2
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_INERROR,
+    TRANSACTION_STATUS_UNKNOWN,
+)
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+DB_POOL_STATS_URL = reverse('db-pool-stats')
+
+
+class FakeConnection:
+    """Stand-in for a psycopg2 connection."""
+
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.rolled_back = False
+        self.ping_error = None
+        self.info = type('Info', (), {})()
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rolled_back = True
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeCursor:
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, sql):
+        if self.connection.ping_error:
+            raise self.connection.ping_error
+
+
+def create_pool(**options):
+    """Create and return a pool of fake connections."""
+    options.setdefault('min_size', 0)
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    pool = ConnectionPool(connect, **options)
+    pool.opened = opened
+    return pool
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the connection pool."""
+
+    def test_connection_reused(self):
+        """Test a returned connection is handed out again."""
+        pool = create_pool()
+
+        first = pool.getconn()
+        pool.putconn(first)
+        second = pool.getconn()
+
+        self.assertIs(first, second)
+        self.assertEqual(len(pool.opened), 1)
+        stats = pool.stats()
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['in_use'], 1)
+        self.assertEqual(stats['idle'], 0)
+        self.assertIn('checkout_p95_ms', stats)
+
+    def test_timeout_when_exhausted(self):
+        """Test checkouts fail after the timeout once max_size is in use."""
+        pool = create_pool(max_size=1, timeout=0.05)
+        pool.getconn()
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+
+        stats = pool.stats()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertGreaterEqual(stats['wait_time_max_ms'], 50)
+
+    def test_waiter_gets_returned_connection(self):
+        """Test a waiting caller gets the next returned connection."""
+        pool = create_pool(max_size=1, timeout=5)
+        connection = pool.getconn()
+        timer = threading.Timer(0.05, pool.putconn, [connection])
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        self.assertIs(pool.getconn(), connection)
+        self.assertEqual(len(pool.opened), 1)
+
+    def test_open_transaction_rolled_back(self):
+        """Test connections are returned without an open transaction."""
+        pool = create_pool()
+        connection = pool.getconn()
+        connection.info.transaction_status = TRANSACTION_STATUS_INERROR
+
+        pool.putconn(connection)
+
+        self.assertTrue(connection.rolled_back)
+        self.assertIs(pool.getconn(), connection)
+
+    def test_broken_connection_discarded(self):
+        """Test connections in an unknown state are closed on return."""
+        pool = create_pool()
+        connection = pool.getconn()
+        connection.info.transaction_status = TRANSACTION_STATUS_UNKNOWN
+
+        pool.putconn(connection)
+
+        self.assertTrue(connection.closed)
+        self.assertIsNot(pool.getconn(), connection)
+        self.assertEqual(pool.stats()['connections_closed'], 1)
+
+    def test_expired_connection_recycled(self):
+        """Test connections past max_lifetime are replaced."""
+        pool = create_pool(max_lifetime=0)
+        connection = pool.getconn()
+
+        pool.putconn(connection)
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_failed_health_check_replaces_connection(self):
+        """Test idle connections failing the ping are replaced."""
+        pool = create_pool(check_idle=0)
+        connection = pool.getconn()
+        pool.putconn(connection)
+        connection.ping_error = psycopg2.OperationalError('gone')
+
+        replacement = pool.getconn()
+
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['health_checks_failed'], 1)
+
+    def test_health_check_leaves_no_transaction(self):
+        """Test the ping is rolled back outside autocommit."""
+        pool = create_pool(check_idle=0)
+        connection = pool.getconn()
+        pool.putconn(connection)
+
+        self.assertIs(pool.getconn(), connection)
+        self.assertTrue(connection.rolled_back)
+
+    def test_filled_to_min_size(self):
+        """Test the pool opens connections up to min_size."""
+        pool = create_pool(min_size=3)
+        pool.putconn(pool.getconn())
+
+        for _ in range(100):
+            if pool.stats()['idle'] == 3:
+                break
+            time.sleep(0.01)
+        self.assertEqual(pool.stats()['idle'], 3)
+
+    def test_invalid_sizes_rejected(self):
+        """Test min_size above max_size raises ValueError."""
+        with self.assertRaises(ValueError):
+            create_pool(min_size=2, max_size=1)
+
+
+class DatabasePoolStatsAPITests(TestCase):
+    """Test the database pool statistics endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='admin@example.com',
+            password='Test1234',
+            username='admin',
+            phone_number='123456789',
+            first_name='Ada',
+            last_name='Admin',
+        )
+
+    def test_requires_admin(self):
+        """Test non-staff users can't read the pool statistics."""
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(DB_POOL_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_pool_stats(self):
+        """Test staff users get the statistics of the pools in use."""
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(DB_POOL_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        pool = getattr(connection, 'pool', None)
+        if pool is not None:
+            stats = {item['name']: item for item in res.data}
+            self.assertGreaterEqual(stats[pool.name]['in_use'], 1)
@@ -0,0 +1,230 @@
+"""
+Tests for routing reads to replicas.
+"""
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, connections, transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.db import routers
+from core.db.routers import ReplicaRouter
+from user.authentication import local_user_cache
+from user.models import Address, RevokedToken
+
+
+ADDRESS_LIST = reverse('user:address-list')
+
+ADDRESS = {
+    'street': 'Main Street 1',
+    'city': 'Warsaw',
+    'zip_code': '00-001',
+    'country': 'Poland',
+}
+
+
+@override_settings(READ_REPLICAS={'ALIASES': ['replica1', 'replica2'],
+                                  'STICKY_SECONDS': 5})
+class ReplicaRouterTests(SimpleTestCase):
+    """Test picking a database for reads and writes."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        routers.replica_lag.clear()
+        token = routers._state.set(routers.RoutingState())
+        self.addCleanup(routers._state.reset, token)
+        patcher = patch.object(routers.time, 'monotonic', return_value=100.0)
+        self.time = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def reads(self, count=4):
+        return [self.router.db_for_read(Address) for _ in range(count)]
+
+    def test_round_robin(self):
+        """Test reads are spread over the replicas."""
+        self.assertEqual(self.reads(),
+                         ['replica1', 'replica2', 'replica1', 'replica2'])
+
+    @override_settings(READ_REPLICAS={})
+    def test_no_replicas(self):
+        """Test reads go to the primary without replicas."""
+        self.assertEqual(self.reads(1), ['default'])
+
+    def test_writes_pin_reads(self):
+        """Test reads go to the primary for STICKY_SECONDS after a write."""
+        self.assertEqual(self.router.db_for_write(Address), 'default')
+        self.assertEqual(self.reads(2), ['default', 'default'])
+
+        self.time.return_value += 5
+        self.assertEqual(self.reads(2), ['replica1', 'replica2'])
+
+    def test_transactions_use_primary(self):
+        """Test reads in a transaction on the primary go to the primary."""
+        with patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.reads(1), ['default'])
+
+    @override_settings(READ_REPLICAS={'ALIASES': ['replica1', 'replica2'],
+                                      'STRATEGY': 'least_lag'})
+    def test_least_lag(self):
+        """Test reads go to the replica with the least lag."""
+        lags = {'replica1': 3.0, 'replica2': 0.5}
+        with patch.object(routers, 'measure_lag', side_effect=lags.get):
+            self.assertEqual(self.reads(2), ['replica2', 'replica2'])
+
+            lags['replica1'] = 0.1
+            self.assertEqual(self.reads(1), ['replica2'])
+            self.time.return_value += 2
+            self.assertEqual(self.reads(1), ['replica1'])
+
+    @override_settings(READ_REPLICAS={'ALIASES': ['replica1', 'replica2'],
+                                      'MAX_LAG': 1})
+    def test_max_lag(self):
+        """Test replicas lagging or failing the lag check are skipped."""
+        def measure_lag(alias):
+            if alias == 'replica1':
+                raise DatabaseError('Replica is down.')
+            return lags[alias]
+
+        lags = {'replica2': 0.5}
+        with patch.object(routers, 'measure_lag', side_effect=measure_lag):
+            self.assertEqual(self.reads(2), ['replica2', 'replica2'])
+
+            lags['replica2'] = 10
+            self.time.return_value += 2
+            self.assertEqual(self.reads(1), ['default'])
+
+    def test_no_migrations_on_replicas(self):
+        """Test migrations only run on the primary."""
+        self.assertIsNone(self.router.allow_migrate('default', 'user'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'user'))
+
+
+class SQLiteReplicaTestCase(TransactionTestCase):
+    """
+    Test case with a SQLite file standing in for a replica of the user
+    tables. Rows are only copied to it by replicate().
+    """
+
+    replica = 'replica'
+
+    def setUp(self):
+        cache.clear()
+        local_user_cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connections.settings.update(connections.configure_settings({
+            'default': connections.settings['default'],
+            self.replica: {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': str(Path(directory.name) / 'replica.sqlite3'),
+            },
+        }))
+        self.addCleanup(self.remove_replica)
+        with connections[self.replica].schema_editor() as editor:
+            for model in self.replicated_models():
+                editor.create_model(model)
+
+        settings = override_settings(READ_REPLICAS={
+            'ALIASES': [self.replica], 'STICKY_SECONDS': 60})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def replicated_models(self):
+        return [get_user_model(), Address, RevokedToken]
+
+    def remove_replica(self):
+        connections[self.replica].close()
+        del connections[self.replica]
+        del connections.settings[self.replica]
+
+    def replicate(self):
+        for model in self.replicated_models():
+            model.objects.using(self.replica).all().delete()
+            model.objects.using(self.replica).bulk_create(
+                model.objects.using('default').all())
+
+
+class ReadYourWritesTests(SQLiteReplicaTestCase):
+    """Test API reads from a replica and after writes."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(
+            username='janek123',
+            email='user@example.com',
+            first_name='Jan',
+            last_name='Kowalski',
+            phone_number='123456789',
+            password='Test1234',
+        )
+        self.replicate()
+        self.token = AccessToken.for_user(self.user)
+
+    def client_for_user(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return client
+
+    def list_streets(self, client):
+        res = client.get(ADDRESS_LIST)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [address['street'] for address in res.data['results']]
+
+    def test_reads_use_replica(self):
+        """Test reads without recent writes are served by the replica."""
+        Address.objects.using(self.replica).create(
+            user=self.user, street='Replica Street 1', city='Warsaw',
+            zip_code='00-001', country='Poland')
+
+        self.assertEqual(self.list_streets(self.client_for_user()),
+                         ['Replica Street 1'])
+
+    def test_read_your_writes(self):
+        """Test a client reads its writes before they are replicated."""
+        client = self.client_for_user()
+
+        res = client.post(ADDRESS_LIST, ADDRESS, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn('primary_pin', res.cookies)
+        self.assertEqual(self.list_streets(client), [ADDRESS['street']])
+        # Without the cookie, the reads are pinned by the user's token.
+        self.assertEqual(self.list_streets(self.client_for_user()),
+                         [ADDRESS['street']])
+
+        cache.clear()
+        self.assertEqual(self.list_streets(self.client_for_user()), [])
+
+    def test_user_cache_filled_from_primary(self):
+        """Test a lagging replica doesn't cache a deactivated user."""
+        self.user.is_active = False
+        self.user.save()
+        # Neither the client nor the user is pinned to the primary.
+        cache.clear()
+
+        res = self.client_for_user().get(ADDRESS_LIST)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_transaction_reads_use_primary(self):
+        """Test reads in a transaction see its writes."""
+        with transaction.atomic():
+            Address.objects.using('default').create(user=self.user,
+                                                    **ADDRESS)
+            routers.get_state().pinned_until = 0.0
+
+            self.assertTrue(Address.objects.filter(user=self.user))
+
+    def test_lag_of_stand_in_replica(self):
+        """Test SQLite stand-in replicas report no lag."""
+        self.assertEqual(routers.measure_lag(self.replica), 0.0)
+        self.assertEqual(routers.ReplicaLag().measure(),
+                         {self.replica: 0.0})
@@ -0,0 +1,118 @@
+"""
+Tests for the per-request metrics middleware.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+REGISTER_USER_URL = reverse('user:register-user')
+CURRENT_USER_INFO = reverse('user:current-user')
+ASYNC_CURRENT_USER_INFO = reverse('user-async:current-user')
+
+
+def parse_server_timing(header):
+    """Return a dict of metric name to duration from a Server-Timing."""
+    timings = {}
+    for entry in header.split(', '):
+        name, *params = entry.split(';')
+        params = dict(param.split('=', 1) for param in params)
+        timings[name] = float(params['dur'])
+    return timings
+
+
+@override_settings(REQUEST_METRICS={
+    'SERVER_TIMING': True, 'LOG_SAMPLE_RATE': 0, 'SLOW_REQUEST_MS': 10000,
+})
+class RequestMetricsMiddlewareTests(TestCase):
+    """Test the request metrics middleware."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def register(self):
+        return self.client.post(REGISTER_USER_URL, {
+            'username': 'MichaLeS',
+            'email': 'test@example.com',
+            'first_name': 'Michał',
+            'last_name': 'Kowalski',
+            'phone_number': '654654654',
+            'password': 'test1234',
+            'password2': 'test1234',
+        })
+
+    def test_server_timing_header(self):
+        """Test registration reports queries, hashing and serializers."""
+        res = self.register()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        timings = parse_server_timing(res['Server-Timing'])
+        self.assertIn(' queries"', res['Server-Timing'])
+        for name in ['db', 'db-slowest', 'serializer', 'hashing', 'render',
+                     'total']:
+            self.assertIn(name, timings)
+        self.assertGreaterEqual(timings['total'], timings['hashing'])
+
+    def test_authentication_timed(self):
+        """Test authentication time is reported for authenticated views."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='Test1234',
+            username='janek123',
+            phone_number='123456789',
+            first_name='Jan',
+            last_name='Kowalski',
+        )
+        token = AccessToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        res = self.client.get(CURRENT_USER_INFO)
+
+        self.assertIn('auth', parse_server_timing(res['Server-Timing']))
+
+    async def test_async_view_timed(self):
+        """Test requests to async views are measured too."""
+        res = await self.async_client.get(ASYNC_CURRENT_USER_INFO)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('auth', parse_server_timing(res['Server-Timing']))
+
+    @override_settings(REQUEST_METRICS={'SERVER_TIMING': False})
+    def test_server_timing_disabled(self):
+        """Test no header is sent unless enabled."""
+        res = self.client.get(CURRENT_USER_INFO)
+
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(REQUEST_METRICS={
+        'LOG_SAMPLE_RATE': 0, 'SLOW_REQUEST_MS': 0,
+    })
+    def test_slow_request_logged_with_queries(self):
+        """Test slow requests are logged with their SQL queries."""
+        with self.assertLogs('core.request_metrics', 'WARNING') as logs:
+            self.register()
+
+        record = logs.records[0]
+        self.assertEqual(record.request_metrics['status'], 201)
+        queries = record.request_metrics['queries']
+        self.assertEqual(record.request_metrics['query_count'], len(queries))
+        self.assertTrue(any('INSERT' in query['sql'] for query in queries))
+
+    @override_settings(REQUEST_METRICS={
+        'LOG_SAMPLE_RATE': 1, 'SLOW_REQUEST_MS': 10000,
+    })
+    def test_sampled_request_logged(self):
+        """Test sampled requests are logged without their queries."""
+        with self.assertLogs('core.request_metrics', 'INFO') as logs:
+            self.client.get(CURRENT_USER_INFO)
+
+        record = logs.records[0]
+        self.assertEqual(record.levelname, 'INFO')
+        self.assertEqual(record.request_metrics['path'], CURRENT_USER_INFO)
+        self.assertNotIn('queries', record.request_metrics)
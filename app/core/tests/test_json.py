@@ -0,0 +1,128 @@
+"""
+Tests for the orjson renderer and parser.
+"""
+import datetime
+import io
+import uuid
+import zoneinfo
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import parsers, renderers
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+PAYLOAD = {
+    'utc': datetime.datetime(2024, 1, 2, 3, 4, 5, 6000,
+                             tzinfo=datetime.timezone.utc),
+    'zurich': datetime.datetime(2024, 7, 1, 5,
+                                tzinfo=zoneinfo.ZoneInfo('Europe/Zurich')),
+    'naive': datetime.datetime(2024, 1, 2, 3, 4, 5),
+    'date': datetime.date(2024, 1, 2),
+    'time': datetime.time(3, 4, 5, 6),
+    'decimal': Decimal('12.50'),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'lazy': gettext_lazy('This field is required.'),
+    'text': 'Zoë \u2028\u2029 "quoted" </script>',
+    'nested': [{1: True, 'none': None}, (1, 2.5, -3)],
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test FastJSONRenderer renders like JSONRenderer."""
+
+    def assertRendersLikeJSONRenderer(self, data, media_type=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type),
+        )
+
+    def test_render(self):
+        """Test rendering datetimes, Decimals, UUIDs and lazy strings."""
+        self.assertRendersLikeJSONRenderer(PAYLOAD)
+        self.assertRendersLikeJSONRenderer(None)
+
+    def test_integer_beyond_64_bits(self):
+        """Test values orjson can't encode are rendered by JSONRenderer."""
+        self.assertRendersLikeJSONRenderer({'big': 2 ** 70})
+
+    def test_indent(self):
+        """Test indented output is rendered by JSONRenderer."""
+        self.assertRendersLikeJSONRenderer(
+            PAYLOAD, 'application/json; indent=4')
+
+    def test_without_orjson(self):
+        """Test rendering falls back to JSONRenderer without orjson."""
+        with patch.object(renderers, 'orjson', None):
+            self.assertRendersLikeJSONRenderer(PAYLOAD)
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test FastJSONParser parses like JSONParser."""
+
+    def parse(self, parser, body, **parser_context):
+        return parser.parse(io.BytesIO(body), parser_context=parser_context)
+
+    def assertParsesLikeJSONParser(self, body, **parser_context):
+        self.assertEqual(
+            self.parse(FastJSONParser(), body, **parser_context),
+            self.parse(JSONParser(), body, **parser_context),
+        )
+
+    def test_parse(self):
+        """Test parsing a JSON body."""
+        body = JSONRenderer().render(PAYLOAD)
+
+        self.assertParsesLikeJSONParser(body)
+
+    def test_integer_beyond_64_bits(self):
+        """Test large integers are not turned into floats."""
+        data = self.parse(FastJSONParser(), b'{"big": 1180591620717411303424}')
+
+        self.assertEqual(data, {'big': 2 ** 70})
+
+    def test_invalid_json(self):
+        """Test invalid bodies raise the same errors as JSONParser."""
+        for body in [b'{"a": ', b'{"a": NaN}', b'\xff']:
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as expected:
+                    self.parse(JSONParser(), body)
+                with self.assertRaises(ParseError) as error:
+                    self.parse(FastJSONParser(), body)
+
+                self.assertEqual(str(error.exception),
+                                 str(expected.exception))
+
+    def test_other_encoding(self):
+        """Test bodies in another encoding are parsed by JSONParser."""
+        self.assertParsesLikeJSONParser('{"name": "Zoë"}'.encode('latin-1'),
+                                        encoding='latin-1')
+
+    def test_without_orjson(self):
+        """Test parsing falls back to JSONParser without orjson."""
+        with patch.object(parsers, 'orjson', None):
+            self.assertParsesLikeJSONParser(b'{"name": "Zo\\u00eb"}')
+
+
+class BenchmarkJSONCommandTests(SimpleTestCase):
+    """Test the benchmark_json command."""
+
+    def test_benchmark(self):
+        """Test each payload is rendered identically and timed."""
+        out = io.StringIO()
+
+        call_command('benchmark_json', rounds=2, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('address page, render:', output)
+        self.assertIn('1000 user rows, parse:', output)
+        self.assertNotIn('differs', output)
@@ -0,0 +1,154 @@
+"""
+Tests for the compiled read-only serializers.
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase
+
+from rest_framework import serializers
+
+from core.readonly import compile_serializer
+from core.renderers import FastJSONRenderer
+from user.models import Address
+from user.serializers import AddressSerializer
+
+
+class UserExportSerializer(serializers.ModelSerializer):
+    """Serializer with fields needing conversion."""
+
+    joined = serializers.DateTimeField(source='created_at')
+    number = serializers.CharField(source='pk')
+
+    class Meta:
+        model = get_user_model()
+        fields = ['number', 'username', 'joined', 'is_active', 'version',
+                  'password']
+        extra_kwargs = {'password': {'write_only': True}}
+
+
+class UserMethodSerializer(serializers.ModelSerializer):
+    name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = get_user_model()
+        fields = ['name']
+
+    def get_name(self, user):
+        return user.get_full_name()
+
+
+class AddressUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Address
+        fields = ['id', 'user']
+
+
+class AddressUsernameSerializer(serializers.ModelSerializer):
+    user = serializers.StringRelatedField()
+
+    class Meta:
+        model = Address
+        fields = ['id', 'user']
+
+
+class CompileSerializerTests(TestCase):
+    """Test compiled serializers represent objects like the serializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            first_name='Zoë',
+            last_name='User',
+            phone_number='+48123456789',
+            password='testpass123',
+        )
+        for number in range(3):
+            Address.objects.upsert(user=cls.user, street=f'{number} Street',
+                                   city='Łódź', zip_code='90-001',
+                                   country='Poland')
+
+    def assertRepresentsLikeSerializer(self, serializer_class, queryset):
+        expected = FastJSONRenderer().render(
+            serializer_class(queryset, many=True).data)
+        compiled = compile_serializer(serializer_class)
+
+        for objects in [compiled.values(queryset), compiled.only(queryset),
+                        queryset]:
+            with self.subTest(objects=objects):
+                content = FastJSONRenderer().render(compiled.many(objects))
+                self.assertEqual(content, expected)
+
+    def test_address_serializer(self):
+        """Test addresses are represented like AddressSerializer does."""
+        self.assertRepresentsLikeSerializer(
+            AddressSerializer, Address.objects.order_by('id'))
+
+    def test_converted_fields(self):
+        """Test fields with another representation are converted."""
+        compiled = compile_serializer(UserExportSerializer)
+
+        self.assertEqual(compiled.keys, ['number', 'username', 'joined',
+                                         'is_active', 'version'])
+        converted = [position for position, _ in compiled.converters]
+        self.assertIn(0, converted)
+        self.assertNotIn(1, converted)
+        self.assertIn(2, converted)
+        self.assertNotIn(3, converted)
+        self.assertRepresentsLikeSerializer(
+            UserExportSerializer, get_user_model().objects.all())
+
+    def test_single_object(self):
+        """Test representing one row or instance."""
+        compiled = compile_serializer(AddressSerializer)
+        address = Address.objects.first()
+        row = compiled.values(Address.objects.filter(pk=address.pk)).get()
+
+        expected = AddressSerializer(address).data
+        self.assertEqual(compiled.to_representation(address), expected)
+        self.assertEqual(compiled.to_representation(row), expected)
+
+    def test_values_only_fetches_columns(self):
+        """Test compiled querysets select only the serializer's columns."""
+        compiled = compile_serializer(AddressSerializer)
+
+        row = compiled.values(Address.objects.all()).first()
+
+        self.assertEqual(list(row),
+                         ['id', 'street', 'city', 'zip_code', 'country'])
+
+    def test_foreign_key_ids(self):
+        """Test foreign keys are represented by their column."""
+        compiled = compile_serializer(AddressUserSerializer)
+
+        self.assertEqual(compiled.columns, ['id', 'user_id'])
+        self.assertNotIn(1, [position for position, _ in compiled.converters])
+        self.assertRepresentsLikeSerializer(
+            AddressUserSerializer, Address.objects.order_by('id'))
+
+    def test_not_compilable(self):
+        """Test method and other related fields can't be compiled."""
+        for serializer_class in [UserMethodSerializer,
+                                 AddressUsernameSerializer]:
+            with self.subTest(serializer_class=serializer_class):
+                with self.assertRaises(ImproperlyConfigured):
+                    compile_serializer(serializer_class)
+
+
+class BenchmarkSerializersCommandTests(TestCase):
+    """Test the benchmark_serializers command."""
+
+    def test_benchmark(self):
+        """Test each variant is timed and the rows are rolled back."""
+        out = StringIO()
+
+        call_command('benchmark_serializers', rows=5, rounds=1, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('AddressSerializer, compiled .values():', output)
+        self.assertIn('CurrentUserSerializer, serializer:', output)
+        self.assertFalse(get_user_model().objects.exists())
@@ -0,0 +1,131 @@
+"""
+Tests for the cached OpenAPI schema view.
+"""
+import os
+import tempfile
+from unittest.mock import patch
+
+from drf_spectacular.generators import SchemaGenerator
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+
+from core import schema
+
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class CachedSchemaViewTests(SimpleTestCase):
+    """Test serving the OpenAPI schema from the cache."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_dir = tmp_dir.name
+        settings = override_settings(SCHEMA_CACHE_DIR=self.cache_dir,
+                                     CODE_VERSION='v1')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        schema.clear_memory_cache()
+        self.addCleanup(schema.clear_memory_cache)
+        patcher = patch.object(SchemaGenerator, 'get_schema',
+                               autospec=True,
+                               side_effect=SchemaGenerator.get_schema)
+        self.get_schema = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_schema_generated_once(self):
+        """Test the schema is only generated on the first request."""
+        res = self.client.get(SCHEMA_URL)
+        res_cached = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res_cached.content, res.content)
+        self.assertEqual(res_cached['ETag'], res['ETag'])
+        self.assertIn('max-age=', res_cached['Cache-Control'])
+        self.assertTrue(res['Content-Type'].startswith(
+            'application/vnd.oai.openapi'))
+        self.assertEqual(self.get_schema.call_count, 1)
+
+    def test_conditional_request(self):
+        """Test a matching If-None-Match gets a 304 without a body."""
+        etag = self.client.get(SCHEMA_URL)['ETag']
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+
+    def test_formats_cached_separately(self):
+        """Test YAML and JSON schemas get their own entries."""
+        res_yaml = self.client.get(SCHEMA_URL)
+        res_json = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        self.assertNotEqual(res_yaml['ETag'], res_json['ETag'])
+        self.assertEqual(res_json.json()['openapi'][:2], '3.')
+        self.assertEqual(self.get_schema.call_count, 2)
+
+    def test_disk_cache(self):
+        """Test a new process reuses the schema stored on disk."""
+        res = self.client.get(SCHEMA_URL)
+        schema.clear_memory_cache()
+
+        res_disk = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res_disk.content, res.content)
+        self.assertEqual(self.get_schema.call_count, 1)
+
+    def test_new_code_version_regenerates(self):
+        """Test a new code version regenerates and replaces the schema."""
+        self.client.get(SCHEMA_URL)
+        schema.clear_memory_cache()
+
+        with self.settings(CODE_VERSION='v2'):
+            self.client.get(SCHEMA_URL)
+
+        self.assertEqual(self.get_schema.call_count, 2)
+        files = os.listdir(self.cache_dir)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith('v2-'))
+
+
+class CodeVersionTests(SimpleTestCase):
+    """Test the code version hashed from the source files."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.base_dir = tmp_dir.name
+        self.media_root = os.path.join(self.base_dir, 'media')
+        settings = override_settings(
+            BASE_DIR=self.base_dir, MEDIA_ROOT=self.media_root,
+            CODE_VERSION=None)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.write('app', 'views.py')
+
+    def write(self, *path):
+        path = os.path.join(self.base_dir, *path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write('pass\n')
+
+    def version(self):
+        with patch.object(schema, '_code_version', None):
+            return schema.get_code_version()
+
+    def test_only_source_hashed(self):
+        """Test uploads and caches don't change the version."""
+        version = self.version()
+
+        self.write('media', 'products', 'upload.py')
+        self.write('.schema_cache', 'entry.py')
+        self.write('app', '__pycache__', 'views.py')
+        self.assertEqual(self.version(), version)
+
+        self.write('app', 'models.py')
+        self.assertNotEqual(self.version(), version)
@@ -0,0 +1,107 @@
+"""
+Tests for token bucket throttling.
+"""
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+
+from core import throttling
+
+
+ASYNC_REGISTER_USER_URL = reverse('user-async:register-user')
+
+
+class TakeTokenTests(SimpleTestCase):
+    """Test taking tokens from a bucket."""
+
+    def setUp(self):
+        cache.clear()
+        patcher = patch.object(throttling.time, 'time', return_value=1000.0)
+        self.time = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def take(self, rate='3/min'):
+        return throttling.take_token('bucket', *throttling.parse_rate(rate))
+
+    def test_parse_rate(self):
+        """Test a rate is a capacity and a refill interval."""
+        self.assertEqual(throttling.parse_rate('10/min'), (10, 6.0))
+        self.assertEqual(throttling.parse_rate('50/s'), (50, 0.02))
+        self.assertEqual(throttling.parse_rate('5/hour'), (5, 720.0))
+
+    def test_burst_then_wait(self):
+        """Test a full bucket allows a burst and then reports the wait."""
+        self.assertEqual([self.take() for _ in range(3)], [0, 0, 0])
+
+        self.assertEqual(self.take(), 20.0)
+        self.time.return_value += 5
+        self.assertEqual(self.take(), 15.0)
+
+    def test_refill(self):
+        """Test tokens are refilled at the rate, up to the capacity."""
+        for _ in range(3):
+            self.take()
+
+        self.time.return_value += 20
+        self.assertEqual(self.take(), 0)
+        self.assertGreater(self.take(), 0)
+
+        self.time.return_value += 3600
+        self.assertEqual([self.take() for _ in range(3)], [0, 0, 0])
+        self.assertGreater(self.take(), 0)
+
+    def test_rejected_requests_take_no_token(self):
+        """Test rejected requests don't delay the refill."""
+        for _ in range(10):
+            self.take()
+
+        self.time.return_value += 20
+
+        self.assertEqual(self.take(), 0)
+
+    def test_single_value_per_bucket(self):
+        """Test a bucket is stored as one value expiring once full."""
+        with patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.take()
+
+        key, value, timeout = cache_set.call_args.args
+        self.assertEqual(key, 'throttle:bucket')
+        self.assertEqual(value, 1020.0)
+        self.assertEqual(timeout, 20)
+
+
+class TokenBucketThrottleTests(SimpleTestCase):
+    """Test throttling the async registration view."""
+
+    def setUp(self):
+        cache.clear()
+        patcher = patch.object(throttling.time, 'time', return_value=1000.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(THROTTLE={'RATES': {
+        'registration': {'ip': '5/min', 'account': '1/min', 'global': '2/s'},
+    }})
+    async def test_async_view_throttled(self):
+        """Test buckets are checked in order, stopping at the first."""
+        statuses = []
+        for email in ['a@example.com', 'A@example.com', 'b@example.com',
+                      'c@example.com']:
+            res = await self.async_client.post(
+                ASYNC_REGISTER_USER_URL, {'email': email},
+                content_type='application/json')
+            statuses.append(res.status_code)
+
+        # The second request is rejected for its account before taking a
+        # global token, so only the fourth finds the global bucket empty.
+        self.assertEqual(statuses, [
+            status.HTTP_400_BAD_REQUEST,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            status.HTTP_400_BAD_REQUEST,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        ])
+        self.assertEqual(res['Retry-After'], '1')
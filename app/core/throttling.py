@@ -0,0 +1,144 @@
+"""
+Token bucket throttling in a shared cache.
+
+Each bucket is stored as a single number, its theoretical arrival time
+(the GCRA form of a token bucket): the time at which the bucket would be
+full again. A check is one read and one write of that number, so it
+costs the same however many requests were made, and buckets need no
+cleanup as they expire when full.
+
+With a Redis cache the check runs as a script, so concurrent requests
+can't both take the last token. Other caches are updated under a
+process lock, which is exact for the local memory cache.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import BaseThrottle
+
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'throttle',
+    'RATES': {},
+}
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+TAKE_TOKEN_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or 0), now)
+local wait = tat + interval - capacity * interval - now
+if wait > 0 then
+    return tostring(wait)
+end
+tat = tat + interval
+redis.call('SET', KEYS[1], tostring(tat), 'PX',
+           math.ceil((tat - now) * 1000))
+return '0'
+"""
+
+_lock = threading.Lock()
+
+
+def get_throttle_setting(name):
+    """Return a value from settings.THROTTLE or its default."""
+    return getattr(settings, 'THROTTLE', {}).get(name, DEFAULTS[name])
+
+
+def parse_rate(rate):
+    """
+    Return (capacity, interval) of a rate such as '10/min': a bucket of
+    10 tokens, refilled with one token every 6 seconds.
+    """
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, DURATIONS[period[0]] / capacity
+
+
+def take_token(key, capacity, interval):
+    """
+    Take a token from the bucket stored at key. Return 0 if there was
+    one, otherwise the seconds until there will be.
+    """
+    cache = caches[get_throttle_setting('CACHE_ALIAS')]
+    key = f"{get_throttle_setting('KEY_PREFIX')}:{key}"
+    now = time.time()
+    if isinstance(cache, RedisCache):
+        key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(key, write=True)
+        return float(client.eval(TAKE_TOKEN_SCRIPT, 1, key, repr(now),
+                                 repr(interval), capacity))
+
+    with _lock:
+        tat = max(cache.get(key, 0.0), now)
+        wait = tat + interval - capacity * interval - now
+        if wait > 0:
+            return wait
+        tat += interval
+        cache.set(key, tat, math.ceil(tat - now))
+    return 0
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle applying the buckets of the view's throttle_scope from
+    settings.THROTTLE['RATES'], in order: per client IP ('ip'), per
+    account ('account') and for all clients ('global'). The account is the
+    view's throttle_account_field in the request data, compared case
+    insensitively.
+
+    Checking stops at the first empty bucket, so requests rejected for
+    their IP don't use up the account and global buckets.
+    """
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        rates = get_throttle_setting('RATES').get(
+            getattr(view, 'throttle_scope', None), {})
+        for kind in ['ip', 'account', 'global']:
+            if kind not in rates:
+                continue
+            ident = self.get_bucket_ident(kind, request, view)
+            if ident is None:
+                continue
+            wait = take_token(f'{view.throttle_scope}:{kind}:{ident}',
+                              *parse_rate(rates[kind]))
+            if wait:
+                self.wait_seconds = wait
+                return False
+        return True
+
+    def get_bucket_ident(self, kind, request, view):
+        if kind == 'ip':
+            return self.get_ident(request)
+        if kind == 'account':
+            return self.get_account(request, view)
+        return 'all'
+
+    def get_account(self, request, view):
+        field = getattr(view, 'throttle_account_field', None)
+        if field is None:
+            return None
+        # Plain Django views, such as the async views, parse the body
+        # themselves.
+        if hasattr(request, 'data'):
+            data = request.data
+        else:
+            data = view.parse_body(request)
+        value = data.get(field) if isinstance(data, dict) else None
+        if not isinstance(value, str) or not value.strip():
+            return None
+        # Hashed to keep the keys short and free of personal data.
+        return hashlib.blake2b(value.strip().lower().encode(),
+                               digest_size=16).hexdigest()
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,69 @@
+"""
+Views for the core API.
+"""
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.translation import get_language
+
+from drf_spectacular.views import SpectacularAPIView
+
+from rest_framework import generics
+from rest_framework.permissions import IsAdminUser
+
+from core import schema
+from core.db.pool import all_pools
+from core.serializers import DatabasePoolStatsSerializer
+
+
+class DatabasePoolStatsView(generics.ListAPIView):
+    """
+    Statistics of the database connection pools of the process serving
+    the request.
+    """
+
+    serializer_class = DatabasePoolStatsSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = None
+
+    def get_queryset(self):
+        return [pool.stats() for pool in all_pools()]
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    SpectacularAPIView serving the rendered schema from core.schema's
+    cache, with an ETag and Cache-Control, and 304 responses to
+    conditional requests.
+    """
+
+    def _get_schema_response(self, request):
+        if not self.serve_public:
+            # The schema depends on the user's permissions.
+            return super()._get_schema_response(request)
+
+        version = self.api_version or request.version or \
+            self._get_version_parameter(request)
+        key = ':'.join([request.path, request.accepted_media_type,
+                        get_language() or '', version or ''])
+        entry = schema.get_schema(
+            key, lambda: self.render_schema(request))
+
+        response = get_conditional_response(request, etag=entry.etag)
+        if response is None:
+            response = HttpResponse(entry.content,
+                                    content_type=entry.content_type)
+            response['Content-Disposition'] = \
+                f'inline; filename="{entry.filename}"'
+        response['ETag'] = entry.etag
+        patch_cache_control(response, public=True,
+                            max_age=settings.SCHEMA_CACHE_MAX_AGE)
+        return response
+
+    def render_schema(self, request):
+        response = self.finalize_response(
+            request, super()._get_schema_response(request))
+        response.render()
+        filename = response['Content-Disposition'].split('"')[1]
+        return schema.SchemaEntry(response.content, response['Content-Type'],
+                                  filename)
@@ -0,0 +1,91 @@
+"""
+Prewarm a process so its first real request doesn't pay one-off costs.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils.module_loading import autodiscover_modules
+
+
+logger = logging.getLogger(__name__)
+
+
+def open_pools():
+    """Connect every database and fill pooled backends to their min size."""
+    for connection in connections.all():
+        connection.ensure_connection()
+        pool = getattr(connection, 'pool', None)
+        connection.close()
+        if pool is not None:
+            pool.fill()
+
+
+def import_urlconfs(resolver=None):
+    """Import every included URLconf, and with them the views."""
+    resolver = resolver or get_resolver()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            import_urlconfs(pattern)
+
+
+def import_serializers():
+    autodiscover_modules('serializers')
+
+
+def generate_schema():
+    """
+    Render the OpenAPI schema in YAML and JSON, filling the schema cache
+    in memory and on disk.
+    """
+    client = get_prewarm_client()
+    for media_type in ['application/vnd.oai.openapi',
+                       'application/vnd.oai.openapi+json']:
+        client.get(reverse('api-schema'), HTTP_ACCEPT=media_type)
+
+
+def get_prewarm_host():
+    for host in settings.ALLOWED_HOSTS:
+        if host not in ('*', '') and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def get_prewarm_client():
+    return Client(HTTP_HOST=get_prewarm_host(),
+                  raise_request_exception=False)
+
+
+def send_requests():
+    """Send the PREWARM_PATHS requests through the full request stack."""
+    client = get_prewarm_client()
+    for path in getattr(settings, 'PREWARM_PATHS', []):
+        response = client.get(path)
+        if response.status_code >= 400:
+            # E.g. a path needing credentials, which warms little.
+            logger.warning('Prewarm request to %s returned %s.', path,
+                           response.status_code)
+
+
+STEPS = [
+    ('database pools', open_pools),
+    ('URLconfs', import_urlconfs),
+    ('serializers', import_serializers),
+    ('OpenAPI schema', generate_schema),
+    ('requests', send_requests),
+]
+
+
+def prewarm(report=None):
+    """
+    Run the prewarm steps in order. report, if given, is called with the
+    name and duration in seconds of each step.
+    """
+    for name, step in STEPS:
+        start = time.perf_counter()
+        step()
+        if report is not None:
+            report(name, time.perf_counter() - start)
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from jobs import models
+
+
+admin.site.register(models.Job)
+
+
+@admin.register(models.DeadJob)
+class DeadJobAdmin(admin.ModelAdmin):
+    list_display = ['task', 'attempts', 'created_at', 'failed_at']
+    actions = ['requeue']
+
+    @admin.action(description='Move back to the queue')
+    def requeue(self, request, queryset):
+        count = models.DeadJob.objects.requeue(queryset)
+        self.message_user(request, f'{count} jobs requeued.')
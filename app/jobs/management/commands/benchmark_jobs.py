@@ -0,0 +1,87 @@
+"""
+Django command to measure the throughput of the job queue.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from jobs.models import DeadJob, Job
+from jobs.tasks import noop
+from jobs.processes import start_workers
+from jobs.worker import Worker
+
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    """Django command to measure the throughput of the job queue."""
+
+    help = ('Enqueue no-op jobs of mixed priorities and report how many '
+            'jobs/sec worker processes claim, run and delete.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--jobs', type=int, default=20000,
+            help='Number of jobs enqueued.',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=2,
+            help='Worker processes, 0 to run the jobs in this process.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help="Jobs claimed at once, JOBS['BATCH_SIZE'] by default.",
+        )
+        parser.add_argument(
+            '--warmup', type=float, default=5,
+            help='Seconds given to the worker processes to start before '
+                 'the jobs are committed.',
+        )
+
+    def handle(self, *args, **options):
+        if Job.objects.exists():
+            raise CommandError('The queue must be empty.')
+        processes = []
+        try:
+            # The jobs are committed once the workers are up, so their
+            # start isn't measured.
+            with transaction.atomic():
+                start = time.perf_counter()
+                for offset in range(0, options['jobs'], BATCH_SIZE):
+                    Job.objects.bulk_create([
+                        noop.build(priority=number % 3, number=number)
+                        for number in range(
+                            offset, min(offset + BATCH_SIZE, options['jobs']))
+                    ])
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"enqueue: {options['jobs']} jobs in {elapsed:.2f}s, "
+                    f"{options['jobs'] / elapsed:.0f} jobs/sec")
+                if options['processes']:
+                    processes = start_workers(
+                        options['processes'], options['batch_size'],
+                        interval=0.01)
+                    time.sleep(options['warmup'])
+
+            start = time.perf_counter()
+            if processes:
+                while Job.objects.exists():
+                    if not any(process.is_alive() for process in processes):
+                        raise CommandError('The workers died.')
+                    time.sleep(0.01)
+            else:
+                Worker(options['batch_size'], burst=True).run()
+            elapsed = time.perf_counter() - start
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+        if DeadJob.objects.filter(task=noop.name).exists():
+            raise CommandError('Some jobs failed.')
+        self.stdout.write(self.style.SUCCESS(
+            f"run: {options['jobs']} jobs in {elapsed:.2f}s by "
+            f"{options['processes'] or 'this'} process(es), "
+            f"{options['jobs'] / elapsed:.0f} jobs/sec"))
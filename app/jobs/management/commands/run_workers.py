@@ -0,0 +1,96 @@
+"""
+Django command to run the job queue workers.
+"""
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from jobs.models import get_job_setting
+from jobs.processes import start_workers
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    """Django command to run the job queue workers."""
+
+    help = ('Run workers claiming due jobs from the queue, highest '
+            'priority first, in several processes. Workers restart when '
+            'they die and stop after their current batch on SIGTERM or '
+            'SIGINT.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int,
+            help="Worker processes, JOBS['PROCESSES'] by default. With 1, "
+                 "the worker runs in this process.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help="Jobs claimed at once, JOBS['BATCH_SIZE'] by default.",
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            help="Seconds to wait when no job is due, "
+                 "JOBS['POLL_INTERVAL'] by default.",
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no job is due.',
+        )
+
+    def handle(self, *args, **options):
+        count = options['processes'] or get_job_setting('PROCESSES')
+        worker_options = {
+            'batch_size': options['batch_size'],
+            'interval': options['interval'],
+            'burst': options['burst'],
+        }
+        if count == 1:
+            self.run_here(worker_options)
+        else:
+            self.supervise(count, worker_options)
+
+    def run_here(self, worker_options):
+        worker = Worker(**worker_options)
+        handlers = {signum: signal.signal(signum, worker.stop)
+                    for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            processed = worker.run()
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS(f'Ran {processed} jobs.'))
+
+    def supervise(self, count, worker_options):
+        stopping = threading.Event()
+        processes = []
+
+        def stop(signum, frame):
+            stopping.set()
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        handlers = {signum: signal.signal(signum, stop)
+                    for signum in (signal.SIGTERM, signal.SIGINT)}
+        processes += start_workers(count, **worker_options)
+        if stopping.is_set():
+            # Stopped while the workers were starting.
+            stop(None, None)
+        try:
+            while processes:
+                for process in list(processes):
+                    process.join(timeout=1)
+                    if process.exitcode is None:
+                        continue
+                    processes.remove(process)
+                    if process.exitcode and not stopping.is_set():
+                        self.stderr.write(
+                            f'Worker {process.pid} died with exit code '
+                            f'{process.exitcode}, restarting it.')
+                        processes += start_workers(1, **worker_options)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS(f'{count} workers stopped.'))
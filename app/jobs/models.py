@@ -0,0 +1,168 @@
+"""
+Database models for the background job queue.
+
+Jobs are rows claimed by workers with SELECT ... FOR UPDATE SKIP LOCKED,
+so any number of workers share the queue without blocking each other.
+A claimed job is leased: its run_at moves LEASE_SECONDS ahead, so it's
+claimed again if its worker dies. Finished jobs are deleted, failed
+ones retried with exponential backoff and, after max_attempts, moved to
+the dead jobs.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.utils import timezone
+
+
+DEFAULTS = {
+    # Worker processes started by run_workers.
+    'PROCESSES': 2,
+    # Jobs claimed by a worker at once.
+    'BATCH_SIZE': 10,
+    # Seconds a worker waits when no job is due.
+    'POLL_INTERVAL': 1,
+    # Seconds before jobs claimed by a lost worker are run again.
+    'LEASE_SECONDS': 300,
+    'MAX_ATTEMPTS': 5,
+    # Seconds before the first retry, doubled for each further attempt.
+    'BACKOFF_BASE': 2,
+    'BACKOFF_MAX': 3600,
+}
+
+
+def get_job_setting(name):
+    """Return a value from settings.JOBS or its default."""
+    return getattr(settings, 'JOBS', {}).get(name, DEFAULTS[name])
+
+
+def backoff(attempts):
+    """
+    Return the delay before retrying a job failed attempts times, with
+    jitter, so jobs failing together don't retry together.
+    """
+    delay = min(get_job_setting('BACKOFF_MAX'),
+                get_job_setting('BACKOFF_BASE') * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+class JobManager(models.Manager):
+    """Manager for jobs."""
+
+    def claim(self, batch_size):
+        """
+        Lease up to batch_size due jobs, highest priority first, and
+        return them with their attempts counted.
+        """
+        using = self._db or router.db_for_write(self.model)
+        table = self.model._meta.db_table
+        now = timezone.now()
+        lease = timedelta(seconds=get_job_setting('LEASE_SECONDS'))
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET attempts = attempts + 1, run_at = %s '
+                f'WHERE id IN (SELECT id FROM {table} WHERE run_at <= %s '
+                f'ORDER BY priority DESC, run_at, id LIMIT %s '
+                f'FOR UPDATE SKIP LOCKED) '
+                f'RETURNING id, task, kwargs, priority, attempts, '
+                f'max_attempts, created_at',
+                [now + lease, now, batch_size])
+            columns = [column.name for column in cursor.description]
+            rows = cursor.fetchall()
+        # Raw queries skip the JSON decoding of the kwargs.
+        kwargs = self.model._meta.get_field('kwargs')
+        position = columns.index('kwargs')
+        jobs = []
+        for row in rows:
+            row = list(row)
+            row[position] = kwargs.from_db_value(
+                row[position], None, connections[using])
+            jobs.append(self.model.from_db(using, columns, row))
+        return sorted(jobs, key=lambda job: (-job.priority, job.id))
+
+    def complete(self, job_ids):
+        """Delete finished jobs."""
+        using = self._db or router.db_for_write(self.model)
+        if job_ids:
+            self.using(using).filter(pk__in=job_ids).delete()
+
+    def fail(self, job, error):
+        """
+        Record a failed attempt at a job, retrying it later or, after its
+        last attempt, moving it to the dead jobs.
+        """
+        using = self._db or router.db_for_write(self.model)
+        if job.attempts < job.max_attempts:
+            self.using(using).filter(pk=job.pk).update(
+                run_at=timezone.now() + backoff(job.attempts),
+                last_error=error)
+            return
+        with transaction.atomic(using=using):
+            if self.using(using).filter(pk=job.pk).delete()[0]:
+                DeadJob.objects.using(using).create(
+                    task=job.task, kwargs=job.kwargs, priority=job.priority,
+                    attempts=job.attempts, last_error=error,
+                    created_at=job.created_at)
+
+
+class Job(models.Model):
+    """Call of a task due to run."""
+    task = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # Due jobs of higher priority run first.
+    priority = models.SmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField()
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = JobManager()
+
+    class Meta:
+        indexes = [
+            # Due jobs, see JobManager.claim(). Leased and scheduled jobs
+            # are past now, so claims scan only the due ones, sorting them
+            # by priority.
+            models.Index(fields=['run_at'], name='job_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
+
+
+class DeadJobManager(models.Manager):
+    """Manager for dead jobs."""
+
+    def requeue(self, dead_jobs):
+        """Move dead jobs back to the queue, with their attempts reset."""
+        using = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            dead_jobs = list(dead_jobs.using(using).select_for_update())
+            Job.objects.using(using).bulk_create([
+                Job(task=dead.task, kwargs=dead.kwargs,
+                    priority=dead.priority,
+                    max_attempts=get_job_setting('MAX_ATTEMPTS'),
+                    created_at=dead.created_at)
+                for dead in dead_jobs
+            ])
+            self.using(using).filter(
+                pk__in=[dead.pk for dead in dead_jobs]).delete()
+        return len(dead_jobs)
+
+
+class DeadJob(models.Model):
+    """Job which failed all its attempts, kept for inspection."""
+    task = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)
+    attempts = models.PositiveIntegerField()
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    failed_at = models.DateTimeField(default=timezone.now)
+
+    objects = DeadJobManager()
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
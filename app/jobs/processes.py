@@ -0,0 +1,52 @@
+"""
+Worker processes of the job queue.
+
+Processes are spawned rather than forked, so they don't share database
+connections. This module doesn't import models, so spawned processes can
+load their entrypoint before setting Django up.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker(databases, batch_size=None, interval=None, burst=False):
+    """
+    Entrypoint of worker processes. They use the database names of their
+    parent, e.g. test databases.
+    """
+    import django
+
+    django.setup()
+    from .worker import Worker
+
+    for alias, name in databases.items():
+        connections[alias].settings_dict['NAME'] = name
+    worker = Worker(batch_size, interval, burst)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    processed = worker.run()
+    logger.info('Worker %s ran %s jobs.', os.getpid(), processed)
+
+
+def start_workers(count, batch_size=None, interval=None, burst=False):
+    """Start count worker processes and return them."""
+    context = multiprocessing.get_context('spawn')
+    databases = {connection.alias: connection.settings_dict['NAME']
+                 for connection in connections.all()}
+    processes = [
+        context.Process(target=run_worker, args=(databases,), kwargs={
+            'batch_size': batch_size, 'interval': interval,
+            'burst': burst,
+        })
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    return processes
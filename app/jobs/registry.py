@@ -0,0 +1,85 @@
+"""
+Tasks run by the job queue.
+
+Apps declare tasks in a `tasks` module:
+
+    @task(priority=10)
+    def send_receipt(order_id):
+        ...
+
+and enqueue calls with `send_receipt.enqueue(order_id=order.pk)`. The
+job is a row inserted in the current transaction, so it's only claimed
+by a worker once the transaction commits, and never if it rolls back.
+Jobs may run more than once, e.g. when a worker dies, so tasks must be
+idempotent.
+"""
+from datetime import timedelta
+
+from django.db import router
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job, get_job_setting
+
+
+_tasks = {}
+
+
+class Task:
+    """Function run by the job queue, with its default job options."""
+
+    def __init__(self, func, name, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def build(self, run_at=None, delay=None, priority=None, **kwargs):
+        """
+        Return an unsaved job calling the task with JSON serializable
+        kwargs, due at run_at, after a delay in seconds, or now.
+        """
+        if run_at is None:
+            run_at = timezone.now()
+        if delay is not None:
+            run_at += timedelta(seconds=delay)
+        return Job(
+            task=self.name, kwargs=kwargs, run_at=run_at,
+            priority=self.priority if priority is None else priority,
+            max_attempts=(self.max_attempts
+                          or get_job_setting('MAX_ATTEMPTS')),
+        )
+
+    def enqueue(self, run_at=None, delay=None, priority=None, using=None,
+                **kwargs):
+        """Enqueue a call of the task in the current transaction."""
+        job = self.build(run_at, delay, priority, **kwargs)
+        job.save(using=using or router.db_for_write(Job))
+        return job
+
+
+def task(func=None, *, name=None, priority=0, max_attempts=None):
+    """
+    Decorator registering a function as a task, under its module and
+    name unless a name is given.
+    """
+    def register(func):
+        registered = Task(func, name or f'{func.__module__}.{func.__name__}',
+                          priority, max_attempts)
+        _tasks[registered.name] = registered
+        return registered
+
+    return register if func is None else register(func)
+
+
+def get_task(name):
+    """Return a registered task, loading the apps' tasks modules."""
+    if name not in _tasks:
+        autodiscover_modules('tasks')
+    return _tasks[name]
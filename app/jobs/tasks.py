@@ -0,0 +1,9 @@
+"""
+Tasks of the jobs app.
+"""
+from .registry import task
+
+
+@task
+def noop(**kwargs):
+    """Do nothing, to measure the overhead of the queue."""
@@ -0,0 +1,244 @@
+"""
+Tests for the background job queue.
+"""
+import os
+import signal
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from jobs.models import DeadJob, Job
+from jobs.registry import get_task, task
+from jobs.tasks import noop
+from jobs.worker import Worker
+
+
+calls = []
+
+
+@task(name='jobs.tests.record')
+def record(**kwargs):
+    calls.append(kwargs)
+
+
+@task(name='jobs.tests.broken', max_attempts=3)
+def broken():
+    raise RuntimeError('Broken task.')
+
+
+class JobQueueTests(TestCase):
+    """Test enqueueing, claiming and running jobs."""
+
+    def setUp(self):
+        calls.clear()
+
+    def run_worker(self):
+        return Worker(burst=True).run()
+
+    def test_enqueue(self):
+        """Test tasks enqueue jobs with their options and kwargs."""
+        job = record.enqueue(order_id=1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.task, 'jobs.tests.record')
+        self.assertEqual(job.kwargs, {'order_id': 1})
+        self.assertEqual(job.max_attempts, 5)
+        self.assertIs(get_task(job.task), record)
+
+    def test_priority_order(self):
+        """Test due jobs of higher priority are claimed first."""
+        low = record.enqueue(priority=-1)
+        normal = record.enqueue()
+        high = record.enqueue(priority=10)
+
+        self.assertEqual(Job.objects.claim(2), [high, normal])
+        self.assertEqual(Job.objects.claim(2), [low])
+
+    def test_claim_leases_jobs(self):
+        """Test claimed jobs aren't claimed again while leased."""
+        record.enqueue(number=1)
+
+        job, = Job.objects.claim(10)
+
+        self.assertEqual(job.kwargs, {'number': 1})
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(Job.objects.claim(10), [])
+        self.assertGreater(Job.objects.get().run_at,
+                           timezone.now() + timedelta(seconds=200))
+
+    def test_scheduled_jobs(self):
+        """Test jobs only run once they are due."""
+        record.enqueue(delay=60, number=1)
+        record.enqueue(run_at=timezone.now() - timedelta(seconds=1),
+                       number=2)
+
+        self.assertEqual(self.run_worker(), 1)
+
+        self.assertEqual(calls, [{'number': 2}])
+        self.assertEqual(Job.objects.get().kwargs, {'number': 1})
+
+    def test_finished_jobs_deleted(self):
+        """Test jobs are deleted once they ran."""
+        for number in range(25):
+            record.enqueue(number=number)
+
+        self.assertEqual(self.run_worker(), 25)
+
+        self.assertEqual(len(calls), 25)
+        self.assertFalse(Job.objects.exists())
+
+    def test_retry_with_backoff(self):
+        """Test failed jobs are retried later, waiting longer each time."""
+        broken.enqueue()
+
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.run_worker()
+
+        job = Job.objects.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('RuntimeError: Broken task.', job.last_error)
+        delay = job.run_at - timezone.now()
+        self.assertTrue(timedelta(0) < delay <= timedelta(seconds=2))
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.run_worker()
+
+        job = Job.objects.get()
+        self.assertEqual(job.attempts, 2)
+        delay = job.run_at - timezone.now()
+        self.assertTrue(timedelta(seconds=1) < delay <= timedelta(seconds=4))
+
+    def test_dead_letter(self):
+        """Test jobs failing all their attempts are moved to dead jobs."""
+        broken.enqueue(priority=3)
+        Job.objects.update(attempts=2)
+
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.run_worker()
+
+        self.assertFalse(Job.objects.exists())
+        dead = DeadJob.objects.get()
+        self.assertEqual((dead.task, dead.priority, dead.attempts),
+                         ('jobs.tests.broken', 3, 3))
+        self.assertIn('RuntimeError: Broken task.', dead.last_error)
+
+        self.assertEqual(DeadJob.objects.requeue(DeadJob.objects.all()), 1)
+
+        self.assertFalse(DeadJob.objects.exists())
+        job = Job.objects.get()
+        self.assertEqual((job.task, job.priority, job.attempts),
+                         ('jobs.tests.broken', 3, 0))
+
+    def test_lost_worker(self):
+        """Test jobs whose last attempt's worker was lost are dead."""
+        record.enqueue()
+        Job.objects.update(attempts=5)
+
+        self.run_worker()
+
+        self.assertEqual(calls, [])
+        self.assertIn('worker was lost', DeadJob.objects.get().last_error)
+
+    def test_rolled_back_enqueue(self):
+        """Test jobs enqueued in a rolled back transaction never run."""
+        try:
+            with transaction.atomic():
+                record.enqueue()
+                raise ValueError
+        except ValueError:
+            pass
+
+        self.assertFalse(Job.objects.exists())
+
+    def test_run_workers_command(self):
+        """Test the command runs the due jobs."""
+        for number in range(3):
+            record.enqueue(number=number)
+        out = StringIO()
+
+        call_command('run_workers', processes=1, burst=True, stdout=out)
+
+        self.assertIn('Ran 3 jobs.', out.getvalue())
+        self.assertEqual(len(calls), 3)
+
+    def test_stopped_while_starting(self):
+        """Test workers started after a SIGTERM are stopped."""
+        process = Mock(exitcode=None)
+        process.is_alive.return_value = True
+        process.terminate.side_effect = lambda: setattr(
+            process, 'exitcode', -signal.SIGTERM)
+
+        def start_workers(count, **options):
+            os.kill(os.getpid(), signal.SIGTERM)
+            return [process]
+
+        out = StringIO()
+        with patch('jobs.management.commands.run_workers.start_workers',
+                   start_workers):
+            call_command('run_workers', processes=2, stdout=out)
+
+        process.terminate.assert_called_once_with()
+        self.assertIn('2 workers stopped.', out.getvalue())
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'SKIP LOCKED needs PostgreSQL.')
+class ConcurrentJobQueueTests(TransactionTestCase):
+    """Test the queue shared by several connections."""
+
+    def claim_in_thread(self, batch_size):
+        claimed = []
+
+        def claim():
+            try:
+                claimed.extend(Job.objects.claim(batch_size))
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=claim)
+        thread.start()
+        thread.join(timeout=10)
+        self.assertFalse(thread.is_alive())
+        return claimed
+
+    def test_enqueued_on_commit(self):
+        """Test jobs are only visible once their transaction commits."""
+        with transaction.atomic():
+            noop.enqueue()
+            self.assertEqual(self.claim_in_thread(10), [])
+
+        self.assertEqual(len(self.claim_in_thread(10)), 1)
+
+    def test_locked_jobs_skipped(self):
+        """Test workers claim other jobs than the ones being claimed."""
+        Job.objects.bulk_create([noop.build(number=n) for n in range(10)])
+
+        with transaction.atomic():
+            first = Job.objects.claim(4)
+            second = self.claim_in_thread(10)
+
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(second), 6)
+        self.assertFalse({job.pk for job in first}
+                         & {job.pk for job in second})
+
+    def test_benchmark_command(self):
+        """Test the benchmark runs all jobs in worker processes."""
+        out = StringIO()
+
+        call_command('benchmark_jobs', jobs=200, processes=2, warmup=3,
+                     stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('enqueue: 200 jobs'))
+        self.assertTrue(lines[1].startswith('run: 200 jobs'))
+        self.assertIn('jobs/sec', lines[1])
+        self.assertFalse(Job.objects.exists())
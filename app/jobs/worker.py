@@ -0,0 +1,77 @@
+"""
+Workers running the jobs of the queue.
+"""
+import logging
+import threading
+import traceback
+
+from django.db import connections
+
+from .models import Job, get_job_setting
+from .registry import get_task
+
+
+logger = logging.getLogger(__name__)
+
+
+def close_old_connections():
+    """
+    Close broken or expired connections between batches, as after
+    requests, unless a transaction is open (e.g. in tests).
+    """
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close_if_unusable_or_obsolete()
+
+
+class Worker:
+    """Loop claiming batches of due jobs and running them."""
+
+    def __init__(self, batch_size=None, interval=None, burst=False):
+        self.batch_size = batch_size or get_job_setting('BATCH_SIZE')
+        self.interval = (get_job_setting('POLL_INTERVAL')
+                         if interval is None else interval)
+        # Exit once no job is due, instead of waiting for more.
+        self.burst = burst
+        self.stopping = threading.Event()
+        self.processed = 0
+
+    def stop(self, *args):
+        """Stop after the current batch, e.g. on SIGTERM."""
+        self.stopping.set()
+
+    def run(self):
+        while not self.stopping.is_set():
+            close_old_connections()
+            if self.run_batch():
+                continue
+            if self.burst:
+                break
+            self.stopping.wait(self.interval)
+        return self.processed
+
+    def run_batch(self):
+        """Run a batch of due jobs and return how many were claimed."""
+        jobs = Job.objects.claim(self.batch_size)
+        done = []
+        for job in jobs:
+            if job.attempts > job.max_attempts:
+                # Claimed again after its last attempt's lease expired.
+                Job.objects.fail(job, 'The worker was lost while running '
+                                      'the last attempt.')
+            elif self.run_job(job):
+                done.append(job.pk)
+        Job.objects.complete(done)
+        self.processed += len(jobs)
+        return len(jobs)
+
+    def run_job(self, job):
+        """Run a job, recording its failure, and return if it succeeded."""
+        try:
+            get_task(job.task)(**job.kwargs)
+        except Exception:
+            logger.exception('Job %s failed, attempt %s of %s.',
+                             job, job.attempts, job.max_attempts)
+            Job.objects.fail(job, traceback.format_exc())
+            return False
+        return True
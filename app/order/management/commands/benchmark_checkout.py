@@ -0,0 +1,186 @@
+"""
+Django command to load test concurrent checkouts of the same products.
+"""
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from catalog.models import Category, OutOfStock, Product
+from order.models import Order, OrderItem
+from user.models import Address
+
+
+# Small, so the sweepers share the work.
+RELEASE_BATCH_SIZE = 50
+
+
+def run_threads(count, target):
+    """Run target(index) in count threads, each with its own connection."""
+    errors = []
+
+    def run(index):
+        try:
+            target(index)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(index,))
+               for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+class Command(BaseCommand):
+    """Django command to load test concurrent checkouts."""
+
+    help = ('Place orders for a few products from many threads at once, '
+            'like a flash sale, then expire them with concurrent '
+            'sweepers. Report orders/sec and fail on any oversell.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--products', type=int, default=1,
+            help='Number of products on sale.',
+        )
+        parser.add_argument(
+            '--stock', type=int, default=1000,
+            help='Initial stock of each product.',
+        )
+        parser.add_argument(
+            '--orders', type=int, default=2000,
+            help='Orders attempted, more than the stock to sell out.',
+        )
+        parser.add_argument(
+            '--quantity', type=int, default=1,
+            help='Quantity of each product in an order.',
+        )
+        parser.add_argument(
+            '--items', type=int, default=1,
+            help='Products in each order, at most --products.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=32,
+            help='Number of threads placing orders.',
+        )
+        parser.add_argument(
+            '--sweepers', type=int, default=4,
+            help='Number of threads releasing the expired orders.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if not 1 <= options['items'] <= options['products']:
+            raise CommandError('--items must be between 1 and --products.')
+        suffix = uuid.uuid4().hex[:12]
+        category = Category.objects.create(name=f'Benchmark {suffix}')
+        products = [
+            Product.objects.create(category=category, name=f'Sale {n}',
+                                   price='10.00', stock=options['stock'])
+            for n in range(options['products'])
+        ]
+        users = [
+            get_user_model().objects.create_user(
+                email=f'checkout-{suffix}-{n}@example.com',
+                username=f'checkout-{suffix}-{n}',
+                phone_number=f'{uuid.uuid4().int % 10 ** 15:015d}',
+                first_name='Benchmark',
+                last_name='User',
+            )
+            for n in range(options['concurrency'])
+        ]
+        try:
+            self.benchmark(products, users, options)
+        finally:
+            Order.objects.filter(user__in=users).delete()
+            Address.objects.filter(user__in=users).delete()
+            Product.objects.filter(category=category).delete()
+            category.delete()
+            get_user_model().objects.filter(
+                pk__in=[user.pk for user in users]).delete()
+
+    def benchmark(self, products, users, options):
+        addresses = [
+            Address.objects.create(user=user, street='Benchmark 1',
+                                   city='Warsaw', zip_code='00-001',
+                                   country='Poland')
+            for user in users
+        ]
+        product_ids = [product.id for product in products]
+        results = Counter()
+        attempts = iter(range(options['orders']))
+        lock = threading.Lock()
+
+        def place_orders(index):
+            while True:
+                with lock:
+                    attempt = next(attempts, None)
+                if attempt is None:
+                    return
+                quantities = {
+                    product_ids[(attempt + n) % len(product_ids)]:
+                        options['quantity']
+                    for n in range(options['items'])
+                }
+                try:
+                    Order.objects.place(users[index], addresses[index],
+                                        quantities)
+                    outcome = 'placed'
+                except OutOfStock:
+                    outcome = 'rejected'
+                with lock:
+                    results[outcome] += 1
+
+        start = time.perf_counter()
+        run_threads(options['concurrency'], place_orders)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"checkout: {results['placed']} orders placed and "
+            f"{results['rejected']} rejected out of stock in "
+            f"{elapsed:.2f}s, {results['placed'] / elapsed:.1f} orders/sec "
+            f"({options['orders'] / elapsed:.1f} attempts/sec)")
+        self.check_stock(product_ids, options['stock'])
+
+        Order.objects.filter(user__in=users).update(
+            reserved_until=timezone.now())
+        start = time.perf_counter()
+        run_threads(options['sweepers'], self.release)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"release: {results['placed']} reservations released in "
+            f"{elapsed:.2f}s by {options['sweepers']} sweepers")
+        restocked = Product.objects.filter(
+            pk__in=product_ids, stock=options['stock']).count()
+        if restocked != len(product_ids):
+            raise CommandError('Released stock differs from the reserved.')
+        self.stdout.write(self.style.SUCCESS(
+            'No oversell, all reservations released once.'))
+
+    def release(self, index):
+        """Release expired orders in small batches until none are left."""
+        while Order.objects.release_expired(batch_size=RELEASE_BATCH_SIZE):
+            pass
+
+    def check_stock(self, product_ids, initial):
+        """Check each product's stock and sold quantity add up."""
+        sold = dict(OrderItem.objects.filter(
+            product_id__in=product_ids).values('product_id').annotate(
+            sold=Sum('quantity')).values_list('product_id', 'sold'))
+        for product_id, stock in Product.objects.filter(
+                pk__in=product_ids).values_list('id', 'stock'):
+            if stock + sold.get(product_id, 0) != initial or stock < 0:
+                raise CommandError(
+                    f'Product {product_id} oversold: {stock} in stock, '
+                    f'{sold.get(product_id, 0)} sold of {initial}.')
@@ -0,0 +1,41 @@
+"""
+Django command to return the stock of expired orders.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from order.models import Order
+
+
+class Command(BaseCommand):
+    """Django command to return the stock of expired orders."""
+
+    help = ('Expire pending orders whose stock reservation ended and '
+            'return their products to stock, in batches. Several '
+            'instances can run at once.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            help="Orders expired per transaction, "
+                 "ORDERS['RELEASE_BATCH_SIZE'] by default.",
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            help='Keep sweeping, waiting this many seconds whenever no '
+                 'reservations expired.',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            count = Order.objects.release_expired(options['batch_size'])
+            total += count
+            if count:
+                continue
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Released the stock of {total} expired orders.'))
@@ -0,0 +1,177 @@
+"""
+Database models for orders.
+
+Placing an order takes its products from stock right away, reserving
+them until the order is confirmed, cancelled, or its reservation
+expires and release_expired() returns them.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from catalog.models import OutOfStock, Product
+from user.models import Address
+
+
+DEFAULTS = {
+    # Seconds the stock of a pending order stays reserved.
+    'RESERVATION_SECONDS': 900,
+    'RELEASE_BATCH_SIZE': 500,
+}
+
+
+def get_order_setting(name):
+    """Return a value from settings.ORDERS or its default."""
+    return getattr(settings, 'ORDERS', {}).get(name, DEFAULTS[name])
+
+
+class OrderManager(models.Manager):
+    """Manager for orders."""
+
+    def place(self, user, address, quantities):
+        """
+        Create an order of {product_id: quantity} for a user, shipped to
+        one of their addresses, and reserve its stock. Raise
+        catalog.models.OutOfStock, creating nothing, if any product is
+        short of stock or was deleted.
+        """
+        using = self._db or router.db_for_write(self.model)
+        prices = dict(Product.objects.using(using).filter(
+            pk__in=quantities).values_list('id', 'price'))
+        if len(prices) < len(quantities):
+            raise OutOfStock(quantities.keys() - prices.keys())
+
+        now = timezone.now()
+        with transaction.atomic(using=using):
+            order = self.using(using).create(
+                user=user, address=address,
+                total=sum(prices[product_id] * quantity
+                          for product_id, quantity in quantities.items()),
+                created_at=now,
+                reserved_until=now + timedelta(
+                    seconds=get_order_setting('RESERVATION_SECONDS')),
+            )
+            OrderItem.objects.using(using).bulk_create([
+                OrderItem(order=order, product_id=product_id,
+                          quantity=quantity, price=prices[product_id])
+                for product_id, quantity in sorted(quantities.items())
+            ])
+            # Last, so the product rows are locked only until the commit.
+            Product.objects.db_manager(using).reserve_stock(quantities)
+        return order
+
+    def confirm(self, order):
+        """
+        Confirm a pending order whose reservation hasn't expired. Return
+        whether it was.
+        """
+        using = self._db or router.db_for_write(self.model)
+        confirmed = self.using(using).filter(
+            pk=order.pk, status=Order.Status.PENDING,
+            reserved_until__gt=timezone.now(),
+        ).update(status=Order.Status.CONFIRMED, reserved_until=None)
+        return bool(confirmed)
+
+    def cancel(self, order):
+        """
+        Cancel a pending order and return its stock. Return whether it
+        was.
+        """
+        using = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            # Conditional, so an order being released concurrently is
+            # returned to stock once.
+            cancelled = self.using(using).filter(
+                pk=order.pk, status=Order.Status.PENDING,
+            ).update(status=Order.Status.CANCELLED, reserved_until=None)
+            if cancelled:
+                self._release_stock(using, [order.pk])
+        return bool(cancelled)
+
+    def release_expired(self, batch_size=None):
+        """
+        Expire a batch of pending orders whose reservation ended and
+        return their stock. Return how many orders expired.
+
+        Orders are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so
+        concurrent sweepers take different batches rather than waiting on
+        each other.
+        """
+        using = self._db or router.db_for_write(self.model)
+        batch_size = batch_size or get_order_setting('RELEASE_BATCH_SIZE')
+        with transaction.atomic(using=using):
+            order_ids = list(self.using(using).filter(
+                status=Order.Status.PENDING,
+                reserved_until__lte=timezone.now(),
+            ).order_by('reserved_until').select_for_update(
+                skip_locked=True,
+            ).values_list('id', flat=True)[:batch_size])
+            if not order_ids:
+                return 0
+            self.using(using).filter(pk__in=order_ids).update(
+                status=Order.Status.EXPIRED, reserved_until=None)
+            self._release_stock(using, order_ids)
+        return len(order_ids)
+
+    def _release_stock(self, using, order_ids):
+        quantities = Counter()
+        for product_id, quantity in OrderItem.objects.using(using).filter(
+                order_id__in=order_ids).values_list('product_id',
+                                                    'quantity'):
+            quantities[product_id] += quantity
+        Product.objects.db_manager(using).release_stock(quantities)
+
+
+class Order(models.Model):
+    """Order of products by a user."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        CONFIRMED = 'confirmed', 'Confirmed'
+        CANCELLED = 'cancelled', 'Cancelled'
+        EXPIRED = 'expired', 'Expired'
+
+    # Lookups by user are served by the composite index below.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE,
+                             related_name='orders', db_index=False)
+    address = models.ForeignKey(Address, on_delete=models.PROTECT,
+                                related_name='orders')
+    status = models.CharField(max_length=20, choices=Status.choices,
+                              default=Status.PENDING)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+    # End of the stock reservation of a pending order.
+    reserved_until = models.DateTimeField(null=True, blank=True)
+
+    objects = OrderManager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's orders.
+            models.Index(fields=['user', 'id'], name='order_user_id_idx'),
+            # Expired reservations, for release_expired().
+            models.Index(fields=['reserved_until'],
+                         name='order_reservation_idx',
+                         condition=Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return f'Order {self.pk} ({self.status})'
+
+
+class OrderItem(models.Model):
+    """Quantity of a product in an order, at its price when ordered."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE,
+                              related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT,
+                                related_name='+')
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f'{self.quantity} x {self.product_id}'
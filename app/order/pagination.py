@@ -0,0 +1,15 @@
+"""
+Pagination classes for the order API.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class OrderCursorPagination(CursorPagination):
+    """
+    Keyset pagination of a user's orders, newest first, on the (user, id)
+    index.
+    """
+    ordering = '-id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,47 @@
+"""
+Serializers for the order API.
+"""
+from rest_framework import serializers
+
+from core.instrumentation import TimedSerializerMixin
+from order.models import Order, OrderItem
+from user.models import Address
+
+
+class CheckoutSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Address to ship the products in the cart to."""
+    address = serializers.PrimaryKeyRelatedField(
+        queryset=Address.objects.all())
+
+    def validate_address(self, address):
+        if address.user_id != self.context['request'].user.pk:
+            raise serializers.ValidationError('Address not found.')
+        return address
+
+
+class OrderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for orders in listings."""
+
+    class Meta:
+        model = Order
+        fields = ['id', 'address', 'status', 'total', 'created_at',
+                  'reserved_until']
+        read_only_fields = fields
+
+
+class OrderItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for the products in an order."""
+
+    class Meta:
+        model = OrderItem
+        fields = ['product', 'quantity', 'price']
+        read_only_fields = fields
+
+
+class OrderDetailSerializer(OrderSerializer):
+    """Serializer for order details."""
+    items = OrderItemSerializer(many=True, read_only=True)
+
+    class Meta(OrderSerializer.Meta):
+        fields = OrderSerializer.Meta.fields + ['items']
+        read_only_fields = fields
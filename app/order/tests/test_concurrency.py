@@ -0,0 +1,35 @@
+"""
+Tests for concurrent checkouts and sweepers.
+"""
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Concurrent transactions need PostgreSQL.')
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Test checkouts of the same products from many threads at once."""
+
+    def checkout(self, **options):
+        out = StringIO()
+        call_command('benchmark_checkout', stdout=out, **options)
+        return out.getvalue()
+
+    def test_flash_sale_never_oversells(self):
+        """Test a sold out product is never oversold or released twice."""
+        out = self.checkout(stock=20, orders=60, concurrency=8, sweepers=3)
+
+        self.assertIn('20 orders placed and 40 rejected', out)
+        self.assertIn('No oversell', out)
+
+    def test_multi_product_orders_never_deadlock(self):
+        """Test orders of overlapping products lock them in order."""
+        out = self.checkout(products=3, items=3, stock=15, quantity=2,
+                            orders=30, concurrency=8, sweepers=2)
+
+        self.assertIn('7 orders placed and 23 rejected', out)
+        self.assertIn('No oversell', out)
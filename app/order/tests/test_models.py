@@ -0,0 +1,128 @@
+"""
+Tests for placing orders and reserving stock.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from catalog.models import Category, OutOfStock, Product
+from order.models import Order, OrderItem
+from user.models import Address
+
+
+class OrderTests(TestCase):
+    """Test the order lifecycle and its stock reservations."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='janek123', email='user@example.com',
+            phone_number='+48123456789', password='testpass123',
+            first_name='Jan', last_name='Kowalski')
+        self.address = Address.objects.create(
+            user=self.user, street='Marszalkowska 1', city='Warsaw',
+            zip_code='00-001', country='Poland')
+        category = Category.objects.create(name='Audio')
+        self.speaker = Product.objects.create(
+            category=category, name='Speaker', price='25.00', stock=5)
+        self.headphones = Product.objects.create(
+            category=category, name='Headphones', price='10.50', stock=2)
+
+    def stock(self):
+        return dict(Product.objects.values_list('name', 'stock'))
+
+    def place(self, **quantities):
+        products = {'speaker': self.speaker, 'headphones': self.headphones}
+        return Order.objects.place(self.user, self.address, {
+            products[name].id: quantity
+            for name, quantity in quantities.items()})
+
+    def test_place(self):
+        """Test an order is created with its items and stock reserved."""
+        order = self.place(speaker=2, headphones=1)
+
+        self.assertEqual(order.status, Order.Status.PENDING)
+        self.assertEqual(order.total, 2 * 25 + 10.5)
+        self.assertEqual(order.address, self.address)
+        self.assertGreater(order.reserved_until, timezone.now())
+        self.assertEqual(
+            list(order.items.values_list('product__name', 'quantity',
+                                         'price')),
+            [('Speaker', 2, 25), ('Headphones', 1, 10.5)])
+        self.assertEqual(self.stock(), {'Speaker': 3, 'Headphones': 1})
+
+    def test_out_of_stock(self):
+        """Test orders short of stock are rejected as a whole."""
+        with self.assertRaises(OutOfStock) as context:
+            self.place(speaker=1, headphones=3)
+
+        self.assertEqual(context.exception.product_ids,
+                         [self.headphones.id])
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(self.stock(), {'Speaker': 5, 'Headphones': 2})
+
+    def test_sell_out(self):
+        """Test the last units can be ordered and no more."""
+        self.place(headphones=2)
+
+        with self.assertRaises(OutOfStock):
+            self.place(headphones=1)
+
+        self.assertEqual(self.stock()['Headphones'], 0)
+
+    def test_deleted_product(self):
+        """Test orders of unknown products are rejected."""
+        with self.assertRaises(OutOfStock) as context:
+            Order.objects.place(self.user, self.address, {0: 1})
+
+        self.assertEqual(context.exception.product_ids, [0])
+
+    def test_confirm(self):
+        """Test confirming keeps the stock, once, before expiry."""
+        order = self.place(speaker=1)
+
+        self.assertTrue(Order.objects.confirm(order))
+        self.assertFalse(Order.objects.confirm(order))
+        self.assertFalse(Order.objects.cancel(order))
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.Status.CONFIRMED)
+        self.assertEqual(self.stock()['Speaker'], 4)
+
+    def test_cancel(self):
+        """Test cancelling returns the stock once."""
+        order = self.place(speaker=2, headphones=2)
+
+        self.assertTrue(Order.objects.cancel(order))
+        self.assertFalse(Order.objects.cancel(order))
+
+        self.assertEqual(self.stock(), {'Speaker': 5, 'Headphones': 2})
+
+    def test_release_expired(self):
+        """Test expired reservations are returned to stock in batches."""
+        expired = [self.place(speaker=1) for _ in range(3)]
+        current = self.place(speaker=1, headphones=1)
+        Order.objects.filter(pk__in=[o.pk for o in expired]).update(
+            reserved_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(Order.objects.release_expired(batch_size=2), 2)
+        self.assertEqual(Order.objects.release_expired(batch_size=2), 1)
+        self.assertEqual(Order.objects.release_expired(batch_size=2), 0)
+
+        self.assertEqual(self.stock(), {'Speaker': 4, 'Headphones': 1})
+        self.assertEqual(
+            set(Order.objects.filter(status=Order.Status.EXPIRED)),
+            set(expired))
+        current.refresh_from_db()
+        self.assertEqual(current.status, Order.Status.PENDING)
+        self.assertFalse(Order.objects.confirm(expired[0]))
+
+    def test_expired_not_confirmed(self):
+        """Test orders past their reservation can't be confirmed."""
+        order = self.place(speaker=1)
+        Order.objects.filter(pk=order.pk).update(
+            reserved_until=timezone.now())
+
+        self.assertFalse(Order.objects.confirm(order))
@@ -0,0 +1,165 @@
+"""
+Tests for the order API.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cart.models import user_cart_key
+from cart.store import get_store
+from catalog.models import Category, Product
+from order.models import Order
+from user.models import Address
+
+
+ORDER_LIST = reverse('order:order-list')
+
+
+def order_url(name, order_id):
+    """Create and return an order detail or action URL."""
+    return reverse(f'order:order-{name}', args=[order_id])
+
+
+def create_user(number):
+    return get_user_model().objects.create_user(
+        username=f'user{number}', email=f'user{number}@example.com',
+        phone_number=f'+4812345678{number}', password='testpass123',
+        first_name='Jan', last_name='Kowalski')
+
+
+def create_address(user):
+    return Address.objects.create(
+        user=user, street='Marszalkowska 1', city='Warsaw',
+        zip_code='00-001', country='Poland')
+
+
+class OrderAPITests(TestCase):
+    """Test ordering the products in the cart."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(1)
+        self.address = create_address(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Audio')
+        self.product = Product.objects.create(
+            category=category, name='Speaker', price='25.00', stock=3)
+
+    def fill_cart(self, quantity):
+        get_store().update(user_cart_key(self.user.pk), self.product.id,
+                           quantity)
+
+    def checkout(self, address=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                ORDER_LIST, {'address': (address or self.address).id})
+
+    def test_checkout(self):
+        """Test ordering the cart reserves stock and empties the cart."""
+        self.fill_cart(2)
+
+        res = self.checkout()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['status'], Order.Status.PENDING)
+        self.assertEqual(res.data['address'], self.address.id)
+        self.assertEqual(res.data['total'], '50.00')
+        self.assertEqual(res.data['items'], [
+            {'product': self.product.id, 'quantity': 2, 'price': '25.00'}])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertEqual(get_store().get(user_cart_key(self.user.pk)), {})
+
+    def test_checkout_keeps_later_items(self):
+        """Test items added while ordering stay in the cart."""
+        self.fill_cart(2)
+        other = Product.objects.create(
+            category=self.product.category, name='Cable', price='5.00',
+            stock=10)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            res = self.client.post(ORDER_LIST, {'address': self.address.id})
+        self.fill_cart(3)
+        get_store().update(user_cart_key(self.user.pk), other.id, 1)
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(get_store().get(user_cart_key(self.user.pk)),
+                         {self.product.id: 1, other.id: 1})
+
+    def test_checkout_out_of_stock(self):
+        """Test orders short of stock are rejected, keeping the cart."""
+        self.fill_cart(4)
+
+        res = self.checkout()
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['products'], [self.product.id])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(get_store().get(user_cart_key(self.user.pk)),
+                         {self.product.id: 4})
+
+    def test_checkout_invalid(self):
+        """Test empty carts and other users' addresses are rejected."""
+        res = self.checkout()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cart', res.data)
+
+        self.fill_cart(1)
+        res = self.checkout(create_address(create_user(2)))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('address', res.data)
+
+        res = self.client.post(ORDER_LIST)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_and_detail(self):
+        """Test users see their own orders only."""
+        self.fill_cart(1)
+        order_id = self.checkout().data['id']
+        other = APIClient()
+        other.force_authenticate(create_user(2))
+
+        res = self.client.get(ORDER_LIST)
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [order_id])
+        self.assertEqual(other.get(ORDER_LIST).data['results'], [])
+
+        res = self.client.get(order_url('detail', order_id))
+        self.assertEqual(res.data['items'][0]['quantity'], 1)
+        res = other.get(order_url('detail', order_id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_confirm_and_cancel(self):
+        """Test pending orders can be confirmed or cancelled once."""
+        self.fill_cart(1)
+        first = self.checkout().data['id']
+        self.fill_cart(2)
+        second = self.checkout().data['id']
+
+        res = self.client.post(order_url('confirm', first))
+        self.assertEqual(res.data['status'], Order.Status.CONFIRMED)
+        res = self.client.post(order_url('cancel', second))
+        self.assertEqual(res.data['status'], Order.Status.CANCELLED)
+
+        res = self.client.post(order_url('cancel', first))
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 2)
+
+    def test_ordered_address_not_deleted(self):
+        """Test addresses used by orders can't be deleted."""
+        self.fill_cart(1)
+        self.checkout()
+
+        res = self.client.delete(
+            reverse('user:address-detail', args=[self.address.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Address.objects.filter(pk=self.address.id).exists())
@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import views
+
+app_name = "order"
+
+urlpatterns = [
+    path('', views.OrderListCreateAPIView.as_view(), name='order-list'),
+    path('<int:pk>/', views.OrderDetailAPIView.as_view(),
+         name='order-detail'),
+    path('<int:pk>/confirm/', views.OrderConfirmAPIView.as_view(),
+         name='order-confirm'),
+    path('<int:pk>/cancel/', views.OrderCancelAPIView.as_view(),
+         name='order-cancel'),
+]
@@ -0,0 +1,125 @@
+"""
+Views for the order API.
+"""
+from django.db import transaction
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from cart.models import user_cart_key
+from cart.store import get_store
+from catalog.models import OutOfStock
+from core.readonly import CompiledSerializerMixin
+
+from .models import Order
+from .pagination import OrderCursorPagination
+from .serializers import (
+    CheckoutSerializer,
+    OrderDetailSerializer,
+    OrderSerializer,
+)
+
+
+def remove_from_cart(cart_key, quantities):
+    """
+    Take the ordered quantities out of a cart, keeping what was added
+    while the order was placed.
+    """
+    store = get_store()
+    for product_id, quantity in quantities.items():
+        store.update(cart_key, product_id, -quantity, add=True)
+
+
+class Conflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_code = 'conflict'
+
+
+class OrderListCreateAPIView(CompiledSerializerMixin,
+                             generics.ListCreateAPIView):
+    """
+    List the current user's orders, newest first, or order the products
+    in their cart. Ordering reserves the products' stock until the order
+    is confirmed, cancelled or its reservation expires.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = OrderCursorPagination
+
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user)
+
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return CheckoutSerializer
+        return OrderSerializer
+
+    @extend_schema(responses={status.HTTP_201_CREATED: OrderDetailSerializer})
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart_key = user_cart_key(request.user.pk)
+        quantities = get_store().get(cart_key)
+        if not quantities:
+            raise ValidationError({'cart': ['The cart is empty.']})
+
+        try:
+            order = Order.objects.place(
+                request.user, serializer.validated_data['address'],
+                quantities)
+        except OutOfStock as error:
+            return Response({
+                'detail': 'Some products are out of stock.',
+                'products': error.product_ids,
+            }, status=status.HTTP_409_CONFLICT)
+        transaction.on_commit(
+            lambda: remove_from_cart(cart_key, quantities))
+        return Response(OrderDetailSerializer(order).data,
+                        status=status.HTTP_201_CREATED)
+
+
+class OrderDetailAPIView(generics.RetrieveAPIView):
+    """Retrieve an order of the current user with its products."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = OrderDetailSerializer
+
+    def get_queryset(self):
+        return Order.objects.filter(
+            user=self.request.user).prefetch_related('items')
+
+
+class OrderActionAPIView(generics.GenericAPIView):
+    """
+    Base view of an action on a pending order of the current user.
+    Subclasses set perform_action to the OrderManager method of the
+    action, which returns whether the order was pending.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = OrderDetailSerializer
+    perform_action = None
+    conflict_message = None
+
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user)
+
+    @extend_schema(request=None)
+    def post(self, request, *args, **kwargs):
+        order = self.get_object()
+        if not self.perform_action(order):
+            raise Conflict(self.conflict_message)
+        order = self.get_queryset().prefetch_related('items').get(
+            pk=order.pk)
+        return Response(self.get_serializer(order).data)
+
+
+class OrderConfirmAPIView(OrderActionAPIView):
+    """Confirm a pending order before its reservation expires."""
+    perform_action = staticmethod(Order.objects.confirm)
+    conflict_message = 'Only pending orders can be confirmed.'
+
+
+class OrderCancelAPIView(OrderActionAPIView):
+    """Cancel a pending order, returning its products to stock."""
+    perform_action = staticmethod(Order.objects.cancel)
+    conflict_message = 'Only pending orders can be cancelled.'
@@ -0,0 +1,5 @@
+from django.contrib import admin
+from review import models
+
+
+admin.site.register(models.Review)
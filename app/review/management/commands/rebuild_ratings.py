@@ -0,0 +1,31 @@
+"""
+Django command to recompute the product rating aggregates.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from catalog.models import Product
+from review.models import Review
+
+
+class Command(BaseCommand):
+    """Django command to recompute the product rating aggregates."""
+
+    help = ('Recompute the rating count, sum, histogram and average of '
+            'all products from their reviews, e.g. after bulk imports or '
+            'deletes. Products are locked a batch at a time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Range of product ids recomputed per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        last_id = Product.objects.aggregate(last_id=Max('id'))['last_id']
+        fixed = 0
+        for start in range(1, (last_id or 0) + 1, options['batch_size']):
+            fixed += Review.objects.rebuild_ratings(
+                start, start + options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the ratings, {fixed} products were out of date.'))
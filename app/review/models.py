@@ -0,0 +1,142 @@
+"""
+Database models for product reviews.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import connections, models, router, transaction
+from django.utils import timezone
+
+from catalog.models import RATING_STARS, Product
+
+
+def adjust_ratings(using, deltas):
+    """
+    Add {(product_id, rating): delta} to the rating aggregates of
+    products, one UPDATE per product.
+    """
+    by_product = defaultdict(dict)
+    for (product_id, rating), delta in deltas.items():
+        by_product[product_id][rating] = delta
+    # Products are locked in id order, so concurrent moves of reviews
+    # between them can't deadlock.
+    for product_id in sorted(by_product):
+        Product.objects.db_manager(using).adjust_ratings(
+            product_id, by_product[product_id])
+
+
+class ReviewManager(models.Manager):
+    """Manager for reviews."""
+
+    def rebuild_ratings(self, start, stop):
+        """
+        Recompute the rating aggregates of the products with ids in
+        [start, stop) from their reviews, and return how many were wrong.
+        Only products whose aggregates changed are written.
+        """
+        using = self._db or router.db_for_write(self.model)
+        products = Product._meta.db_table
+        reviews = self.model._meta.db_table
+        stars = [f'ratings_{stars}' for stars in RATING_STARS]
+        columns = ['ratings_count', 'ratings_sum', 'average_rating', *stars]
+        with transaction.atomic(using=using), \
+                connections[using].cursor() as cursor:
+            # Reviews saved meanwhile wait for their product, so their
+            # adjustments apply on top of the recomputed aggregates.
+            cursor.execute(
+                f'SELECT id FROM {products} WHERE id >= %s AND id < %s '
+                f'ORDER BY id FOR UPDATE', [start, stop])
+            counts = ', '.join(
+                f'COUNT(review.id) FILTER (WHERE review.rating = {number}) '
+                f'AS ratings_{number}' for number in RATING_STARS)
+            cursor.execute(
+                f'WITH aggregate AS ('
+                f'SELECT product.id, COUNT(review.id) AS ratings_count, '
+                f'COALESCE(SUM(review.rating), 0) AS ratings_sum, '
+                f'COALESCE(ROUND(AVG(review.rating), 1), 0) '
+                f'AS average_rating, {counts} '
+                f'FROM {products} AS product '
+                f'LEFT JOIN {reviews} AS review '
+                f'ON review.product_id = product.id '
+                f'WHERE product.id >= %s AND product.id < %s '
+                f'GROUP BY product.id) '
+                f'UPDATE {products} AS product SET '
+                f"{', '.join(f'{c} = aggregate.{c}' for c in columns)} "
+                f'FROM aggregate WHERE product.id = aggregate.id '
+                f"AND ({', '.join(f'product.{c}' for c in columns)}) "
+                f'IS DISTINCT FROM '
+                f"({', '.join(f'aggregate.{c}' for c in columns)})",
+                [start, stop])
+            return cursor.rowcount
+
+
+class Review(models.Model):
+    """
+    Review of a product by a user.
+
+    Saving or deleting a review adjusts the rating aggregates of its
+    product in the same transaction. Bulk updates and deletes bypass
+    them; run `manage.py rebuild_ratings` after those.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='reviews', db_index=False)
+    # Reviews outlive their authors' accounts, so ratings stay counted.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True,
+                             on_delete=models.SET_NULL,
+                             related_name='reviews')
+    rating = models.PositiveSmallIntegerField(validators=[
+        MinValueValidator(min(RATING_STARS)),
+        MaxValueValidator(max(RATING_STARS)),
+    ])
+    title = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ReviewManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'user'],
+                                    name='unique_product_review'),
+            models.CheckConstraint(
+                check=models.Q(rating__gte=min(RATING_STARS),
+                               rating__lte=max(RATING_STARS)),
+                name='review_rating_range'),
+        ]
+        indexes = [
+            # Keyset pagination of a product's reviews, newest first.
+            models.Index(fields=['product', 'id'],
+                         name='review_product_id_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.rating} stars for {self.product_id}'
+
+    def save(self, *args, **kwargs):
+        """Save the review and move its rating in the product aggregates."""
+        using = kwargs.get('using') or router.db_for_write(type(self))
+        with transaction.atomic(using=using):
+            old = None
+            if self.pk is not None:
+                old = type(self).objects.using(using).filter(
+                    pk=self.pk).select_for_update().values_list(
+                    'product_id', 'rating').first()
+            super().save(*args, **kwargs)
+            deltas = Counter({(self.product_id, self.rating): 1})
+            if old is not None:
+                deltas[old] -= 1
+            adjust_ratings(using, deltas)
+
+    def delete(self, using=None, keep_parents=False):
+        """Delete the review and remove its rating from the aggregates."""
+        using = using or router.db_for_write(type(self))
+        with transaction.atomic(using=using):
+            old = type(self).objects.using(using).filter(
+                pk=self.pk).select_for_update().values_list(
+                'product_id', 'rating').first()
+            result = super().delete(using, keep_parents)
+            if old is not None:
+                adjust_ratings(using, {old: -1})
+        return result
@@ -0,0 +1,15 @@
+"""
+Pagination classes for the review API.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class ReviewCursorPagination(CursorPagination):
+    """
+    Keyset pagination of a product's reviews, newest first, on the
+    (product, id) index.
+    """
+    ordering = '-id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
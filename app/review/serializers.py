@@ -0,0 +1,18 @@
+"""
+Serializers for the review API.
+"""
+from rest_framework import serializers
+
+from core.instrumentation import TimedSerializerMixin
+from review.models import Review
+
+
+class ReviewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for reviews."""
+
+    class Meta:
+        model = Review
+        fields = ['id', 'product', 'user', 'rating', 'title', 'body',
+                  'created_at', 'updated_at']
+        read_only_fields = ['id', 'product', 'user', 'created_at',
+                            'updated_at']
@@ -0,0 +1,177 @@
+"""
+Tests for reviews and the product rating aggregates.
+"""
+import threading
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from catalog.models import Category, Product
+from review.models import Review
+
+
+def create_user(number):
+    return get_user_model().objects.create_user(
+        username=f'user{number}', email=f'user{number}@example.com',
+        phone_number=f'+4812345{number:04d}', password='testpass123',
+        first_name='Jan', last_name='Kowalski')
+
+
+def ratings(product):
+    """Return the rating aggregates of a product from the database."""
+    product.refresh_from_db()
+    return {
+        'count': product.ratings_count,
+        'sum': product.ratings_sum,
+        'average': product.average_rating,
+        'histogram': product.rating_histogram,
+    }
+
+
+class RatingAggregateTests(TestCase):
+    """Test the rating aggregates follow the reviews."""
+
+    def setUp(self):
+        category = Category.objects.create(name='Audio')
+        self.speaker = Product.objects.create(
+            category=category, name='Speaker', price='25.00')
+        self.headphones = Product.objects.create(
+            category=category, name='Headphones', price='10.00')
+        self.users = [create_user(n) for n in range(3)]
+
+    def review(self, user, rating, product=None):
+        return Review.objects.create(product=product or self.speaker,
+                                     user=user, rating=rating)
+
+    def test_create(self):
+        """Test new reviews are counted in the histogram and average."""
+        self.review(self.users[0], 5)
+        self.review(self.users[1], 4)
+        self.review(self.users[2], 4)
+
+        self.assertEqual(ratings(self.speaker), {
+            'count': 3, 'sum': 13, 'average': Decimal('4.3'),
+            'histogram': [0, 0, 0, 2, 1],
+        })
+
+    def test_edit(self):
+        """Test changing a rating moves it in the histogram."""
+        review = self.review(self.users[0], 2)
+        self.review(self.users[1], 5)
+
+        review.rating = 4
+        review.save()
+        review.title = 'Better after an update'
+        review.save()
+
+        self.assertEqual(ratings(self.speaker), {
+            'count': 2, 'sum': 9, 'average': Decimal('4.5'),
+            'histogram': [0, 0, 0, 1, 1],
+        })
+
+    def test_edit_stale_instance(self):
+        """Test saving a stale copy moves the rating in the database."""
+        review = self.review(self.users[0], 2)
+        stale = Review.objects.get(pk=review.pk)
+        review.rating = 3
+        review.save()
+
+        stale.rating = 5
+        stale.save()
+
+        self.assertEqual(ratings(self.speaker)['histogram'],
+                         [0, 0, 0, 0, 1])
+
+    def test_move_to_other_product(self):
+        """Test moving a review updates both products."""
+        review = self.review(self.users[0], 3)
+
+        review.product = self.headphones
+        review.save()
+
+        self.assertEqual(ratings(self.speaker)['count'], 0)
+        self.assertEqual(ratings(self.headphones)['histogram'],
+                         [0, 0, 1, 0, 0])
+
+    def test_delete(self):
+        """Test deleted reviews are uncounted, once."""
+        review = self.review(self.users[0], 1)
+        self.review(self.users[1], 3)
+        stale = Review.objects.get(pk=review.pk)
+
+        review.delete()
+        stale.delete()
+
+        self.assertEqual(ratings(self.speaker), {
+            'count': 1, 'sum': 3, 'average': Decimal('3.0'),
+            'histogram': [0, 0, 1, 0, 0],
+        })
+        self.review(self.users[0], 2).delete()
+        self.assertEqual(ratings(self.speaker)['average'], Decimal('3.0'))
+
+    def test_deleted_user_keeps_ratings(self):
+        """Test reviews of deleted users stay counted."""
+        self.review(self.users[0], 4)
+
+        self.users[0].delete()
+
+        self.assertEqual(ratings(self.speaker)['count'], 1)
+        self.assertIsNone(Review.objects.get().user)
+
+    def test_rebuild(self):
+        """Test the command recomputes drifted aggregates only."""
+        self.review(self.users[0], 5)
+        self.review(self.users[1], 2, product=self.headphones)
+        Review.objects.filter(rating=5).update(rating=1)
+        Review.objects.filter(rating=2).delete()
+        out = StringIO()
+
+        call_command('rebuild_ratings', batch_size=1, stdout=out)
+
+        self.assertIn('2 products were out of date', out.getvalue())
+        self.assertEqual(ratings(self.speaker), {
+            'count': 1, 'sum': 1, 'average': Decimal('1.0'),
+            'histogram': [1, 0, 0, 0, 0],
+        })
+        self.assertEqual(ratings(self.headphones), {
+            'count': 0, 'sum': 0, 'average': Decimal('0.0'),
+            'histogram': [0, 0, 0, 0, 0],
+        })
+        self.assertEqual(Review.objects.rebuild_ratings(0, 10 ** 9), 0)
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Concurrent transactions need PostgreSQL.')
+class ConcurrentReviewTests(TransactionTestCase):
+    """Test reviews saved from many threads at once."""
+
+    def test_concurrent_reviews_counted(self):
+        """Test no concurrent review is lost from the aggregates."""
+        category = Category.objects.create(name='Audio')
+        product = Product.objects.create(
+            category=category, name='Speaker', price='25.00')
+        users = [create_user(n) for n in range(16)]
+
+        def review(user):
+            try:
+                created = Review.objects.create(
+                    product=product, user=user, rating=user.pk % 5 + 1)
+                created.rating = 5
+                created.save()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=review, args=(user,))
+                   for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(ratings(product)['histogram'], [0, 0, 0, 0, 16])
+        self.assertEqual(Review.objects.rebuild_ratings(0, 10 ** 9), 0)
@@ -0,0 +1,102 @@
+"""
+Tests for the review API.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.models import Category, Product
+from review.models import Review
+
+
+def reviews_url(product_id):
+    """Create and return a product reviews URL."""
+    return reverse('review:review-list', args=[product_id])
+
+
+def review_url(review_id):
+    """Create and return a review detail URL."""
+    return reverse('review:review-detail', args=[review_id])
+
+
+def create_user(number):
+    return get_user_model().objects.create_user(
+        username=f'user{number}', email=f'user{number}@example.com',
+        phone_number=f'+4812345678{number}', password='testpass123',
+        first_name='Jan', last_name='Kowalski')
+
+
+class ReviewAPITests(TestCase):
+    """Test reviewing products."""
+
+    def setUp(self):
+        self.user = create_user(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Audio')
+        self.product = Product.objects.create(
+            category=category, name='Speaker', price='25.00')
+
+    def test_create_review(self):
+        """Test reviews update the ratings in product responses."""
+        res = self.client.post(reviews_url(self.product.id),
+                               {'rating': 4, 'title': 'Loud'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['user'], self.user.id)
+        res = self.client.get(
+            reverse('catalog:product-detail', args=[self.product.id]))
+        self.assertEqual(res.data['ratings_count'], 1)
+        self.assertEqual(res.data['average_rating'], '4.0')
+        self.assertEqual(res.data['rating_histogram'], [0, 0, 0, 1, 0])
+
+    def test_invalid_reviews(self):
+        """Test ratings out of range and second reviews are rejected."""
+        url = reviews_url(self.product.id)
+        for rating in (0, 6):
+            res = self.client.post(url, {'rating': rating})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.post(url, {'rating': 3})
+        res = self.client.post(url, {'rating': 5})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(reviews_url(0), {'rating': 3})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.ratings_count, 1)
+
+    def test_list_reviews(self):
+        """Test anyone can list the reviews of a product, newest first."""
+        first = Review.objects.create(product=self.product, user=self.user,
+                                      rating=5)
+        second = Review.objects.create(product=self.product,
+                                       user=create_user(2), rating=2)
+
+        res = APIClient().get(reviews_url(self.product.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([review['id'] for review in res.data['results']],
+                         [second.id, first.id])
+
+    def test_edit_and_delete_own_review(self):
+        """Test users edit and delete their own reviews only."""
+        review = Review.objects.create(product=self.product, user=self.user,
+                                       rating=2)
+        other = APIClient()
+        other.force_authenticate(create_user(2))
+
+        res = other.patch(review_url(review.id), {'rating': 1})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        res = self.client.patch(review_url(review.id), {'rating': 5})
+        self.assertEqual(res.data['rating'], 5)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_histogram, [0, 0, 0, 0, 1])
+
+        res = self.client.delete(review_url(review.id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.ratings_count, 0)
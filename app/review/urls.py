@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = "review"
+
+urlpatterns = [
+    path('products/<int:product_pk>/reviews/',
+         views.ReviewListCreateAPIView.as_view(), name='review-list'),
+    path('reviews/<int:pk>/', views.ReviewDetailAPIView.as_view(),
+         name='review-detail'),
+]
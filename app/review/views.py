@@ -0,0 +1,46 @@
+"""
+Views for the review API.
+"""
+from django.db import IntegrityError
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, permissions
+from rest_framework.exceptions import ValidationError
+
+from catalog.models import Product
+
+from .models import Review
+from .pagination import ReviewCursorPagination
+from .serializers import ReviewSerializer
+
+
+class ReviewListCreateAPIView(generics.ListCreateAPIView):
+    """
+    List the reviews of a product, newest first, or review it. The
+    product's rating aggregates are updated with the review.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    serializer_class = ReviewSerializer
+    pagination_class = ReviewCursorPagination
+
+    def get_queryset(self):
+        return Review.objects.filter(product_id=self.kwargs['product_pk'])
+
+    def perform_create(self, serializer):
+        product = get_object_or_404(Product.objects.only('id'),
+                                    pk=self.kwargs['product_pk'])
+        try:
+            serializer.save(product=product, user=self.request.user)
+        except IntegrityError:
+            raise ValidationError(
+                {'product': ['You already reviewed this product.']})
+
+
+class ReviewDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+    """Retrieve a review, or edit or delete one of the current user."""
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    serializer_class = ReviewSerializer
+
+    def get_queryset(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            return Review.objects.all()
+        return Review.objects.filter(user=self.request.user)
@@ -0,0 +1,16 @@
+from django.urls import path
+
+from . import async_views
+
+app_name = "user-async"
+
+urlpatterns = [
+    path('register/', async_views.AsyncUserRegistrationView.as_view(),
+         name='register-user'),
+    path('current/', async_views.AsyncCurrentUserView.as_view(),
+         name='current-user'),
+    path('current/detail/', async_views.AsyncCurrentUserDetailView.as_view(),
+         name='current-user-detail'),
+    path('address/', async_views.AsyncAddressCreateView.as_view(),
+         name='create-address'),
+]
@@ -0,0 +1,170 @@
+"""
+Async views for the user and address API.
+
+They mirror the views in user.views for deployments behind an ASGI server:
+authentication, password hashing and database access are awaited, so a
+worker doesn't tie up a thread per in-flight request. DRF views are sync
+only, so these are plain Django views reusing the DRF serializers and the
+DRF error format. They are not included in the OpenAPI schema.
+"""
+import io
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views import View
+
+from rest_framework import exceptions, status
+
+from core.etags import conditional_response, make_etag, set_etag_headers
+from core.instrumentation import timing
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+from core.throttling import TokenBucketThrottle
+
+from .authentication import CachedJWTAuthentication
+from .models import Address
+from .serializers import (
+    UserRegistrationSerializer,
+    CurrentUserSerializer,
+    CurrentUserDetailSerializer,
+    AddressSerializer
+)
+
+
+class AsyncAPIView(View):
+    """Base async view handling JWT authentication and API errors."""
+
+    authentication_required = True
+    authenticator_class = CachedJWTAuthentication
+    throttle_classes = ()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Requests are authenticated by bearer token, not cookies.
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if self.authentication_required:
+                await self.authenticate(request)
+            if self.throttle_classes:
+                await sync_to_async(self.check_throttles)(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(request, exc)
+
+    async def authenticate(self, request):
+        with timing('auth'):
+            result = await self.authenticator_class().aauthenticate(request)
+        if result is None:
+            raise exceptions.NotAuthenticated()
+        request.user, request.auth = result
+
+    def check_throttles(self, request):
+        """Raise Throttled like DRF views if a throttle rejects request."""
+        durations = [
+            throttle.wait() for throttle in
+            (throttle_class() for throttle_class in self.throttle_classes)
+            if not throttle.allow_request(request, self)
+        ]
+        if durations:
+            raise exceptions.Throttled(max(durations))
+
+    def handle_exception(self, request, exc):
+        """Build the same response as DRF's default exception handler."""
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {'detail': exc.detail}
+        response = self.json_response(data, status=exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated,
+                            exceptions.AuthenticationFailed)):
+            response['WWW-Authenticate'] = \
+                self.authenticator_class().authenticate_header(request)
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = '%d' % exc.wait
+        return response
+
+    def json_response(self, data, status=status.HTTP_200_OK):
+        return HttpResponse(FastJSONRenderer().render(data), status=status,
+                            content_type='application/json')
+
+    def parse_body(self, request):
+        """Return the JSON or form encoded request data."""
+        if request.content_type == 'application/json':
+            return FastJSONParser().parse(io.BytesIO(request.body or b'{}'))
+        return request.POST.dict()
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        raise exceptions.MethodNotAllowed(request.method)
+
+
+class AsyncUserRegistrationView(AsyncAPIView):
+    """Async API view for user registration."""
+
+    authentication_required = False
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scope = 'registration'
+    throttle_account_field = 'email'
+
+    async def post(self, request, *args, **kwargs):
+        serializer = UserRegistrationSerializer(data=self.parse_body(request))
+        if getattr(settings, 'USER_REGISTRATION_UNIQUE_PRECHECK', False):
+            # The uniqueness validators query the database.
+            await sync_to_async(serializer.is_valid)(raise_exception=True)
+        else:
+            serializer.is_valid(raise_exception=True)
+        user = await serializer.acreate(serializer.validated_data)
+
+        return self.json_response(UserRegistrationSerializer(user).data,
+                                  status=status.HTTP_201_CREATED)
+
+
+class AsyncCurrentUserView(AsyncAPIView):
+    """Async API view for basic current user data"""
+
+    serializer_class = CurrentUserSerializer
+
+    async def get(self, request, *args, **kwargs):
+        user = request.user
+        etag = make_etag(type(self).__name__, user.pk, user.version)
+        response = conditional_response(request, etag)
+        if response is None:
+            response = self.json_response(
+                self.serializer_class(user).data)
+            set_etag_headers(response, etag)
+        return response
+
+
+class AsyncCurrentUserDetailView(AsyncCurrentUserView):
+    """Async API view for detail current user data"""
+
+    serializer_class = CurrentUserDetailSerializer
+
+
+class AsyncAddressCreateView(AsyncAPIView):
+    """
+    Async API view creating a new address for the current user, or
+    returning an existing one if the same address already exists.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        serializer = AddressSerializer(data=self.parse_body(request))
+        serializer.is_valid(raise_exception=True)
+
+        address, created = await Address.objects.aupsert(
+            user=request.user,
+            **serializer.validated_data
+        )
+
+        return self.json_response(
+            {
+                "created": created,
+                "address": AddressSerializer(address).data
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
@@ -0,0 +1,262 @@
+"""
+Authentication classes for the user API.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import DEFERRED
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+
+from core.db.routers import PRIMARY, pin_user
+from core.instrumentation import timing
+from user.revocation import ais_revoked, is_revoked
+
+
+CACHED_USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name',
+                      'phone_number', 'created_at', 'is_active', 'is_staff',
+                      'is_superuser', 'version')
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    # Changed whenever CACHED_USER_FIELDS changes.
+    'KEY_PREFIX': 'auth-user-v2',
+    'TIMEOUT': 300,
+    'LOCAL_TIMEOUT': 5,
+    'LOCAL_MAX_ENTRIES': 10000,
+}
+
+
+def get_cache_setting(name):
+    """Return a value from settings.USER_AUTH_CACHE or its default."""
+    return getattr(settings, 'USER_AUTH_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class LocalUserCache:
+    """
+    Small per-process LRU of user data with a short time to live.
+
+    Entries are not invalidated across processes, so LOCAL_TIMEOUT bounds
+    how long another worker can keep serving stale user data.
+    """
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires < time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return data
+
+    def set(self, user_id, data):
+        expires = time.monotonic() + get_cache_setting('LOCAL_TIMEOUT')
+        with self._lock:
+            self._data[user_id] = (expires, data)
+            self._data.move_to_end(user_id)
+            while len(self._data) > get_cache_setting('LOCAL_MAX_ENTRIES'):
+                self._data.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_user_cache = LocalUserCache()
+
+
+def get_shared_cache():
+    return caches[get_cache_setting('CACHE_ALIAS')]
+
+
+def user_cache_key(user_id):
+    return f"{get_cache_setting('KEY_PREFIX')}:{user_id}"
+
+
+def invalidate_user_cache(user_id):
+    """Drop cached authentication data for the given user id."""
+    # Tokens carry the id as a string, so key both caches by str(user_id).
+    user_id = str(user_id)
+    local_user_cache.delete(user_id)
+    get_shared_cache().delete(user_cache_key(user_id))
+
+
+def primary_users():
+    """
+    Return the user manager of the primary database. The caches are
+    filled from it, since a lagging replica would cache a user's state
+    from before their last change for the whole TIMEOUT.
+    """
+    return get_user_model().objects.db_manager(PRIMARY)
+
+
+def load_user_data(user_id):
+    """
+    Return a dict of CACHED_USER_FIELDS for the user, looking in the
+    per-process cache, then the shared cache and finally the database.
+    Returns None if the user does not exist.
+    """
+    user_id = str(user_id)
+    data = local_user_cache.get(user_id)
+    if data is not None:
+        return data
+
+    shared_cache = get_shared_cache()
+    key = user_cache_key(user_id)
+    data = shared_cache.get(key)
+    if data is None:
+        data = primary_users().filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).values(*CACHED_USER_FIELDS).first()
+        if data is None:
+            return None
+        shared_cache.set(key, data, get_cache_setting('TIMEOUT'))
+
+    local_user_cache.set(user_id, data)
+    return data
+
+
+async def aload_user_data(user_id):
+    """Async version of load_user_data()."""
+    user_id = str(user_id)
+    data = local_user_cache.get(user_id)
+    if data is not None:
+        return data
+
+    shared_cache = get_shared_cache()
+    key = user_cache_key(user_id)
+    data = await shared_cache.aget(key)
+    if data is None:
+        data = await primary_users().filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).values(*CACHED_USER_FIELDS).afirst()
+        if data is None:
+            return None
+        await shared_cache.aset(key, data, get_cache_setting('TIMEOUT'))
+
+    local_user_cache.set(user_id, data)
+    return data
+
+
+def build_user(data):
+    """
+    Build a user instance from cached data without querying the database.
+
+    Fields that are not cached (e.g. password) are deferred, so they are
+    loaded on first access and save() only writes the loaded fields.
+    """
+    model = get_user_model()
+    values = [data.get(field.attname, DEFERRED)
+              for field in model._meta.concrete_fields]
+    return model.from_db(DEFAULT_DB_ALIAS, list(data), values)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication which resolves the token's user from a per-process
+    and shared cache instead of running a SELECT on every request. Revoked
+    tokens are rejected by their jti, see user.revocation.
+
+    The cache is invalidated when a CustomUser is saved or deleted.
+    Queryset.update() bypasses those signals, so call
+    invalidate_user_cache() after bulk updates.
+    """
+
+    def authenticate(self, request):
+        with timing('auth'):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if is_revoked(self.get_jti(validated_token)):
+            raise InvalidToken(_("Token is revoked"))
+
+        # Users who just wrote read from the primary, see core.db.routers.
+        pin_user(self.get_user_id(validated_token))
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares the password hash, which is never cached.
+            return super().get_user(validated_token)
+
+        data = load_user_data(self.get_user_id(validated_token))
+        return self.user_from_data(data)
+
+    async def aauthenticate(self, request):
+        """
+        Async version of authenticate() for async views, which only awaits
+        the cache and database when the user isn't cached in-process.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        if await ais_revoked(self.get_jti(validated_token)):
+            raise InvalidToken(_("Token is revoked"))
+
+        # Users who just wrote read from the primary, see core.db.routers.
+        pin_user(self.get_user_id(validated_token))
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return await sync_to_async(super().get_user)(validated_token)
+
+        data = await aload_user_data(self.get_user_id(validated_token))
+        return self.user_from_data(data)
+
+    def get_jti(self, validated_token):
+        try:
+            return validated_token[api_settings.JTI_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token has no id")) from e
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+    def user_from_data(self, data):
+        if data is None:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not data['is_active']:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+
+        return build_user(data)
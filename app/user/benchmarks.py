@@ -0,0 +1,168 @@
+"""
+Benchmark scenarios for the user API, run by the benchmark_api command.
+"""
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.benchmarks import Scenario, register, register_seeder
+from user.models import Address
+
+
+USERS = 100_000
+ADDRESSES_PER_USER = 20
+BATCH_SIZE = 5000
+PASSWORD = 'benchmark-password'
+CITIES = ['Warsaw', 'Kraków', 'Łódź', 'Wrocław', 'Poznań', 'Gdańsk']
+
+
+def seeded_email(number):
+    return f'bench{number}@example.com'
+
+
+def unique_suffix():
+    return uuid.uuid4().int % 10 ** 12
+
+
+@register_seeder
+def seed_users(scale, stdout):
+    """Seed USERS users with ADDRESSES_PER_USER addresses each."""
+    User = get_user_model()
+    total = max(2, int(USERS * scale))
+    existing = User.objects.filter(email__startswith='bench').count()
+    if existing >= total:
+        return
+    # Hashing is the slow part of creating users, hash once for all.
+    password = make_password(PASSWORD)
+    addresses_per_user = max(1, int(ADDRESSES_PER_USER * min(scale, 1)))
+    for start in range(existing, total, BATCH_SIZE):
+        numbers = range(start, min(start + BATCH_SIZE, total))
+        users = User.objects.bulk_create([
+            User(
+                email=seeded_email(number),
+                username=f'bench{number}',
+                phone_number=f'+48{number:09d}',
+                first_name='Bench',
+                last_name=f'User{number}',
+                password=password,
+            )
+            for number in numbers
+        ])
+        addresses = [
+            Address(
+                user=user,
+                street=f'{index + 1} Benchmark Street',
+                city=CITIES[index % len(CITIES)],
+                zip_code=f'{index % 100:02d}-{index:03d}',
+                country='Poland',
+            )
+            for user in users
+            for index in range(addresses_per_user)
+        ]
+        for address in addresses:
+            address.fingerprint = address.compute_fingerprint()
+        Address.objects.bulk_create(addresses, batch_size=BATCH_SIZE)
+        stdout.write(f'Seeded {numbers.stop} of {total} users')
+
+
+def authenticate(client, user):
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+
+@register
+class RegisterUserScenario(Scenario):
+    """Register a new user, a single INSERT after hashing."""
+
+    name = 'register-user'
+    query_budget = 1
+    requests = 20
+    warmup = 2
+    expected_status = status.HTTP_201_CREATED
+
+    def request(self, client, iteration):
+        suffix = unique_suffix()
+        return client.post(reverse('user:register-user'), {
+            'username': f'register{suffix}',
+            'email': f'register{suffix}@example.com',
+            'first_name': 'Jan',
+            'last_name': 'Kowalski',
+            'phone_number': f'{suffix:012d}',
+            'password': PASSWORD,
+            'password2': PASSWORD,
+        })
+
+
+@register
+class ObtainTokenScenario(Scenario):
+    """Log in with email and password."""
+
+    name = 'token_obtain_pair'
+    query_budget = 1
+    requests = 20
+    warmup = 2
+
+    def request(self, client, iteration):
+        return client.post(reverse('user:token_obtain_pair'), {
+            'email': seeded_email(1),
+            'password': PASSWORD,
+        })
+
+
+@register
+class CurrentUserScenario(Scenario):
+    """Read the current user, served from the token user cache."""
+
+    name = 'current-user'
+    query_budget = 0
+
+    def setup(self, client):
+        authenticate(client, get_user_model().objects.get(
+            email=seeded_email(0)))
+
+    def request(self, client, iteration):
+        return client.get(reverse('user:current-user'))
+
+
+@register
+class CreateAddressScenario(Scenario):
+    """Create a new address with the single statement upsert."""
+
+    name = 'create-address'
+    query_budget = 1
+    # Without INSERT ... RETURNING xmax, an INSERT and a SELECT are used.
+    vendor_query_budgets = {'sqlite': 2}
+    expected_status = status.HTTP_201_CREATED
+
+    def setup(self, client):
+        self.run_id = unique_suffix()
+        authenticate(client, get_user_model().objects.get(
+            email=seeded_email(0)))
+
+    def request(self, client, iteration):
+        return client.post(reverse('user:create-address'), {
+            'street': f'{iteration} Run {self.run_id} Street',
+            'city': 'Warsaw',
+            'zip_code': '00-001',
+            'country': 'Poland',
+        })
+
+
+@register
+class AddressListScenario(Scenario):
+    """Read the first page of the address book."""
+
+    name = 'address-list'
+    query_budget = 1
+
+    def setup(self, client):
+        authenticate(client, get_user_model().objects.get(
+            email=seeded_email(0)))
+
+    def request(self, client, iteration):
+        return client.get(reverse('user:address-list'))
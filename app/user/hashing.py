@@ -0,0 +1,198 @@
+"""
+Password hashing off the request thread.
+
+Hashes are computed in a bounded thread or process pool so a burst of
+logins or signups can't use more CPU than the pool allows. Once
+MAX_PENDING operations are running or queued, new callers wait up to
+QUEUE_TIMEOUT seconds for a slot and are then rejected with a 503.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core.instrumentation import timing
+
+
+DEFAULTS = {
+    'BACKEND': 'thread',
+    'MAX_WORKERS': None,
+    'MAX_PENDING': 64,
+    'QUEUE_TIMEOUT': 1.0,
+    'RETRY_AFTER': 1,
+}
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = ('Too many password operations in progress, '
+                      'try again later.')
+    default_code = 'password_hashing_busy'
+
+    def __init__(self, wait=None):
+        super().__init__()
+        # Picked up by DRF's exception handler as the Retry-After header.
+        self.wait = wait
+
+
+class PasswordHashingExecutor:
+    """Bounded pool that runs password hashing functions."""
+
+    def __init__(self, backend='thread', max_workers=None, max_pending=64,
+                 queue_timeout=1.0, retry_after=1):
+        if backend == 'thread':
+            self.pool = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix='hashing')
+        elif backend == 'process':
+            # Spawned workers don't inherit the parent's open database
+            # connections, which forked ones would close on exit.
+            self.pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        else:
+            raise ValueError(f"Unknown password hashing backend: {backend}")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+    def submit(self, fn, *args):
+        """
+        Schedule fn(*args) and return its future, or raise
+        PasswordHashingBusy if no slot frees up in time.
+        """
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHashingBusy(wait=self.retry_after)
+        return self._submit(fn, *args)
+
+    async def asubmit(self, fn, *args):
+        """
+        Like submit(), but waits for a slot without blocking the event loop
+        and returns an asyncio future.
+        """
+        if not self.slots.acquire(blocking=False):
+            acquiring = asyncio.ensure_future(asyncio.to_thread(
+                self.slots.acquire, timeout=self.queue_timeout))
+            try:
+                # Shielded, so a cancelled caller can't lose a slot the
+                # thread acquires afterwards.
+                acquired = await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                acquiring.add_done_callback(self._release_acquired)
+                raise
+            if not acquired:
+                raise PasswordHashingBusy(wait=self.retry_after)
+        return asyncio.wrap_future(self._submit(fn, *args))
+
+    def _release_acquired(self, acquiring):
+        if not acquiring.cancelled() and acquiring.result():
+            self.slots.release()
+
+    def _submit(self, fn, *args):
+        try:
+            future = self.pool.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda future: self.slots.release())
+        return future
+
+    def run(self, fn, *args):
+        """Run fn(*args) in the pool and wait for the result."""
+        with timing('hashing'):
+            return self.submit(fn, *args).result()
+
+    async def arun(self, fn, *args):
+        """Run fn(*args) in the pool and await the result."""
+        with timing('hashing'):
+            return await (await self.asubmit(fn, *args))
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                options = {
+                    **DEFAULTS,
+                    **getattr(settings, 'PASSWORD_HASHING_EXECUTOR', {}),
+                }
+                _executor = PasswordHashingExecutor(
+                    backend=options['BACKEND'],
+                    max_workers=options['MAX_WORKERS'],
+                    max_pending=options['MAX_PENDING'],
+                    queue_timeout=options['QUEUE_TIMEOUT'],
+                    retry_after=options['RETRY_AFTER'],
+                )
+    return _executor
+
+
+@receiver(setting_changed)
+def reset_executor(setting, **kwargs):
+    global _executor
+    if setting == 'PASSWORD_HASHING_EXECUTOR' and _executor is not None:
+        with _executor_lock:
+            _executor.shutdown()
+            _executor = None
+
+
+def needs_rehash(encoded):
+    """
+    Return True if the hash wasn't made by the preferred hasher with its
+    current parameters, mirroring django.contrib.auth.hashers.
+    """
+    preferred = hashers.get_hasher('default')
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    return (hasher.algorithm != preferred.algorithm
+            or preferred.must_update(encoded))
+
+
+def make_password(raw_password):
+    """Hash the password in the executor."""
+    if raw_password is None:
+        # Unusable passwords don't need any hashing work.
+        return hashers.make_password(None)
+    return get_executor().run(hashers.make_password, raw_password)
+
+
+async def amake_password(raw_password):
+    """Hash the password in the executor without blocking the event loop."""
+    if raw_password is None:
+        return hashers.make_password(None)
+    return await get_executor().arun(hashers.make_password, raw_password)
+
+
+def check_password(raw_password, encoded, setter=None):
+    """
+    Check the password in the executor. If it is valid but was hashed with
+    an outdated hasher or parameters, setter(raw_password) is called in
+    the current thread so it can save the new hash.
+    """
+    if raw_password is None or not hashers.is_password_usable(encoded):
+        return False
+    is_correct = get_executor().run(
+        hashers.check_password, raw_password, encoded)
+    if is_correct and setter is not None and needs_rehash(encoded):
+        setter(raw_password)
+    return is_correct
@@ -0,0 +1,147 @@
+"""
+Django command to compare the sync and async user API under ASGI.
+"""
+import asyncio
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.authentication import invalidate_user_cache
+
+
+ENDPOINTS = [
+    ('sync', 'user:current-user'),
+    ('async', 'user-async:current-user'),
+]
+
+
+async def asgi_get(application, path, headers, client_delay):
+    """
+    Send a GET request to the ASGI application in-process and return the
+    response status. client_delay simulates a slow client sending its
+    request.
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': headers,
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    response = {}
+
+    async def receive():
+        if client_delay:
+            await asyncio.sleep(client_delay)
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+
+    await application(scope, receive, send)
+    return response['status']
+
+
+class Command(BaseCommand):
+    """Django command to benchmark sync and async views under ASGI."""
+
+    help = ('Compare throughput and latency of the sync and async '
+            'current-user endpoints served in-process through ASGI.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Number of requests sent to each endpoint.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=100,
+            help='Number of requests in flight at the same time.',
+        )
+        parser.add_argument(
+            '--client-delay', type=float, default=0,
+            help='Seconds each simulated client takes to send its request.',
+        )
+        parser.add_argument(
+            '--cold-cache', action='store_true',
+            help='Drop the cached token user before every request, so '
+                 'each request loads the user from the database.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        suffix = uuid.uuid4().hex[:12]
+        user = get_user_model().objects.create_user(
+            email=f'benchmark-{suffix}@example.com',
+            username=f'benchmark-{suffix}',
+            phone_number=str(uuid.uuid4().int)[:15],
+            first_name='Benchmark',
+            last_name='User',
+        )
+        try:
+            token = AccessToken.for_user(user)
+            headers = [
+                (b'host', b'localhost'),
+                (b'authorization', f'Bearer {token}'.encode()),
+            ]
+            for label, url_name in ENDPOINTS:
+                cache.clear()
+                path = reverse(url_name)
+                results = asyncio.run(self.run_endpoint(
+                    path, headers, user.pk, options))
+                self.report(label, path, *results)
+        finally:
+            user.delete()
+
+    async def run_endpoint(self, path, headers, user_id, options):
+        """
+        Send the requests with bounded concurrency and time each one.
+
+        Non-200 responses are counted as errors, e.g. when concurrent
+        requests open more database connections than the server allows.
+        """
+        application = get_asgi_application()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        latencies = []
+        errors = []
+
+        async def one_request():
+            async with semaphore:
+                if options['cold_cache']:
+                    invalidate_user_cache(user_id)
+                start = time.perf_counter()
+                status = await asgi_get(application, path, headers,
+                                        options['client_delay'])
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors.append(status)
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(one_request() for _ in range(options['requests'])))
+        return latencies, errors, time.perf_counter() - start
+
+    def report(self, label, path, latencies, errors, elapsed):
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'{label:<5} {path}: {len(latencies) / elapsed:.1f} req/s, '
+            f'p50 {percentiles[49] * 1000:.1f} ms, '
+            f'p95 {percentiles[94] * 1000:.1f} ms, '
+            f'p99 {percentiles[98] * 1000:.1f} ms, '
+            f'{len(errors)} errors'
+        )
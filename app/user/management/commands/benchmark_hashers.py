@@ -0,0 +1,72 @@
+"""
+Django command to benchmark password hashers on the current host.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Django command to report hashes per second for each hasher."""
+
+    help = 'Report hashes per second for the configured password hashers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hasher', action='append', dest='algorithms',
+            help='Algorithm to benchmark, e.g. argon2. Can be repeated. '
+                 'Defaults to every hasher in PASSWORD_HASHERS.',
+        )
+        parser.add_argument(
+            '--rounds', type=int, default=20,
+            help='Number of hashes to compute per hasher.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of hashes computed in parallel.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        selected = hashers.get_hashers()
+        if options['algorithms']:
+            by_algorithm = hashers.get_hashers_by_algorithm()
+            unknown = set(options['algorithms']) - set(by_algorithm)
+            if unknown:
+                raise CommandError(
+                    f"Unknown hasher(s): {', '.join(sorted(unknown))}")
+            selected = [by_algorithm[name] for name in options['algorithms']]
+
+        for hasher in selected:
+            self.benchmark(hasher, options['rounds'], options['concurrency'])
+
+    def benchmark(self, hasher, rounds, concurrency):
+        """Hash a password `rounds` times and report the throughput."""
+        try:
+            encoded = hasher.encode('benchmark-password', hasher.salt())
+        except ValueError as error:
+            self.stdout.write(self.style.WARNING(
+                f'{hasher.algorithm}: skipped ({error})'))
+            return
+
+        def encode(_):
+            start = time.perf_counter()
+            hasher.encode('benchmark-password', hasher.salt())
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            durations = list(pool.map(encode, range(rounds)))
+        elapsed = time.perf_counter() - start
+
+        parameters = ', '.join(
+            f'{key}={value}'
+            for key, value in hasher.safe_summary(encoded).items()
+            if key not in ('algorithm', 'salt', 'hash')
+        )
+        self.stdout.write(
+            f'{hasher.algorithm}: {rounds / elapsed:.1f} hashes/sec, '
+            f'{sum(durations) / rounds * 1000:.1f} ms/hash ({parameters})'
+        )
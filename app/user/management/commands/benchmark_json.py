@@ -0,0 +1,110 @@
+"""
+Django command to benchmark the JSON renderer and parser.
+"""
+import io
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import parsers, renderers
+from user.models import Address
+from user.serializers import AddressSerializer, CurrentUserDetailSerializer
+
+
+def build_users(count):
+    created_at = timezone.now()
+    return [
+        get_user_model()(
+            id=n,
+            username=f'user{n}',
+            email=f'user{n}@example.com',
+            first_name='Zoë',
+            last_name=f'User {n}',
+            phone_number=f'+1555{n:07d}',
+            created_at=created_at - timedelta(seconds=n),
+        )
+        for n in range(1, count + 1)
+    ]
+
+
+def build_payloads():
+    """Return (name, data) for responses the API sends."""
+    user = build_users(1)[0]
+    addresses = [
+        Address(id=n, user=user, street=f'{n} Main Street', city='Zürich',
+                zip_code=f'{8000 + n}', country='Switzerland')
+        for n in range(200, 150, -1)
+    ]
+    next_url = 'http://localhost/api/user/addresses/?cursor=cD0xNTA%3D'
+    users = build_users(1000)
+    return [
+        ('current user', CurrentUserDetailSerializer(user).data),
+        ('address page', {
+            'next': next_url,
+            'previous': None,
+            'results': AddressSerializer(addresses, many=True).data,
+        }),
+        ('1000 user rows', [
+            {'id': user.pk, 'username': user.username, 'email': user.email,
+             'created_at': user.created_at, 'is_active': user.is_active}
+            for user in users
+        ]),
+    ]
+
+
+class Command(BaseCommand):
+    """Django command to compare the JSON renderers and parsers."""
+
+    help = ('Compare encoding and decoding API payloads with '
+            'FastJSONRenderer and FastJSONParser against DRF\'s JSON '
+            'renderer and parser.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rounds', type=int, default=1000,
+            help='Number of times each payload is encoded and decoded.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if renderers.orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson is not installed, the fast classes fall back to '
+                'the json module.'))
+        rounds = options['rounds']
+        for name, data in build_payloads():
+            rendered = JSONRenderer().render(data)
+            fast_rendered = renderers.FastJSONRenderer().render(data)
+            if fast_rendered != rendered:
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: rendered output differs'))
+
+            self.report(f'{name}, render', rounds,
+                        lambda: JSONRenderer().render(data),
+                        lambda: renderers.FastJSONRenderer().render(data))
+            self.report(
+                f'{name}, parse', rounds,
+                lambda: JSONParser().parse(io.BytesIO(rendered)),
+                lambda: parsers.FastJSONParser().parse(io.BytesIO(rendered)),
+            )
+
+    def report(self, name, rounds, baseline, fast):
+        baseline_us = self.time(baseline, rounds)
+        fast_us = self.time(fast, rounds)
+        self.stdout.write(
+            f'{name}: {baseline_us:.1f} us with json, {fast_us:.1f} us '
+            f'fast ({baseline_us / fast_us:.1f}x)'
+        )
+
+    def time(self, func, rounds):
+        """Return the mean duration of func in microseconds."""
+        func()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func()
+        return (time.perf_counter() - start) / rounds * 1e6
@@ -0,0 +1,112 @@
+"""
+Django command to benchmark the compiled read-only serializers.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.readonly import compile_serializer
+from core.renderers import FastJSONRenderer
+from user.models import Address
+from user.serializers import (
+    AddressSerializer,
+    CurrentUserDetailSerializer,
+    CurrentUserSerializer,
+)
+
+
+class Rollback(Exception):
+    """Raised to roll back the benchmark rows."""
+
+
+class Command(BaseCommand):
+    """Django command to compare serializers with their compiled form."""
+
+    help = ('Serialize and render lists of users and addresses with the '
+            'model serializers and their compiled form. Rows are created in '
+            'a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=10_000,
+            help='Number of users and of addresses in each list.',
+        )
+        parser.add_argument(
+            '--rounds', type=int, default=5,
+            help='Number of times each list is fetched and rendered.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        try:
+            with transaction.atomic():
+                self.benchmark(options['rows'], options['rounds'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def benchmark(self, rows, rounds):
+        users, addresses = self.create_rows(rows)
+        for serializer_class, queryset in [
+            (CurrentUserSerializer, users),
+            (CurrentUserDetailSerializer, users),
+            (AddressSerializer, addresses),
+        ]:
+            compiled = compile_serializer(serializer_class)
+            variants = [
+                ('serializer', lambda: serializer_class(
+                    queryset.all(), many=True).data),
+                ('compiled .values()', lambda: compiled.many(
+                    compiled.values(queryset))),
+                ('compiled .only()', lambda: compiled.many(
+                    compiled.only(queryset))),
+            ]
+            expected = None
+            for name, serialize in variants:
+                content = FastJSONRenderer().render(serialize())
+                if expected is None:
+                    expected = content
+                elif content != expected:
+                    raise CommandError(
+                        f'{serializer_class.__name__}, {name}: output '
+                        f'differs from the serializer')
+
+                durations = []
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    FastJSONRenderer().render(serialize())
+                    durations.append(time.perf_counter() - start)
+                self.stdout.write(
+                    f'{serializer_class.__name__}, {name}: '
+                    f'{min(durations) * 1000:.1f} ms for {rows} rows')
+
+    def create_rows(self, rows):
+        """Return querysets of rows new users and rows addresses."""
+        User = get_user_model()
+        users = User.objects.bulk_create([
+            User(
+                email=f'serializer-bench{number}@example.com',
+                username=f'serializer-bench{number}',
+                phone_number=f'+49{number:09d}',
+                first_name='Bench',
+                last_name=f'User{number}',
+                password='!',
+            )
+            for number in range(rows)
+        ], batch_size=5000)
+        addresses = [
+            Address(user=users[0], street=f'{number} Benchmark Street',
+                    city='Berlin', zip_code=f'{number % 100000:05d}',
+                    country='Germany')
+            for number in range(rows)
+        ]
+        for address in addresses:
+            address.fingerprint = address.compute_fingerprint()
+        Address.objects.bulk_create(addresses, batch_size=5000)
+        return (
+            User.objects.filter(email__startswith='serializer-bench')
+            .order_by('id'),
+            Address.objects.filter(user=users[0]).order_by('id'),
+        )
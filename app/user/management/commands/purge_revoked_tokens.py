@@ -0,0 +1,39 @@
+"""
+Django command to delete expired revoked tokens.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from user.models import RevokedToken
+
+
+class Command(BaseCommand):
+    """Django command to delete expired revoked tokens."""
+
+    help = ('Delete revoked tokens which expired, and are rejected anyway, '
+            'in batches, so the table only keeps live revocations.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Tokens deleted per statement.',
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            help='Keep purging, waiting this many seconds whenever no '
+                 'tokens expired.',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            count = RevokedToken.objects.purge_expired(options['batch_size'])
+            total += count
+            if count:
+                continue
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {total} expired revoked tokens.'))
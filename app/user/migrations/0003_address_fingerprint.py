@@ -0,0 +1,59 @@
+# Generated by Django 4.2.23 on 2026-10-18 09:12
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def compute_fingerprint(address):
+    parts = [
+        ' '.join(value.split()).casefold()
+        for value in (address.street, address.city, address.zip_code,
+                      address.country)
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+def fill_fingerprints(apps, schema_editor):
+    """
+    Fingerprint existing addresses. Addresses of a user which normalize to
+    the same fingerprint would break the unique constraint, and aren't
+    deleted here: the migration stops and lists them instead.
+    """
+    Address = apps.get_model('user', 'Address')
+    seen = {}
+    duplicates = []
+    for address in Address.objects.order_by('id').iterator():
+        address.fingerprint = compute_fingerprint(address)
+        key = (address.user_id, address.fingerprint)
+        if key in seen:
+            duplicates.append(f'{address.id} (same as {seen[key]})')
+            continue
+        seen[key] = address.id
+        address.save(update_fields=['fingerprint'])
+    if duplicates:
+        raise RuntimeError(
+            'These addresses duplicate an earlier address of their user '
+            'once case and whitespace are normalized. Delete or edit '
+            'them, then migrate again: ' + ', '.join(duplicates))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_address'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='address',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_fingerprints, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='address',
+            constraint=models.UniqueConstraint(fields=('user', 'fingerprint'), name='unique_user_address_fingerprint'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_address_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='address',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='addresses', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['user', 'id'], name='address_user_id_idx'),
+        ),
+    ]
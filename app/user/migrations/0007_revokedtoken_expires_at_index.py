@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0006_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='revokedtoken',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
@@ -1,18 +1,26 @@
-from django.db import models
+import hashlib
+import secrets
+
+from asgiref.sync import sync_to_async
+
+from django.db import connections, models, router, transaction
 from django.conf import settings
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
+from django.utils import timezone
+
+from user import hashing
 
 
 class CustomUserManager(BaseUserManager):
     """Manager for users."""
 
-    def create_user(self, email, username, phone_number, first_name, last_name,
-                    password=None, **extra_fields):
-        """Create, save and return a new user"""
+    def build_user(self, email, username, phone_number, first_name,
+                   last_name, **extra_fields):
+        """Validate and return a new unsaved user without a password"""
         if not email:
             raise ValueError("User must have an email address.")
         if not username:
@@ -24,7 +32,19 @@ class CustomUserManager(BaseUserManager):
         if not last_name:
             raise ValueError("User must have a last name")
         email = self.normalize_email(email)
-        user = self.model(
+        return self.model(
+            email=email,
+            username=username,
+            phone_number=phone_number,
+            first_name=first_name,
+            last_name=last_name,
+            **extra_fields
+        )
+
+    def create_user(self, email, username, phone_number, first_name, last_name,
+                    password=None, **extra_fields):
+        """Create, save and return a new user"""
+        user = self.build_user(
             email=email,
             username=username,
             phone_number=phone_number,
@@ -56,6 +76,11 @@ class CustomUserManager(BaseUserManager):
         return user
 
 
+def new_version():
+    """Return a random version marker for a saved user."""
+    return secrets.randbits(63)
+
+
 class CustomUser(AbstractBaseUser, PermissionsMixin):
     """User in the system."""
     username = models.CharField(max_length=150, unique=True, null=False,
@@ -69,6 +94,10 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Changed on every save, for ETags of the user's representations. A
+    # random value, unlike a counter, can't be given to two concurrent
+    # saves. QuerySet.update() must set it too.
+    version = models.BigIntegerField(default=new_version, editable=False)
 
     objects = CustomUserManager()
 
@@ -78,16 +107,213 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version = new_version()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version'}
+        super().save(*args, **kwargs)
+
+    def set_password(self, raw_password):
+        """Hash the password in the password hashing executor."""
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """
+        Check the password in the password hashing executor, rehashing it
+        with the preferred hasher if needed.
+        """
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # Password hash upgrades shouldn't be considered password
+            # changes.
+            self._password = None
+            self.save(update_fields=['password'])
+
+        return hashing.check_password(raw_password, self.password, setter)
+
+
+class AddressManager(models.Manager):
+    """Manager for addresses."""
+
+    upsert_columns = ['user_id', 'street', 'city', 'zip_code', 'country',
+                      'fingerprint']
+
+    def upsert(self, user, **fields):
+        """
+        Return (address, created) for the user's address matching fields
+        after normalization, inserting it if it doesn't exist yet.
+        """
+        return self.bulk_upsert(user, [fields])[0]
+
+    async def aupsert(self, user, **fields):
+        """Async version of upsert()."""
+        return await sync_to_async(self.upsert)(user, **fields)
+
+    def bulk_upsert(self, user, addresses):
+        """
+        Return a list of (address, created) for each dict of address fields,
+        inserting the addresses the user doesn't have yet.
+
+        On PostgreSQL this is a single INSERT ... ON CONFLICT statement on
+        the (user, fingerprint) unique index, so concurrent calls can't
+        create duplicates.
+        """
+        addresses = [self.model(user=user, **fields) for fields in addresses]
+        # A statement can't insert or update the same row twice, so repeated
+        # addresses are only sent once.
+        unique = {}
+        for address in addresses:
+            address.fingerprint = address.compute_fingerprint()
+            unique.setdefault(address.fingerprint, address)
+        if not unique:
+            return []
+
+        using = self._db or router.db_for_write(self.model)
+        if connections[using].vendor == 'postgresql':
+            results = self._upsert_returning(using, unique.values())
+        else:
+            results = self._insert_or_get(using, user, unique.values())
+
+        return [results[address.fingerprint] for address in addresses]
+
+    def _upsert_sql(self, count, conflict_action, extra_returning=''):
+        table = self.model._meta.db_table
+        columns = ', '.join(self.upsert_columns)
+        row = f"({', '.join(['%s'] * len(self.upsert_columns))})"
+        return (
+            f"INSERT INTO {table} ({columns}) "
+            f"VALUES {', '.join([row] * count)} "
+            f"ON CONFLICT (user_id, fingerprint) {conflict_action} "
+            f"RETURNING id, {columns}{extra_returning}"
+        )
+
+    def _upsert_params(self, addresses):
+        return [getattr(address, column)
+                for address in addresses
+                for column in self.upsert_columns]
+
+    def _from_row(self, using, row):
+        return self.model.from_db(using, ['id'] + self.upsert_columns, row)
+
+    def _upsert_returning(self, using, addresses):
+        # The no-op update makes RETURNING yield existing rows too, and
+        # xmax is 0 only for rows inserted by this statement.
+        addresses = list(addresses)
+        sql = self._upsert_sql(
+            len(addresses),
+            'DO UPDATE SET fingerprint = EXCLUDED.fingerprint',
+            ', (xmax = 0)',
+        )
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, self._upsert_params(addresses))
+            rows = cursor.fetchall()
+        results = {}
+        for *row, created in rows:
+            address = self._from_row(using, row)
+            results[address.fingerprint] = (address, created)
+        return results
+
+    def _insert_or_get(self, using, user, addresses):
+        addresses = list(addresses)
+        sql = self._upsert_sql(len(addresses), 'DO NOTHING')
+        with transaction.atomic(using=using):
+            with connections[using].cursor() as cursor:
+                cursor.execute(sql, self._upsert_params(addresses))
+                rows = cursor.fetchall()
+            results = {}
+            for row in rows:
+                address = self._from_row(using, row)
+                results[address.fingerprint] = (address, True)
+            missing = [address.fingerprint for address in addresses
+                       if address.fingerprint not in results]
+            if missing:
+                for address in self.using(using).filter(
+                        user=user, fingerprint__in=missing):
+                    results[address.fingerprint] = (address, False)
+        return results
+
 
 class Address(models.Model):
     """Address for users and orders"""
+    # Lookups by user are served by the composite indexes below.
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE,
-                             related_name='addresses')
+                             related_name='addresses',
+                             db_index=False)
     street = models.CharField(max_length=255)
     city = models.CharField(max_length=100)
     zip_code = models.CharField(max_length=20)
     country = models.CharField(max_length=100)
+    fingerprint = models.CharField(max_length=64, editable=False,
+                                   blank=True)
+
+    objects = AddressManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'fingerprint'],
+                name='unique_user_address_fingerprint',
+            ),
+        ]
+        indexes = [
+            # Keyset pagination of a user's address book.
+            models.Index(fields=['user', 'id'], name='address_user_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.city}, {self.street}, {self.zip_code}"
+
+    def compute_fingerprint(self):
+        """
+        Return a hash of the address fields ignoring case and whitespace
+        differences, used to detect duplicate addresses.
+        """
+        parts = [
+            ' '.join(value.split()).casefold()
+            for value in (self.street, self.city, self.zip_code,
+                          self.country)
+        ]
+        return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.fingerprint = self.compute_fingerprint()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'fingerprint'}
+        super().save(*args, **kwargs)
+
+
+class RevokedTokenManager(models.Manager):
+    """Manager for revoked tokens."""
+
+    def purge_expired(self, batch_size):
+        """
+        Delete up to batch_size revoked tokens which expired, and so are
+        rejected anyway, and return how many were deleted.
+        """
+        using = self._db or router.db_for_write(self.model)
+        expired = self.using(using).filter(
+            expires_at__lte=timezone.now()).values('pk')[:batch_size]
+        return self.using(using).filter(pk__in=expired).delete()[0]
+
+
+class RevokedToken(models.Model):
+    """
+    A revoked JWT, by its jti claim. This is the authoritative list that
+    user.revocation loads into each process.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    # 64-bit hash of the jti, the form kept in memory.
+    fingerprint = models.BigIntegerField()
+    # Indexed for syncs, which skip expired tokens, and purges.
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = RevokedTokenManager()
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,17 @@
+"""
+Pagination classes for the user API.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class AddressCursorPagination(CursorPagination):
+    """
+    Keyset pagination of an address book, newest first.
+
+    Pages are fetched with `id < cursor` on the (user, id) index, so deep
+    pages cost the same as the first one.
+    """
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,198 @@
+"""
+Revocation of JWTs without a query per request.
+
+Revoked tokens are stored in the RevokedToken table. Each process keeps
+a sorted array of their 64-bit fingerprints, 8 bytes per token, so a
+check is a binary search in memory. At most every SYNC_INTERVAL seconds
+a check reads a version from the shared cache. That version changes on
+every revocation, and when it does, the tokens revoked since the last
+sync are loaded. Every FULL_SYNC_INTERVAL seconds the array is reloaded,
+which drops expired tokens. Tokens revoked by a process are rejected by
+that process at once, and by others within SYNC_INTERVAL.
+
+Tokens revoked between full syncs are inserted into a second, small
+sorted array, also searched by checks, so a revocation costs a move of
+that array rather than a sort of all the fingerprints. The full sync
+merges them into the large one.
+
+Two jtis share a fingerprint with a probability of about n / 2**64 for
+n revoked tokens, which is negligible even for millions of tokens.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from rest_framework_simplejwt.settings import api_settings
+
+from user.models import RevokedToken
+
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'VERSION_KEY': 'revoked-tokens-version',
+    'SYNC_INTERVAL': 1,
+    'FULL_SYNC_INTERVAL': 900,
+    # Tokens revoked up to this many seconds before the last sync are
+    # loaded again, in case their transaction committed late.
+    'SYNC_OVERLAP': 60,
+}
+
+
+def get_revocation_setting(name):
+    """Return a value from settings.TOKEN_REVOCATION or its default."""
+    return getattr(settings, 'TOKEN_REVOCATION', {}).get(
+        name, DEFAULTS[name])
+
+
+def get_fingerprint(jti):
+    """Return a signed 64-bit hash of a jti."""
+    return int.from_bytes(
+        hashlib.blake2b(jti.encode(), digest_size=8).digest(),
+        'big', signed=True)
+
+
+class RevokedTokens:
+    """In-process set of revoked token fingerprints."""
+
+    def __init__(self):
+        self._fingerprints = array('q')
+        # Revoked since the last full sync.
+        self._recent = array('q')
+        self._lock = threading.Lock()
+        self._version = None
+        self._synced_at = None
+        self._next_sync = 0.0
+        self._next_full_sync = 0.0
+
+    def __contains__(self, jti):
+        return self._contains(get_fingerprint(jti))
+
+    def __len__(self):
+        return len(self._fingerprints) + len(self._recent)
+
+    def _contains(self, fingerprint):
+        for fingerprints in (self._fingerprints, self._recent):
+            index = bisect_left(fingerprints, fingerprint)
+            if (index < len(fingerprints)
+                    and fingerprints[index] == fingerprint):
+                return True
+        return False
+
+    def add(self, fingerprints):
+        """Add fingerprints."""
+        with self._lock:
+            self._insert(fingerprints)
+
+    def _insert(self, fingerprints):
+        # Each insort is atomic under the GIL, so checks need no lock.
+        for fingerprint in fingerprints:
+            if not self._contains(fingerprint):
+                insort(self._recent, fingerprint)
+
+    def sync_due(self):
+        return time.monotonic() >= self._next_sync
+
+    def sync(self):
+        """
+        Load tokens revoked by other processes if the version changed.
+        Once the first sync is done, callers don't wait for a sync running
+        in another thread.
+        """
+        if not self._lock.acquire(blocking=self._synced_at is None):
+            return
+        try:
+            now = time.monotonic()
+            if now < self._next_sync:
+                return
+            self._next_sync = now + get_revocation_setting('SYNC_INTERVAL')
+            version = caches[get_revocation_setting('CACHE_ALIAS')].get(
+                get_revocation_setting('VERSION_KEY'))
+            full = now >= self._next_full_sync
+            if not full and version == self._version:
+                return
+
+            synced_at = datetime.now(timezone.utc)
+            revoked = RevokedToken.objects.filter(expires_at__gt=synced_at)
+            if full:
+                self._next_full_sync = now + get_revocation_setting(
+                    'FULL_SYNC_INTERVAL')
+                # Replaced before the recent ones are dropped, so checks
+                # in between find them in one array or the other.
+                self._fingerprints = array('q', sorted(set(
+                    revoked.values_list('fingerprint', flat=True))))
+                self._recent = array('q')
+            else:
+                overlap = timedelta(
+                    seconds=get_revocation_setting('SYNC_OVERLAP'))
+                self._insert(revoked.filter(
+                    revoked_at__gte=self._synced_at - overlap,
+                ).values_list('fingerprint', flat=True))
+            self._version = version
+            self._synced_at = synced_at
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        with self._lock:
+            self._fingerprints = array('q')
+            self._recent = array('q')
+            self._version = None
+            self._synced_at = None
+            self._next_sync = 0.0
+            self._next_full_sync = 0.0
+
+
+revoked_tokens = RevokedTokens()
+
+
+def is_revoked(jti):
+    """Return whether jti was revoked, syncing first if it's due."""
+    if revoked_tokens.sync_due():
+        revoked_tokens.sync()
+    return jti in revoked_tokens
+
+
+async def ais_revoked(jti):
+    """Async version of is_revoked()."""
+    if revoked_tokens.sync_due():
+        await sync_to_async(revoked_tokens.sync)()
+    return jti in revoked_tokens
+
+
+def revoke(token):
+    """
+    Revoke a validated simplejwt token. Return False if it was already
+    revoked, e.g. by a concurrent request.
+    """
+    jti = token[api_settings.JTI_CLAIM]
+    fingerprint = get_fingerprint(jti)
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(
+                jti=jti,
+                fingerprint=fingerprint,
+                expires_at=datetime.fromtimestamp(token['exp'],
+                                                  tz=timezone.utc),
+            )
+    except IntegrityError:
+        return False
+    # Rejected here at once. If the transaction is rolled back, the token
+    # stays rejected in this process until the next full sync.
+    revoked_tokens.add([fingerprint])
+    transaction.on_commit(publish)
+    return True
+
+
+def publish():
+    """Signal other processes to load the new revocations."""
+    caches[get_revocation_setting('CACHE_ALIAS')].set(
+        get_revocation_setting('VERSION_KEY'), uuid.uuid4().hex, None)
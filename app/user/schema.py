@@ -0,0 +1,9 @@
+"""
+drf-spectacular extensions for the user app.
+"""
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Document CachedJWTAuthentication like the simplejwt scheme."""
+    target_class = 'user.authentication.CachedJWTAuthentication'
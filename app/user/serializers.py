@@ -1,33 +1,96 @@
 """
 Serializers for the user and address API View.
 """
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher
+from django.db import IntegrityError, connection, transaction
 
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
 import re
+from contextlib import contextmanager, nullcontext
 
+from core.instrumentation import TimedSerializerMixin
+from user import hashing, revocation
 from user.models import Address
 
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
-    """Serializer for user registration."""
-
-    username = serializers.CharField(
-        required=True,
-        validators=[UniqueValidator(
-            queryset=get_user_model().objects.all(),
-            message="An account with this username already exists."
-        )]
-    )
-    email = serializers.EmailField(
-        required=True,
-        validators=[UniqueValidator(
-            queryset=get_user_model().objects.all(),
-            message="An account with this email already exists."
-        )]
-    )
+UNIQUE_FIELD_MESSAGES = {
+    'username': "An account with this username already exists.",
+    'email': "An account with this email already exists.",
+    'phone_number': "An account with this phone number already exists",
+}
+
+UNIQUE_VIOLATION_PATTERNS = (
+    # PostgreSQL: DETAIL:  Key (email)=(user@example.com) already exists.
+    re.compile(r'Key \((?P<column>\w+)\)='),
+    # SQLite: UNIQUE constraint failed: user_customuser.email
+    re.compile(r'UNIQUE constraint failed: \w+\.(?P<column>\w+)'),
+)
+
+
+def get_unique_violation_field(error, model):
+    """
+    Return the name of the model field whose unique constraint raised the
+    IntegrityError, or None if it can't be determined.
+    """
+    message = str(error)
+    for pattern in UNIQUE_VIOLATION_PATTERNS:
+        match = pattern.search(message)
+        if match is None:
+            continue
+        for field in model._meta.concrete_fields:
+            if field.column == match.group('column'):
+                return field.name
+    return None
+
+
+@contextmanager
+def unique_violation_errors():
+    """
+    Turn unique violations on user fields raised inside the block into
+    field ValidationErrors.
+
+    A savepoint is only needed to keep an outer transaction usable after
+    a violation; in autocommit mode the statement alone is enough.
+    """
+    if connection.in_atomic_block:
+        savepoint = transaction.atomic()
+    else:
+        savepoint = nullcontext()
+    try:
+        with savepoint:
+            yield
+    except IntegrityError as error:
+        field = get_unique_violation_field(error, get_user_model())
+        if field not in UNIQUE_FIELD_MESSAGES:
+            raise
+        raise serializers.ValidationError({
+            field: [UNIQUE_FIELD_MESSAGES[field]]
+        })
+
+
+class UserRegistrationSerializer(TimedSerializerMixin,
+                                 serializers.ModelSerializer):
+    """
+    Serializer for user registration.
+
+    Uniqueness of username, email and phone number is enforced by the
+    database: create() does a single INSERT and turns unique violations
+    into field errors. Set USER_REGISTRATION_UNIQUE_PRECHECK to also
+    check them with queries during validation.
+    """
+
+    username = serializers.CharField(required=True)
+    email = serializers.EmailField(required=True)
     first_name = serializers.CharField(required=True)
     last_name = serializers.CharField(required=True)
     phone_number = serializers.CharField(required=True)
@@ -39,10 +102,37 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         fields = ['username', 'email', 'first_name', 'last_name',
                   'phone_number', 'password', 'password2']
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if getattr(settings, 'USER_REGISTRATION_UNIQUE_PRECHECK', False):
+            for name, message in UNIQUE_FIELD_MESSAGES.items():
+                fields[name].validators.append(UniqueValidator(
+                    queryset=get_user_model().objects.all(),
+                    message=message
+                ))
+        return fields
+
     def create(self, validated_data):
         """Create and return a user with encrypted password."""
         validated_data.pop('password2')
-        return get_user_model().objects.create_user(**validated_data)
+        with unique_violation_errors():
+            return get_user_model().objects.create_user(**validated_data)
+
+    async def acreate(self, validated_data):
+        """
+        Async version of create() which awaits the password hash off the
+        event loop.
+        """
+        validated_data.pop('password2')
+        password = validated_data.pop('password')
+        user = get_user_model().objects.build_user(**validated_data)
+        user.password = await hashing.amake_password(password)
+        await sync_to_async(self.save_new_user)(user)
+        return user
+
+    def save_new_user(self, user):
+        with unique_violation_errors():
+            user.save()
 
     def validate(self, attrs):
         if attrs['password'] != attrs['password2']:
@@ -66,15 +156,45 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
                 "Phone number must start with optional \
                 '+' and contain 9-15 digits.")
 
-        User = get_user_model()
-        if User.objects.filter(phone_number=value).exists():
-            raise serializers.ValidationError(
-                "An account with this phone number already exists")
+        return value
+
+
+class UserImportSerializer(UserRegistrationSerializer):
+    """
+    Serializer validating users imported from legacy systems.
 
+    Applies the registration rules, but accepts either a raw `password`
+    or an already hashed `password_hash`. It only validates rows; the
+    import_users command inserts them in bulk.
+    """
+
+    password = serializers.CharField(write_only=True, required=False)
+    password2 = serializers.CharField(write_only=True, required=False)
+    password_hash = serializers.CharField(write_only=True, required=False)
+
+    class Meta(UserRegistrationSerializer.Meta):
+        fields = UserRegistrationSerializer.Meta.fields + ['password_hash']
+
+    def validate(self, attrs):
+        if 'password_hash' in attrs:
+            return attrs
+        if 'password' not in attrs:
+            raise serializers.ValidationError({
+                "password": "Either password or password_hash is required."
+            })
+        attrs.setdefault('password2', attrs['password'])
+        return super().validate(attrs)
+
+    def validate_password_hash(self, value):
+        try:
+            identify_hasher(value)
+        except ValueError:
+            raise serializers.ValidationError(
+                "Unknown password hash format.")
         return value
 
 
-class CurrentUserSerializer(serializers.ModelSerializer):
+class CurrentUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for basic current user data."""
 
     class Meta:
@@ -82,7 +202,8 @@ class CurrentUserSerializer(serializers.ModelSerializer):
         fields = ['username', 'email', 'first_name', 'last_name']
 
 
-class CurrentUserDetailSerializer(serializers.ModelSerializer):
+class CurrentUserDetailSerializer(TimedSerializerMixin,
+                                  serializers.ModelSerializer):
     """Serializer for detail current user data"""
 
     class Meta:
@@ -91,10 +212,56 @@ class CurrentUserDetailSerializer(serializers.ModelSerializer):
                   'phone_number']
 
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for address"""
 
     class Meta:
         model = Address
         fields = ['id', 'street', 'city', 'zip_code', 'country']
         read_only_fields = ['id']
+
+    def update(self, instance, validated_data):
+        """Update the address, rejecting duplicates of another address."""
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                "An identical address already exists.")
+
+
+class RotatingTokenRefreshSerializer(TimedSerializerMixin,
+                                     TokenRefreshSerializer):
+    """
+    Refresh serializer rejecting revoked refresh tokens. With
+    ROTATE_REFRESH_TOKENS, the refresh token is revoked once the refresh
+    succeeded, so it can't be used again, even by a concurrent request.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if revocation.is_revoked(refresh[api_settings.JTI_CLAIM]):
+            raise InvalidToken('Token is revoked')
+        data = super().validate(attrs)
+        if (api_settings.ROTATE_REFRESH_TOKENS
+                and not revocation.revoke(refresh)):
+            raise InvalidToken('Token is revoked')
+        return data
+
+
+class LogoutSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Serializer revoking a refresh token and the request's access token."""
+
+    refresh = serializers.CharField(write_only=True)
+
+    def validate_refresh(self, value):
+        try:
+            return RefreshToken(value)
+        except TokenError as e:
+            raise InvalidToken(e.args[0]) from e
+
+    def save(self):
+        revocation.revoke(self.validated_data['refresh'])
+        access = self.context['request'].auth
+        if access is not None:
+            revocation.revoke(access)
@@ -0,0 +1,24 @@
+"""
+Signal handlers for the user app.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.authentication import invalidate_user_cache
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drop the cached authentication data of a saved or deleted user.
+
+    The cache is cleared again on commit so a concurrent request can't
+    re-populate it with the row as it was before the transaction.
+    """
+    invalidate_user_cache(instance.pk)
+    transaction.on_commit(partial(invalidate_user_cache, instance.pk))
@@ -0,0 +1,194 @@
+"""
+Tests for the async user API views.
+"""
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.authentication import local_user_cache
+from user.models import Address
+
+
+REGISTER_USER_URL = reverse('user-async:register-user')
+CURRENT_USER_INFO = reverse('user-async:current-user')
+CURRENT_USER_DETAIL_INFO = reverse('user-async:current-user-detail')
+CREATE_ADDRESS = reverse('user-async:create-address')
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    defaults = {
+        'username': 'janek123',
+        'email': 'user@example.com',
+        'first_name': 'Jan',
+        'last_name': 'Kowalski',
+        'phone_number': '123456789',
+        'password': 'Test1234',
+    }
+    defaults.update(params)
+    return get_user_model().objects.create_user(**defaults)
+
+
+class PublicAsyncUserAPITests(TestCase):
+    """Test the public async user API."""
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_registration_user_success(self):
+        """Test registering a user through the async view."""
+        payload = {
+            'username': 'MichaLeS',
+            'email': 'tESt@example.com',
+            'first_name': 'Michał',
+            'last_name': 'Kowalski',
+            'phone_number': '654654654',
+            'password': 'test1234',
+            'password2': 'test1234',
+        }
+
+        res = await self.async_client.post(
+            REGISTER_USER_URL, payload, content_type='application/json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.json()['email'], 'test@example.com')
+        self.assertNotIn('password', res.json())
+        user = await get_user_model().objects.aget(email='test@example.com')
+        self.assertTrue(await sync_to_async(user.check_password)('test1234'))
+
+    async def test_registration_duplicate_email(self):
+        """Test duplicate emails get the registration field error."""
+        await sync_to_async(create_user)(email='test@example.com')
+
+        res = await self.async_client.post(REGISTER_USER_URL, {
+            'username': 'MichaLee',
+            'email': 'test@example.com',
+            'first_name': 'Michał',
+            'last_name': 'Kowalski',
+            'phone_number': '654654653',
+            'password': 'test1234',
+            'password2': 'test1234',
+        }, content_type='application/json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.json(), {
+            'email': ['An account with this email already exists.']
+        })
+
+    async def test_registration_invalid_json(self):
+        """Test malformed JSON returns a 400."""
+        res = await self.async_client.post(
+            REGISTER_USER_URL, '{', content_type='application/json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_current_user_requires_authentication(self):
+        """Test anonymous requests get a 401 with WWW-Authenticate."""
+        res = await self.async_client.get(CURRENT_USER_INFO)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('Bearer', res['WWW-Authenticate'])
+
+
+class PrivateAsyncUserAPITests(TestCase):
+    """Test async API requests that require authentication."""
+
+    def setUp(self):
+        cache.clear()
+        local_user_cache.clear()
+        self.user = create_user()
+        token = AccessToken.for_user(self.user)
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    async def test_retrieve_current_user_data(self):
+        """Test retrieving the current user's data."""
+        res = await self.async_client.get(CURRENT_USER_INFO,
+                                          headers=self.headers)
+        res_detail = await self.async_client.get(CURRENT_USER_DETAIL_INFO,
+                                                 headers=self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {
+            'username': self.user.username,
+            'email': self.user.email,
+            'first_name': self.user.first_name,
+            'last_name': self.user.last_name
+        })
+        self.assertEqual(res_detail.json()['phone_number'],
+                         self.user.phone_number)
+
+    async def test_current_user_not_modified(self):
+        """Test a matching If-None-Match gets a 304."""
+        res = await self.async_client.get(CURRENT_USER_INFO,
+                                          headers=self.headers)
+
+        res_cached = await self.async_client.get(CURRENT_USER_INFO, headers={
+            **self.headers, 'If-None-Match': res['ETag']})
+
+        self.assertEqual(res_cached.status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+    async def test_inactive_user_rejected(self):
+        """Test inactive users can't authenticate."""
+        self.user.is_active = False
+        await self.user.asave()
+
+        res = await self.async_client.get(CURRENT_USER_INFO,
+                                          headers=self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_create_address(self):
+        """Test creating and then re-submitting an address."""
+        payload = {
+            'street': '123 Main St',
+            'city': 'Warsaw',
+            'zip_code': '00-001',
+            'country': 'Poland'
+        }
+
+        res = await self.async_client.post(
+            CREATE_ADDRESS, payload, content_type='application/json',
+            headers=self.headers)
+        res_existing = await self.async_client.post(
+            CREATE_ADDRESS, payload, headers=self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res_existing.status_code, status.HTTP_200_OK)
+        self.assertEqual(res_existing.json()['created'], False)
+        self.assertEqual(await Address.objects.filter(
+            user=self.user).acount(), 1)
+
+    async def test_method_not_allowed(self):
+        """Test unsupported methods return a 405."""
+        res = await self.async_client.delete(CURRENT_USER_INFO,
+                                             headers=self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class BenchmarkASGICommandTests(TransactionTestCase):
+    """Test the benchmark_asgi command."""
+
+    def test_reports_both_paths(self):
+        """Test a line is printed for the sync and the async endpoint."""
+        out = StringIO()
+
+        call_command('benchmark_asgi', requests=20, concurrency=2,
+                     stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('sync '))
+        self.assertTrue(lines[1].startswith('async '))
+        self.assertIn('0 errors', lines[1])
+        self.assertFalse(get_user_model().objects.exists())
@@ -0,0 +1,107 @@
+"""
+Tests for the cached JWT authentication.
+"""
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.authentication import local_user_cache
+
+
+CURRENT_USER_INFO = reverse('user:current-user')
+CURRENT_USER_DETAIL_INFO = reverse('user:current-user-detail')
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    defaults = {
+        'username': 'janek123',
+        'email': 'user@example.com',
+        'first_name': 'Jan',
+        'last_name': 'Kowalski',
+        'phone_number': '123456789',
+        'password': 'Test1234',
+    }
+    defaults.update(params)
+    return get_user_model().objects.create_user(**defaults)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """Test authenticating token users from the cache."""
+
+    def setUp(self):
+        cache.clear()
+        local_user_cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_cached_user_served_without_queries(self):
+        """Test repeated requests don't query the database."""
+        with self.assertNumQueries(1):
+            res = self.client.get(CURRENT_USER_INFO)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(CURRENT_USER_DETAIL_INFO)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['phone_number'], self.user.phone_number)
+
+    def test_shared_cache_used_after_local_miss(self):
+        """Test a process-local miss is answered by the shared cache."""
+        self.client.get(CURRENT_USER_INFO)
+        local_user_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(CURRENT_USER_INFO)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_cache_invalidated_on_save(self):
+        """Test changes to the user are visible on the next request."""
+        self.client.get(CURRENT_USER_INFO)
+        self.user.first_name = 'Janusz'
+        self.user.save()
+
+        res = self.client.get(CURRENT_USER_INFO)
+
+        self.assertEqual(res.data['first_name'], 'Janusz')
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user can't authenticate from the cache."""
+        self.client.get(CURRENT_USER_INFO)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(CURRENT_USER_INFO)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_rejected(self):
+        """Test a deleted user can't authenticate from the cache."""
+        self.client.get(CURRENT_USER_INFO)
+        self.user.delete()
+
+        res = self.client.get(CURRENT_USER_INFO)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_user_save_keeps_password(self):
+        """Test saving a cached user doesn't overwrite unloaded fields."""
+        self.client.get(CURRENT_USER_INFO)
+        request_user = self.client.get(CURRENT_USER_INFO) \
+            .renderer_context['request'].user
+
+        request_user.first_name = 'Janusz'
+        request_user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Janusz')
+        self.assertTrue(self.user.check_password('Test1234'))
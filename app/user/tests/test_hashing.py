@@ -0,0 +1,164 @@
+"""
+Tests for off-thread password hashing.
+"""
+import asyncio
+import threading
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import hashing
+
+
+TOKEN_PAIR_URL = reverse('user:token_obtain_pair')
+
+
+class PasswordHashingExecutorTests(SimpleTestCase):
+    """Test the bounded password hashing executor."""
+
+    def test_hash_runs_in_pool(self):
+        """Test hashing functions run outside the calling thread."""
+        executor = hashing.PasswordHashingExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+
+        thread_name = executor.run(lambda: threading.current_thread().name)
+
+        self.assertTrue(thread_name.startswith('hashing'))
+
+    def test_full_queue_rejected(self):
+        """Test callers are rejected once max_pending work is queued."""
+        executor = hashing.PasswordHashingExecutor(
+            max_workers=1, max_pending=1, queue_timeout=0.01, retry_after=3)
+        self.addCleanup(executor.shutdown)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        executor.submit(release.wait)
+
+        with self.assertRaises(hashing.PasswordHashingBusy) as cm:
+            executor.submit(lambda: None)
+
+        self.assertEqual(cm.exception.wait, 3)
+        self.assertEqual(cm.exception.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_slot_released_after_completion(self):
+        """Test finished work frees its slot."""
+        executor = hashing.PasswordHashingExecutor(
+            max_workers=1, max_pending=1, queue_timeout=0.5)
+        self.addCleanup(executor.shutdown)
+
+        self.assertEqual(executor.run(lambda: 1), 1)
+        self.assertEqual(executor.run(lambda: 2), 2)
+
+    def test_cancelled_wait_releases_slot(self):
+        """Test a caller cancelled while waiting for a slot doesn't keep it."""
+        executor = hashing.PasswordHashingExecutor(
+            max_workers=1, max_pending=1, queue_timeout=5)
+        self.addCleanup(executor.shutdown)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        executor.submit(release.wait)
+
+        async def cancel_waiting():
+            waiting = asyncio.ensure_future(executor.asubmit(lambda: None))
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+            release.set()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            return await executor.arun(lambda: 1)
+
+        self.assertEqual(asyncio.run(cancel_waiting()), 1)
+        self.assertTrue(executor.slots.acquire(timeout=1))
+
+    def test_unknown_backend_rejected(self):
+        """Test an unknown executor backend raises ValueError."""
+        with self.assertRaises(ValueError):
+            hashing.PasswordHashingExecutor(backend='gpu')
+
+
+class PasswordRehashTests(TestCase):
+    """Test passwords are upgraded to the preferred hasher on login."""
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def create_user(self):
+        return get_user_model().objects.create_user(
+            email='user@example.com',
+            password='Test1234',
+            username='janek123',
+            phone_number='123456789',
+            first_name='Jan',
+            last_name='Kowalski',
+        )
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_login_rehashes_outdated_password(self):
+        """Test a successful login upgrades an outdated password hash."""
+        user = self.create_user()
+        self.assertEqual(identify_hasher(user.password).algorithm, 'md5')
+
+        res = APIClient().post(TOKEN_PAIR_URL, {
+            'email': 'user@example.com',
+            'password': 'Test1234',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, 'scrypt')
+        self.assertTrue(user.check_password('Test1234'))
+
+    @override_settings(PASSWORD_HASHING_EXECUTOR={
+        'MAX_PENDING': 1, 'QUEUE_TIMEOUT': 0.01, 'RETRY_AFTER': 2,
+    })
+    def test_login_rejected_when_hashing_busy(self):
+        """Test logins get a 503 with Retry-After when the pool is full."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        hashing.get_executor().submit(release.wait)
+
+        res = APIClient().post(TOKEN_PAIR_URL, {
+            'email': 'user@example.com',
+            'password': 'Test1234',
+        })
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '2')
+
+
+class BenchmarkHashersCommandTests(SimpleTestCase):
+    """Test the benchmark_hashers command."""
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ])
+    def test_reports_hashes_per_second(self):
+        """Test a throughput line is printed for each hasher."""
+        out = StringIO()
+
+        call_command('benchmark_hashers', rounds=2, concurrency=2,
+                     stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('md5: '))
+        self.assertTrue(lines[1].startswith('scrypt: '))
+        self.assertIn('hashes/sec', lines[1])
+        self.assertIn('work factor=', lines[1])
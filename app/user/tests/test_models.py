@@ -1,4 +1,5 @@
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -70,6 +71,17 @@ class CustomUserModelTests(TestCase):
         self.assertTrue(user.is_superuser)
         self.assertTrue(user.is_staff)
 
+    def test_version_changes_on_save(self):
+        """Test every save of a user stores a new version marker."""
+        user = create_user()
+        version = user.version
+
+        user.first_name = 'Janek'
+        user.save(update_fields=['first_name'])
+        user.refresh_from_db()
+
+        self.assertNotEqual(user.version, version)
+
 
 class AddressModelTests(TestCase):
     """Test Address Model."""
@@ -110,3 +122,63 @@ class AddressModelTests(TestCase):
 
         with self.assertRaises(ValidationError):
             address.full_clean()
+
+    def test_address_fingerprint_normalized(self):
+        """Test the fingerprint ignores case and whitespace differences."""
+        address = models.Address.objects.create(
+            user=self.user,
+            street="Drzymaly 3",
+            city="Poznan",
+            zip_code="60-613",
+            country="Poland",
+        )
+        other = models.Address(
+            user=self.user,
+            street=" drzymaly   3",
+            city="POZNAN",
+            zip_code="60-613 ",
+            country="poland",
+        )
+
+        self.assertEqual(len(address.fingerprint), 64)
+        self.assertEqual(other.compute_fingerprint(), address.fingerprint)
+        with self.assertRaises(IntegrityError):
+            other.save()
+
+    def test_address_upsert(self):
+        """Test upsert creates an address once and then returns it."""
+        fields = {
+            'street': "Drzymaly 3",
+            'city': "Poznan",
+            'zip_code': "60-613",
+            'country': "Poland",
+        }
+
+        address, created = models.Address.objects.upsert(
+            user=self.user, **fields)
+        existing, existing_created = models.Address.objects.upsert(
+            user=self.user, **{**fields, 'city': "poznan"})
+
+        self.assertTrue(created)
+        self.assertFalse(existing_created)
+        self.assertEqual(existing.id, address.id)
+        self.assertEqual(existing.city, "Poznan")
+        self.assertEqual(existing.user_id, self.user.id)
+        self.assertEqual(models.Address.objects.count(), 1)
+
+    def test_address_upsert_per_user(self):
+        """Test the same address can be stored for different users."""
+        other_user = create_user(email='other@example.com',
+                                 username='other', phone_number='987654321')
+        fields = {
+            'street': "Drzymaly 3",
+            'city': "Poznan",
+            'zip_code': "60-613",
+            'country': "Poland",
+        }
+
+        models.Address.objects.upsert(user=self.user, **fields)
+        _, created = models.Address.objects.upsert(user=other_user, **fields)
+
+        self.assertTrue(created)
+        self.assertEqual(models.Address.objects.count(), 2)
@@ -0,0 +1,123 @@
+"""
+Tests for token revocation.
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user import revocation
+from user.models import RevokedToken
+from user.revocation import revoked_tokens
+
+
+def revoke_elsewhere(jti, expires_in=timedelta(days=1)):
+    """Revoke a jti like another process would."""
+    RevokedToken.objects.create(
+        jti=jti,
+        fingerprint=revocation.get_fingerprint(jti),
+        expires_at=timezone.now() + expires_in,
+    )
+    revocation.publish()
+
+
+@override_settings(TOKEN_REVOCATION={'SYNC_INTERVAL': 0})
+class RevocationTests(TestCase):
+    """Test revoking tokens and syncing the in-process array."""
+
+    def setUp(self):
+        cache.clear()
+        revoked_tokens.clear()
+        self.addCleanup(revoked_tokens.clear)
+
+    def test_revoke(self):
+        """Test a revoked token is rejected at once, and revoked once."""
+        token = RefreshToken()
+
+        self.assertFalse(revocation.is_revoked(token['jti']))
+        self.assertTrue(revocation.revoke(token))
+        self.assertFalse(revocation.revoke(token))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(revocation.is_revoked(token['jti']))
+        self.assertTrue(RevokedToken.objects.filter(jti=token['jti']))
+
+    def test_first_check_loads_revoked_tokens(self):
+        """Test the first check loads the unexpired revoked tokens."""
+        revoke_elsewhere('revoked')
+        revoke_elsewhere('expired', expires_in=timedelta(seconds=-1))
+
+        self.assertTrue(revocation.is_revoked('revoked'))
+        self.assertFalse(revocation.is_revoked('expired'))
+        self.assertEqual(len(revoked_tokens), 1)
+
+    def test_sync_on_version_change(self):
+        """Test new revocations are only queried when the version changes."""
+        revocation.is_revoked('other')
+
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation.is_revoked('revoked'))
+
+        revoke_elsewhere('revoked')
+        with self.assertNumQueries(1):
+            self.assertTrue(revocation.is_revoked('revoked'))
+
+    @override_settings(TOKEN_REVOCATION={'SYNC_INTERVAL': 60})
+    def test_sync_interval(self):
+        """Test the version is read at most once per SYNC_INTERVAL."""
+        revocation.is_revoked('other')
+        revoke_elsewhere('revoked')
+
+        self.assertFalse(revocation.is_revoked('revoked'))
+
+    def test_many_revoked_tokens(self):
+        """Test checks against many revoked tokens."""
+        jtis = [f'jti-{n}' for n in range(10000)]
+        revoked_tokens.add(revocation.get_fingerprint(jti)
+                           for jti in jtis[::2])
+
+        revoked = [jti for jti in jtis if jti in revoked_tokens]
+
+        self.assertEqual(revoked, jtis[::2])
+
+    def test_full_sync_merges_recent(self):
+        """
+        Test revocations between full syncs leave the large array alone
+        until the next full sync.
+        """
+        revoke_elsewhere('first')
+        revocation.is_revoked('other')
+        loaded = revoked_tokens._fingerprints
+
+        revocation.revoke(RefreshToken())
+        revoke_elsewhere('second')
+        self.assertTrue(revocation.is_revoked('second'))
+        self.assertIs(revoked_tokens._fingerprints, loaded)
+        self.assertEqual(len(revoked_tokens), 3)
+
+        revoked_tokens._next_full_sync = 0.0
+        revoke_elsewhere('third')
+        self.assertTrue(revocation.is_revoked('third'))
+        self.assertEqual(len(revoked_tokens._fingerprints), 4)
+        self.assertEqual(len(revoked_tokens._recent), 0)
+        self.assertTrue(revocation.is_revoked('first'))
+
+    def test_purge_expired(self):
+        """Test the command deletes only the expired revocations."""
+        revoke_elsewhere('revoked')
+        for number in range(3):
+            revoke_elsewhere(f'expired-{number}',
+                             expires_in=timedelta(seconds=-1))
+        out = StringIO()
+
+        call_command('purge_revoked_tokens', batch_size=2, stdout=out)
+
+        self.assertIn('Deleted 3 expired revoked tokens.', out.getvalue())
+        self.assertEqual(
+            list(RevokedToken.objects.values_list('jti', flat=True)),
+            ['revoked'])
@@ -1,22 +1,36 @@
 """
 Tests for the user API
 """
-from django.test import TestCase
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
 
+from user.authentication import local_user_cache
 from user.models import Address
 
 
 REGISTER_USER_URL = reverse('user:register-user')
 TOKEN_PAIR_URL = reverse('user:token_obtain_pair')
 TOKEN_REFRESH = reverse('user:token_refresh')
+LOGOUT = reverse('user:logout')
 CURRENT_USER_INFO = reverse('user:current-user')
 CURRENT_USER_DETAIL_INFO = reverse('user:current-user-detail')
 CREATE_ADDRESS = reverse('user:create-address')
+ADDRESS_LIST = reverse('user:address-list')
+
+
+def address_detail_url(address_id):
+    """Create and return an address detail URL."""
+    return reverse('user:address-detail', args=[address_id])
 
 
 def create_user(**params):
@@ -36,6 +50,8 @@ def create_user(**params):
 class PublicUserAPITests(TestCase):
     """Test the public features of the user API."""
     def setUp(self):
+        # Clears the throttle buckets.
+        cache.clear()
         self.client = APIClient()
 
     def get_tokens_for_valid_user(self, email, password):
@@ -139,6 +155,78 @@ class PublicUserAPITests(TestCase):
         })
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_duplicate_fields_return_field_errors(self):
+        """Test unique violations are reported on the conflicting field."""
+        create_user(username='MichaLeS', email='test@example.com',
+                    phone_number='654654654')
+        payload = {
+            'username': 'other',
+            'email': 'other@example.com',
+            'first_name': 'Michał',
+            'last_name': 'Kowalski',
+            'phone_number': '654654653',
+            'password': 'test1234',
+            'password2': 'test1234',
+        }
+        conflicts = {
+            'username': ('MichaLeS',
+                         'An account with this username already exists.'),
+            'email': ('TEST@example.com',
+                      'An account with this email already exists.'),
+            'phone_number': ('654654654',
+                             'An account with this phone number already '
+                             'exists'),
+        }
+
+        for field, (value, message) in conflicts.items():
+            with self.subTest(field=field):
+                res = self.client.post(REGISTER_USER_URL,
+                                       {**payload, field: value})
+
+                self.assertEqual(res.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(res.data, {field: [message]})
+        self.assertEqual(get_user_model().objects.count(), 1)
+
+    def test_registration_runs_single_insert(self):
+        """Test registration doesn't run uniqueness pre-check queries."""
+        payload = {
+            'username': 'MichaLeS',
+            'email': 'test@example.com',
+            'first_name': 'Michał',
+            'last_name': 'Kowalski',
+            'phone_number': '654654654',
+            'password': 'test1234',
+            'password2': 'test1234',
+        }
+
+        # The INSERT plus the savepoint around it, needed because the
+        # test case runs inside a transaction.
+        with self.assertNumQueries(3):
+            res = self.client.post(REGISTER_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    @override_settings(USER_REGISTRATION_UNIQUE_PRECHECK=True)
+    def test_registration_with_unique_precheck(self):
+        """Test pre-check queries report duplicates during validation."""
+        create_user(username='MichaLeS', phone_number='654654654')
+        payload = {
+            'username': 'MichaLeS',
+            'email': 'test2@example.com',
+            'first_name': 'Michał',
+            'last_name': 'Kowalski',
+            'phone_number': '654654654',
+            'password': 'test1234',
+            'password2': 'test1234',
+        }
+
+        with self.assertNumQueries(3):
+            res = self.client.post(REGISTER_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'username', 'phone_number'})
+
     def test_create_token_with_valid_credentials(self):
         """
         Test generates access and refresh token for valid credentials
@@ -171,9 +259,75 @@ class PublicUserAPITests(TestCase):
         res = self.client.post(TOKEN_REFRESH, {'refresh': tokens['refresh']})
 
         self.assertIn('access', res.data)
-        self.assertNotIn('refresh', res.data)
+        self.assertNotEqual(res.data['refresh'], tokens['refresh'])
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_refresh_token_single_use(self):
+        """Test a refresh token can't be used after it was rotated."""
+        payload = {
+            'email': 'test@example.com',
+            'password': 'Test1234',
+        }
+        create_user(**payload)
+        tokens = self.get_tokens_for_valid_user(**payload)
+        rotated = self.client.post(
+            TOKEN_REFRESH, {'refresh': tokens['refresh']}).data
+
+        res = self.client.post(TOKEN_REFRESH, {'refresh': tokens['refresh']})
+        res_rotated = self.client.post(
+            TOKEN_REFRESH, {'refresh': rotated['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res_rotated.status_code, status.HTTP_200_OK)
+
+    def test_failed_refresh_keeps_token(self):
+        """Test a refresh token isn't revoked by a refresh that failed."""
+        payload = {
+            'email': 'test@example.com',
+            'password': 'Test1234',
+        }
+        user = create_user(**payload)
+        tokens = self.get_tokens_for_valid_user(**payload)
+        user.is_active = False
+        user.save()
+
+        res = self.client.post(TOKEN_REFRESH, {'refresh': tokens['refresh']})
+        user.is_active = True
+        user.save()
+        res_again = self.client.post(
+            TOKEN_REFRESH, {'refresh': tokens['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res_again.status_code, status.HTTP_200_OK)
+
+    def test_logout(self):
+        """Test logging out revokes the refresh and access tokens."""
+        payload = {
+            'email': 'test@example.com',
+            'password': 'Test1234',
+        }
+        create_user(**payload)
+        tokens = self.get_tokens_for_valid_user(**payload)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+
+        res = self.client.post(LOGOUT, {'refresh': tokens['refresh']})
+        res_current = self.client.get(CURRENT_USER_INFO)
+        res_refresh = self.client.post(
+            TOKEN_REFRESH, {'refresh': tokens['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(res_current.status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res_refresh.status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_invalid_token(self):
+        """Test logging out with an invalid refresh token fails."""
+        res = self.client.post(LOGOUT, {'refresh': 'invalid'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
     def test_create_token_with_invalid_credentials(self):
         """Test returns error if credentials invalid."""
         payload = {
@@ -187,6 +341,56 @@ class PublicUserAPITests(TestCase):
         self.assertNotIn('refresh', res.data)
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    @override_settings(THROTTLE={'RATES': {'login': {'account': '2/min'}}})
+    def test_login_throttled_per_account(self):
+        """Test logins are rejected before hashing once throttled."""
+        payload = {'email': 'user@example.com', 'password': 'wrong'}
+        for _ in range(2):
+            self.client.post(TOKEN_PAIR_URL, payload)
+
+        with patch('user.hashing.get_executor') as get_executor, \
+                self.assertNumQueries(0):
+            res = self.client.post(TOKEN_PAIR_URL, {
+                'email': ' USER@example.com',
+                'password': 'wrong',
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
+        get_executor.assert_not_called()
+        res = self.client.post(TOKEN_PAIR_URL, {
+            'email': 'other@example.com',
+            'password': 'wrong',
+        })
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(THROTTLE={'RATES': {'registration': {'ip': '1/hour'}}})
+    def test_registration_throttled_per_ip(self):
+        """Test registrations from one IP address are throttled."""
+        res = self.client.post(REGISTER_USER_URL, {})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.assertNumQueries(0):
+            res = self.client.post(REGISTER_USER_URL, {})
+        res_other_ip = self.client.post(REGISTER_USER_URL, {},
+                                        REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '3600')
+        self.assertEqual(res_other_ip.status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(THROTTLE={'RATES': {'registration': {'ip': '1/hour'}}})
+    def test_forwarded_for_not_trusted(self):
+        """Test clients can't get new IP buckets from X-Forwarded-For."""
+        self.client.post(REGISTER_USER_URL, {},
+                         HTTP_X_FORWARDED_FOR='10.0.0.3')
+
+        res = self.client.post(REGISTER_USER_URL, {},
+                               HTTP_X_FORWARDED_FOR='10.0.0.4')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
     def test_retrieve_current_user_data_error(self):
         """Test that unauthorized user cannot retrieve current user data"""
 
@@ -271,3 +475,264 @@ class PrivateUserAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(Address.objects.count(), 1)
         self.assertEqual(res.data["created"], False)
+
+    def test_create_address_normalized_duplicate(self):
+        """
+        Test that addresses differing only in case and whitespace are
+        treated as the same address
+        """
+        address = Address.objects.create(
+            user=self.user,
+            street='123 Main St',
+            city='Warsaw',
+            zip_code='00-001',
+            country='Poland',
+        )
+
+        res = self.client.post(CREATE_ADDRESS, {
+            'street': ' 123  MAIN st ',
+            'city': 'warsaw',
+            'zip_code': '00-001',
+            'country': 'POLAND'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], False)
+        self.assertEqual(res.data['address']['id'], address.id)
+        self.assertEqual(res.data['address']['street'], '123 Main St')
+        self.assertEqual(Address.objects.count(), 1)
+
+    def test_create_address_returns_new_address(self):
+        """Test a created address is returned with its id."""
+        res = self.client.post(CREATE_ADDRESS, {
+            'street': '123 Main St',
+            'city': 'Warsaw',
+            'zip_code': '00-001',
+            'country': 'Poland'
+        })
+
+        address = Address.objects.get()
+        self.assertEqual(res.data['created'], True)
+        self.assertEqual(res.data['address']['id'], address.id)
+        self.assertEqual(address.user, self.user)
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL upsert')
+    def test_create_existing_address_single_query(self):
+        """Test returning an existing address takes a single statement."""
+        payload = {
+            'street': '123 Main St',
+            'city': 'Warsaw',
+            'zip_code': '00-001',
+            'country': 'Poland'
+        }
+        Address.objects.create(user=self.user, **payload)
+
+        with self.assertNumQueries(1):
+            res = self.client.post(CREATE_ADDRESS, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class CurrentUserETagTests(TestCase):
+    """Test conditional requests to the current user endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        local_user_cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_etag_sent(self):
+        """Test the endpoints send private, revalidated strong ETags."""
+        res = self.client.get(CURRENT_USER_INFO)
+        res_detail = self.client.get(CURRENT_USER_DETAIL_INFO)
+
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertIn('no-cache', res['Cache-Control'])
+        self.assertIn('private', res['Cache-Control'])
+        self.assertNotEqual(res['ETag'], res_detail['ETag'])
+
+    def test_not_modified_without_queries(self):
+        """Test a matching If-None-Match gets a 304 without serializing."""
+        etag = self.client.get(CURRENT_USER_INFO)['ETag']
+
+        with patch('user.serializers.CurrentUserSerializer.to_representation'
+                   ) as to_representation, self.assertNumQueries(0):
+            res = self.client.get(CURRENT_USER_INFO, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+        to_representation.assert_not_called()
+
+    def test_etag_changes_when_user_saved(self):
+        """Test saving the user changes the ETag."""
+        etag = self.client.get(CURRENT_USER_INFO)['ETag']
+        self.user.first_name = 'Janek'
+        self.user.save()
+
+        res = self.client.get(CURRENT_USER_INFO, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['first_name'], 'Janek')
+        self.assertNotEqual(res['ETag'], etag)
+
+
+class AddressBookAPITests(TestCase):
+    """Test the address book API."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_addresses(self, count, user=None):
+        return [
+            Address.objects.create(
+                user=user or self.user,
+                street=f'{number} Main St',
+                city='Warsaw',
+                zip_code='00-001',
+                country='Poland',
+            )
+            for number in range(count)
+        ]
+
+    def test_list_requires_authentication(self):
+        """Test anonymous users can't list addresses."""
+        res = APIClient().get(ADDRESS_LIST)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_addresses_paginated(self):
+        """Test addresses are listed newest first with a cursor."""
+        addresses = self.create_addresses(5)
+        other_user = create_user(email='other@example.com',
+                                 username='other', phone_number='987654321')
+        self.create_addresses(2, user=other_user)
+
+        res = self.client.get(ADDRESS_LIST, {'page_size': 3})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [address.id for address in addresses[:1:-1]])
+        self.assertIsNone(res.data['previous'])
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [address.id for address in addresses[1::-1]])
+        self.assertIsNone(res.data['next'])
+
+    def test_batch_create_addresses(self):
+        """Test a list payload upserts every address in one statement."""
+        existing = self.create_addresses(1)[0]
+        payload = [
+            {'street': '0 main st', 'city': 'Warsaw',
+             'zip_code': '00-001', 'country': 'Poland'},
+            {'street': 'Drzymaly 3', 'city': 'Poznan',
+             'zip_code': '60-613', 'country': 'Poland'},
+            {'street': 'DRZYMALY 3', 'city': 'Poznan',
+             'zip_code': '60-613', 'country': 'Poland'},
+        ]
+
+        res = self.client.post(ADDRESS_LIST, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['created'] for item in res.data],
+                         [False, True, True])
+        self.assertEqual(res.data[0]['address']['id'], existing.id)
+        self.assertEqual(res.data[1]['address']['id'],
+                         res.data[2]['address']['id'])
+        self.assertEqual(self.user.addresses.count(), 2)
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL upsert')
+    def test_batch_create_single_query(self):
+        """Test a batch of addresses is upserted with one query."""
+        payload = [
+            {'street': f'{number} Main St', 'city': 'Warsaw',
+             'zip_code': '00-001', 'country': 'Poland'}
+            for number in range(10)
+        ]
+
+        with self.assertNumQueries(1):
+            res = self.client.post(ADDRESS_LIST, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.user.addresses.count(), 10)
+
+    def test_batch_create_invalid_address(self):
+        """Test nothing is created if an address in the batch is invalid."""
+        payload = [
+            {'street': 'Drzymaly 3', 'city': 'Poznan',
+             'zip_code': '60-613', 'country': 'Poland'},
+            {'street': 'Drzymaly 4', 'city': 'Poznan'},
+        ]
+
+        res = self.client.post(ADDRESS_LIST, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Address.objects.exists())
+
+    def test_batch_create_too_many_addresses(self):
+        """Test batches above the size limit are rejected."""
+        payload = [
+            {'street': f'{number} Main St', 'city': 'Warsaw',
+             'zip_code': '00-001', 'country': 'Poland'}
+            for number in range(101)
+        ]
+
+        res = self.client.post(ADDRESS_LIST, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_create_empty_list(self):
+        """Test an empty batch is rejected and upserting none is a no-op."""
+        res = self.client.post(ADDRESS_LIST, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.assertNumQueries(0):
+            self.assertEqual(Address.objects.bulk_upsert(self.user, []), [])
+
+    def test_update_address(self):
+        """Test updating an address recomputes its fingerprint."""
+        address = self.create_addresses(1)[0]
+
+        res = self.client.patch(address_detail_url(address.id),
+                                {'city': 'Krakow'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        address.refresh_from_db()
+        self.assertEqual(address.city, 'Krakow')
+        self.assertEqual(address.fingerprint, address.compute_fingerprint())
+
+    def test_update_address_to_duplicate(self):
+        """Test an address can't be changed into another of its addresses."""
+        first, second = self.create_addresses(2)
+
+        res = self.client.patch(address_detail_url(second.id),
+                                {'street': first.street})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_delete_address(self):
+        """Test deleting an address."""
+        address = self.create_addresses(1)[0]
+
+        res = self.client.delete(address_detail_url(address.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Address.objects.exists())
+
+    def test_other_users_address_not_found(self):
+        """Test addresses of other users can't be accessed."""
+        other_user = create_user(email='other@example.com',
+                                 username='other', phone_number='987654321')
+        address = self.create_addresses(1, user=other_user)[0]
+
+        res = self.client.delete(address_detail_url(address.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(Address.objects.filter(id=address.id).exists())
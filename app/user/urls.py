@@ -1,9 +1,6 @@
 from django.urls import path
 
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
 
 from . import views
 
@@ -12,14 +9,19 @@ app_name = "user"
 urlpatterns = [
     path('register/', views.UserRegistrationAPIView.as_view(),
          name='register-user'),
-    path('token/', TokenObtainPairView.as_view(),
+    path('token/', views.TokenObtainPairAPIView.as_view(),
          name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(),
          name='token_refresh'),
+    path('logout/', views.LogoutAPIView.as_view(), name='logout'),
     path('current/', views.CurrentUserAPIView.as_view(),
          name='current-user'),
     path('current/detail/', views.CurrentUserDetailAPIView.as_view(),
          name='current-user-detail'),
     path('address/', views.AddressCreateAPIView.as_view(),
-         name='create-address')
+         name='create-address'),
+    path('addresses/', views.AddressListCreateAPIView.as_view(),
+         name='address-list'),
+    path('addresses/<int:pk>/', views.AddressDetailAPIView.as_view(),
+         name='address-detail'),
 ]
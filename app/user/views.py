@@ -1,27 +1,42 @@
 """
 Views for the user and adress API
 """
+from django.db.models import ProtectedError
+from drf_spectacular.utils import extend_schema
 from rest_framework.response import Response
 from rest_framework import (
     generics,
     status,
 )
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.views import TokenObtainPairView
 
+from cart.views import merge_anonymous_cart
+from core.etags import ETagRetrieveMixin
+from core.readonly import CompiledSerializerMixin
+from core.throttling import TokenBucketThrottle
 
 from .serializers import (
     UserRegistrationSerializer,
     CurrentUserSerializer,
     CurrentUserDetailSerializer,
-    AddressSerializer
+    AddressSerializer,
+    LogoutSerializer,
 )
 
 from .models import Address
+from .pagination import AddressCursorPagination
 
 
 class UserRegistrationAPIView(generics.GenericAPIView):
     """API view for user registration."""
+    authentication_classes = ()
     permission_classes = (AllowAny,)
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scope = 'registration'
+    throttle_account_field = 'email'
     serializer_class = UserRegistrationSerializer
 
     def post(self, request, *args, **kwargs):
@@ -33,7 +48,48 @@ class UserRegistrationAPIView(generics.GenericAPIView):
                         status=status.HTTP_201_CREATED)
 
 
-class CurrentUserAPIView(generics.RetrieveAPIView):
+class TokenObtainPairAPIView(TokenObtainPairView):
+    """
+    Obtain a token pair, throttled per IP, account and overall before the
+    password is checked. The client's anonymous cart, if any, is merged
+    into the user's cart.
+    """
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scope = 'login'
+    throttle_account_field = 'email'
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as error:
+            raise InvalidToken(error.args[0]) from error
+
+        response = Response(serializer.validated_data,
+                            status=status.HTTP_200_OK)
+        merge_anonymous_cart(request, response, serializer.user)
+        return response
+
+
+class LogoutAPIView(generics.GenericAPIView):
+    """
+    Log out by revoking a refresh token, and the access token the request
+    is authenticated with, if any.
+    """
+    permission_classes = (AllowAny,)
+    serializer_class = LogoutSerializer
+
+    @extend_schema(responses={status.HTTP_204_NO_CONTENT: None})
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CurrentUserAPIView(CompiledSerializerMixin, ETagRetrieveMixin,
+                         generics.RetrieveAPIView):
     """API view for basic current user data"""
 
     permission_classes = [IsAuthenticated]
@@ -43,7 +99,8 @@ class CurrentUserAPIView(generics.RetrieveAPIView):
         return self.request.user
 
 
-class CurrentUserDetailAPIView(generics.RetrieveAPIView):
+class CurrentUserDetailAPIView(CompiledSerializerMixin, ETagRetrieveMixin,
+                               generics.RetrieveAPIView):
     """API view for detail current user data"""
 
     permission_classes = [IsAuthenticated]
@@ -56,7 +113,7 @@ class CurrentUserDetailAPIView(generics.RetrieveAPIView):
 class AddressCreateAPIView(generics.CreateAPIView):
     """
     Create a new address for the current user, or return an existing one
-    if the same address already exists.
+    if the same address (ignoring case and whitespace) already exists.
     """
 
     permission_classes = [IsAuthenticated]
@@ -66,7 +123,7 @@ class AddressCreateAPIView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        address, created = Address.objects.get_or_create(
+        address, created = Address.objects.upsert(
             user=request.user,
             **serializer.validated_data
         )
@@ -82,3 +139,66 @@ class AddressCreateAPIView(generics.CreateAPIView):
             status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
             headers=headers
         )
+
+
+class AddressListCreateAPIView(CompiledSerializerMixin,
+                               generics.ListCreateAPIView):
+    """
+    List the current user's addresses, or create one or many addresses.
+
+    A list of addresses is upserted in a single statement and answered
+    with a list of {created, address} results in the same order.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = AddressSerializer
+    pagination_class = AddressCursorPagination
+    max_batch_size = 100
+
+    def get_queryset(self):
+        return Address.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        many = isinstance(request.data, list)
+        if many:
+            serializer = self.get_serializer(data=request.data, many=True,
+                                             allow_empty=False,
+                                             max_length=self.max_batch_size)
+            serializer.is_valid(raise_exception=True)
+            results = Address.objects.bulk_upsert(
+                request.user, serializer.validated_data)
+        else:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            results = [Address.objects.upsert(
+                user=request.user, **serializer.validated_data)]
+
+        data = [
+            {
+                "created": created,
+                "address": self.get_serializer(address).data
+            }
+            for address, created in results
+        ]
+        any_created = any(created for _, created in results)
+        return Response(
+            data if many else data[0],
+            status=status.HTTP_201_CREATED if any_created
+            else status.HTTP_200_OK
+        )
+
+
+class AddressDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+    """Retrieve, update or delete an address of the current user."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = AddressSerializer
+
+    def get_queryset(self):
+        return Address.objects.filter(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        try:
+            instance.delete()
+        except ProtectedError:
+            raise ValidationError("The address is used by orders.")